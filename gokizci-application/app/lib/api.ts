@@ -375,23 +375,33 @@ export async function editSelf(
 
 
 /**
- * Son 1 saatteki (veya verilen aralıktaki) segment meta-verilerini getirir.
+ * Son 1 saatteki (veya verilen aralıktaki) segment meta-verilerini sayfa sayfa getirir.
  * @param sourceId Cihazın source_id değeri
  * @param start   ISO format start timestamp (opsiyonel)
  * @param end     ISO format end   timestamp (opsiyonel)
+ * @param options after / afterIds: önceki sayfanın next_after / next_after_ids'i,
+ *                limit: sayfa boyutu, includeFrames: kareleri (base64) de getir
  */
 export async function fetchReplaySegments(
   sourceId: string,
   start?: string,
-  end?: string
-): Promise<
-  { timestamp: string; anomaly: boolean; confidence?: number; frame?: string }[]
-> {
+  end?: string,
+  options: { after?: string; afterIds?: string[]; limit?: number; includeFrames?: boolean } = {}
+): Promise<{
+  segments: { id: string; timestamp: string; anomaly: boolean | null; confidence?: number | null; frame?: string | null }[];
+  has_more: boolean;
+  next_after: string | null;
+  next_after_ids: string[];
+}> {
   try {
     const headers = await getHeaders();
     const params = new URLSearchParams();
     if (start) params.append("start", start);
     if (end)   params.append("end",   end);
+    if (options.after) params.append("after", options.after);
+    if (options.afterIds?.length) params.append("after_ids", options.afterIds.join(","));
+    if (options.limit) params.append("limit", String(options.limit));
+    if (options.includeFrames) params.append("include_frames", "1");
 
     const res = await fetch(
       `http://localhost:5000/api/replay/${sourceId}/segments?${params.toString()}`,
@@ -408,8 +418,7 @@ export async function fetchReplaySegments(
       throw new Error(err.error || "Replay segments alınamadı");
     }
 
-    const data = await res.json();
-    return data.segments;
+    return await res.json();
   } catch (error) {
     console.error('Fetch replay segments error:', error);
     throw error;
@@ -437,6 +446,64 @@ export async function fetchReplayMeta(sourceId: string, windowStart?: string) {
   return data;
 }
 
+export type ReplayMetaWindow = {
+  window_start: string;
+  etag: string;
+  finalized?: boolean;
+  minute_anomaly_ranges?: [number, number][];
+  second_filled_ranges?: [number, number][];
+};
+
+// source_id -> (window_start -> pencere); ETag'i değişmeyen pencereler sunucudan yeniden alınmaz
+const replayMetaCache = new Map<string, Map<string, ReplayMetaWindow>>();
+
+/**
+ * Aralıktaki tüm saat pencerelerinin replay meta'sını tek istekte (RLE aralıklar) getirir.
+ * Daha önce alınmış pencerelerin ETag'leri If-None-Match ile gönderilir; değişmeyenler önbellekten döner.
+ */
+export async function fetchReplayMetaRange(
+  sourceId: string,
+  start: string,
+  end: string
+): Promise<ReplayMetaWindow[]> {
+  const cache = replayMetaCache.get(sourceId) ?? new Map<string, ReplayMetaWindow>();
+  replayMetaCache.set(sourceId, cache);
+
+  const params = new URLSearchParams({ start, end, format: "rle" });
+  const headers = await getHeaders();
+  const knownEtags = Array.from(cache.values()).map((w) => w.etag);
+  const res = await fetch(
+    `http://localhost:5000/api/replay/${sourceId}/meta/range?${params.toString()}`,
+    {
+      method: "GET",
+      headers: knownEtags.length ? { ...headers, "If-None-Match": knownEtags.join(", ") } : headers,
+      credentials: "include",
+      cache: "no-store",
+    }
+  );
+  if (res.status === 304) {
+    // Sunucu aralığın başını saat başına yuvarlar
+    const startMs = Math.floor(Date.parse(start) / 3600000) * 3600000;
+    const endMs = Date.parse(end);
+    return Array.from(cache.values())
+      .filter((w) => {
+        const t = Date.parse(w.window_start + "Z"); // window_start naive UTC
+        return t >= startMs && t < endMs;
+      })
+      .sort((a, b) => a.window_start.localeCompare(b.window_start));
+  }
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({}));
+    throw new Error(err.error || "Replay meta alınamadı");
+  }
+  const data = await res.json();
+  return (data.windows as (ReplayMetaWindow & { not_modified?: boolean })[]).map((w) => {
+    if (w.not_modified && cache.has(w.window_start)) return cache.get(w.window_start)!;
+    cache.set(w.window_start, w);
+    return w;
+  });
+}
+
 export async function deleteUser(userId: string): Promise<boolean> {
   try {
     // 1. Deneme: CSRF token ile silme isteği
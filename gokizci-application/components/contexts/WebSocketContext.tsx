@@ -5,10 +5,13 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import { io, Socket } from 'socket.io-client';
 
+// Canlı yayın çözünürlüğü: 'full' (640x480) veya 'preview' (160x120, düşük fps; grid görünümleri için)
+export type StreamRendition = 'full' | 'preview';
+
 interface WebSocketContextType {
   socket: Socket | null;
-  connectToSource: (sourceId: string) => void;
-  disconnectFromSource: (sourceId: string) => void;
+  connectToSource: (sourceId: string, rendition?: StreamRendition) => void;
+  disconnectFromSource: (sourceId: string, rendition?: StreamRendition) => void;
   isConnected: boolean;
 }
 
@@ -48,15 +51,15 @@ export const WebSocketProvider: React.FC<{ children: React.ReactNode }> = ({ chi
     };
   }, []);
 
-  const connectToSource = (sourceId: string) => {
+  const connectToSource = (sourceId: string, rendition?: StreamRendition) => {
     if (socket) {
-      socket.emit('join', { source_id: sourceId });
+      socket.emit('join', { source_id: sourceId, rendition });
     }
   };
 
-  const disconnectFromSource = (sourceId: string) => {
+  const disconnectFromSource = (sourceId: string, rendition?: StreamRendition) => {
     if (socket) {
-      socket.emit('leave', { source_id: sourceId });
+      socket.emit('leave', { source_id: sourceId, rendition });
     }
   };
 
@@ -233,6 +233,7 @@ export const DeviceCard = ({ device, onStatusChange, refreshDevices }: Props) =>
             <div className="h-[200px] bg-black relative rounded-b-lg">
               <VideoStream
                 sourceId={device.source_id}
+                rendition="preview"
                 onAnomalyDetected={handleAnomalyDetected}
                 onStatusChange={handleStatusChange}
                 key={device.source_id}
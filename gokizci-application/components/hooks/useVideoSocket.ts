@@ -2,15 +2,16 @@
 
 import { useEffect, useRef, useState, useCallback } from 'react';
 import { io, Socket } from 'socket.io-client';
-import { useWebSocket } from '../contexts/WebSocketContext'; 
+import { useWebSocket, StreamRendition } from '../contexts/WebSocketContext'; 
 
 interface UseVideoSocketProps {
   sourceId: string;
+  rendition?: StreamRendition;
   onAnomalyDetected?: (detected: boolean) => void;
   onStatusChange?: (status: "online" | "offline" | "error") => void;
 }
 
-export const useVideoSocket = ({ sourceId, onAnomalyDetected, onStatusChange }: UseVideoSocketProps) => {
+export const useVideoSocket = ({ sourceId, rendition = 'full', onAnomalyDetected, onStatusChange }: UseVideoSocketProps) => {
   const { socket, isConnected: isSocketConnectedGlobally, connectToSource, disconnectFromSource } = useWebSocket(); // CONTEXT'TEN GELEN SOCKET
   // const [isConnected, setIsConnected] = useState(false); // Bu hook'un kendi bağlantı durumu yerine global durumu kullan
   // const socketRef = useRef<Socket | null>(null); // Artık buna gerek yok, context'teki socket kullanılacak
@@ -22,7 +23,7 @@ export const useVideoSocket = ({ sourceId, onAnomalyDetected, onStatusChange }:
   useEffect(() => {
     if (socket && sourceId) {
       // console.log(`useVideoSocket: Joining room for ${sourceId}`);
-      connectToSource(sourceId); // Context üzerinden odaya katıl
+      connectToSource(sourceId, rendition); // Context üzerinden odaya katıl
 
       const handleProcessedFrame = (data: any) => {
         if (data.source_id === sourceId) {
@@ -38,10 +39,10 @@ export const useVideoSocket = ({ sourceId, onAnomalyDetected, onStatusChange }:
       return () => {
         // console.log(`useVideoSocket: Leaving room for ${sourceId}`);
         socket.off("processed_frame", handleProcessedFrame);
-        disconnectFromSource(sourceId); // Context üzerinden odadan ayrıl
+        disconnectFromSource(sourceId, rendition); // Context üzerinden odadan ayrıl
       };
     }
-  }, [socket, sourceId, connectToSource, disconnectFromSource, onAnomalyDetected, onStatusChange]);
+  }, [socket, sourceId, rendition, connectToSource, disconnectFromSource, onAnomalyDetected, onStatusChange]);
 
   // Bu hook artık kendi `isConnected`, `error`, `status` state'lerini tutmamalı,
   // bunları ya WebSocketContext'ten almalı ya da prop olarak parent'tan.
@@ -4,6 +4,7 @@
 
 import { useEffect, useRef, useCallback } from "react"; // useCallback eklendi
 import { useVideoSocket } from "../hooks/useVideoSocket";
+import { StreamRendition } from "../contexts/WebSocketContext";
 
 interface VideoFrameData {
   bitmap: ImageBitmap;
@@ -13,6 +14,7 @@ interface VideoFrameData {
 
 interface VideoStreamProps {
   sourceId: string;
+  rendition?: StreamRendition; // Küçük/grid görünümlerde 'preview' bant genişliğini ve decode yükünü azaltır
   onAnomalyDetected?: (detected: boolean) => void;
   onStatusChange?: (status: "online" | "offline" | "error") => void;
 }
@@ -29,12 +31,14 @@ const JUMP_FORWARD_THRESHOLD_MS = 3000; // Oynatma, canlıdan 3 saniye gerideyse
 
 export const VideoStream = ({
   sourceId,
+  rendition = "full",
   onAnomalyDetected,
   onStatusChange,
 }: VideoStreamProps) => {
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const { isSocketConnected, socket } = useVideoSocket({
     sourceId,
+    rendition,
     onAnomalyDetected,
     onStatusChange,
   });
@@ -92,6 +96,7 @@ export const VideoStream = ({
 
     const handler = async (data: any) => { // Sunucudan gelen 'processed_frame' payload'ı
       if (data.source_id !== sourceId) return;
+      if ((data.rendition ?? "full") !== rendition) return; // Aynı soket başka bir rendition'ı da izliyor olabilir
 
       const clientTimestampRel = data.client_timestamp_rel;
       const clientSequence = data.client_sequence;
@@ -134,7 +139,7 @@ export const VideoStream = ({
       isPlayingRef.current = false;
       if (rafRef.current) cancelAnimationFrame(rafRef.current);
     };
-  }, [socket, sourceId, addFrameToBuffer]);
+  }, [socket, sourceId, rendition, addFrameToBuffer]);
 
 
   // Çizim döngüsü
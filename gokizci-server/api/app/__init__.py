@@ -8,7 +8,10 @@ from app.extensions import socketio
 from app.settings import Config
 from app.replay.routes import replay_bp
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.replay.scheduler import initial_replay_meta_update, scheduled_replay_meta_job
+from app.replay.scheduler import scheduled_replay_meta_job
+from app.system.readiness import start_background_startup
+from app.storage.retention import drop_legacy_ttl_indexes, run_retention_compaction
+from app.socket.message_queue import build_client_manager
 
 
 jwt = JWTManager()
@@ -22,10 +25,17 @@ def create_app():
         db=flask_app.config['MONGODB_DB'],
         host=flask_app.config['MONGODB_HOST']
     )
+    # Saklama artık TTL index'iyle değil sıkıştırma işiyle yönetiliyor
+    drop_legacy_ttl_indexes()
 
     # JWT ve SocketIO başlat
     jwt.init_app(flask_app)
-    socketio.init_app(flask_app)
+    # SOCKETIO_MESSAGE_QUEUE verilirse emit'ler düğümler arası mesaj kuyruğundan geçer
+    client_manager = build_client_manager(Config.SOCKETIO_MESSAGE_QUEUE, channel=Config.SOCKETIO_CHANNEL)
+    if client_manager is not None:
+        socketio.init_app(flask_app, client_manager=client_manager)
+    else:
+        socketio.init_app(flask_app)
 
     import app.socket.handlers
     import app.socket.replay_handlers
@@ -34,15 +44,14 @@ def create_app():
 
     # Scheduler'ı başlat
     scheduler = BackgroundScheduler(daemon=True)
-    scheduler.add_job(scheduled_replay_meta_job, 'interval', seconds=300)
+    scheduler.add_job(scheduled_replay_meta_job, 'interval', seconds=Config.REPLAY_META_INTERVAL)
+    scheduler.add_job(run_retention_compaction, 'interval', seconds=Config.RETENTION_COMPACTION_INTERVAL)
     scheduler.start()
     flask_app.logger.info("APScheduler started for replay_meta jobs.")
     
-    # Uygulama ilk kez ayağa kalktığında meta verilerini güncelle
-    # Bunu bir app context'i içinde yapmak daha güvenli olabilir
-    # eğer DB bağlantısı gibi app'e özgü kaynaklara erişiyorsa
-    with flask_app.app_context():
-        initial_replay_meta_update()
+    # Meta catch-up ve model yükleme/warm-up arka planda; sunucu hemen istek kabul eder
+    # (durum: GET /api/system/ready)
+    start_background_startup(flask_app)
 
     # Uygulama kapanırken scheduler'ı düzgünce kapat
     import atexit
@@ -53,10 +62,12 @@ def create_app():
     from app.devices.routes import device_bp
     from app.users.routes import user_bp
     from app.replay.routes import replay_bp
+    from app.system.routes import system_bp
     flask_app.register_blueprint(auth_bp, url_prefix='/api/auth')
     flask_app.register_blueprint(device_bp, url_prefix='/api/devices')
     flask_app.register_blueprint(user_bp, url_prefix='/api/users')
     flask_app.register_blueprint(replay_bp, url_prefix='/api/replay')
+    flask_app.register_blueprint(system_bp, url_prefix='/api/system')
     
     
     
@@ -3,9 +3,9 @@
 import cv2
 import socketio
 from datetime import datetime, timezone
-import base64
-import numpy as np
+from queue import Queue, Empty, Full
 import logging
+import threading
 import time
 
 # Logging yapılandırması
@@ -15,8 +15,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _put_drop_oldest(q, item):
+    """Sınırlı kuyruğa ekler; kuyruk doluysa en eski öğeyi atar. Atılan öğe sayısını döner."""
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except Empty:
+                pass
+
+
 class VideoStreamClient:
-    def __init__(self, source_id, server_url='http://127.0.0.1:5000', batch_size=5):
+    """
+    Kaynağı (video dosyası veya kamera) sunucuya gönderen cihaz istemcisi.
+
+    Üç aşamalı boru hattı (pipeline), sınırlı kuyruklarla birbirine bağlıdır:
+      * capture thread: kareyi okur, yakalama anının zaman damgasını ve sıra numarasını verir
+      * encoder havuzu (`encoders` thread): resize + JPEG encode; OpenCV bu sırada GIL'i bırakır
+      * sender thread: kareleri `batch_size`'lık batch'ler halinde 'video_frame_batch' ile gönderir
+    Yavaş bir aşama diğerlerini bekletmez: kuyruk dolarsa en eski kare atılır, gönderim sırasında
+    `max_age` saniyeden eski kareler de atılır. Böylece uplink yavaşken istemci gerçek zamandan
+    geri düşmez; yakalama hızı sensör fps'inde kalır.
+    """
+
+    def __init__(self, source_id, server_url='http://127.0.0.1:5000', batch_size=5, encoders=2,
+                 queue_size=8, max_age=1.0, batch_wait=0.1, frame_size=(640, 480), jpeg_quality=85):
         self.source_id = source_id
         self.server_url = server_url
         self.frame_sequence_number = 0 # Frame sıra numarası
@@ -28,109 +57,222 @@ class VideoStreamClient:
         self.frame_time = 0
 
         self.batch_size = batch_size
-        self.frame_batch = []
+        self.encoders = max(1, encoders)
+        self.max_age = max_age
+        self.batch_wait = batch_wait
+        self.frame_size = frame_size
+        self.jpeg_quality = jpeg_quality
+        self.capture_queue = Queue(maxsize=queue_size)   # (ham kare, meta)
+        self.send_queue = Queue(maxsize=queue_size * 2)  # encode edilmiş kareler
+        self._sequence_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # Sayaçlar capture, encoder ve sender thread'lerinden güncellenir
+        self._threads = []
+        self.stats = {'captured': 0, 'encoded': 0, 'sent': 0, 'dropped_capture': 0, 'dropped_send': 0,
+                      'dropped_age': 0, 'encode_errors': 0}
+
+        self._redirect_url = None  # Sunucu ingest'i başka düğüme yönlendirdiyse (bkz. on_ingest_redirect)
+        self._redirecting = False
 
         self.sio.on('connect', self.on_connect)
         self.sio.on('disconnect', self.on_disconnect)
         self.sio.on('status', self.on_status)
+        self.sio.on('ingest_redirect', self.on_ingest_redirect)
 
     def on_connect(self):
         logger.info(f"Connected to server with ID: {self.sio.sid}")
         self.sio.emit('join', {'source_id': self.source_id})
-        self.stream_start_time = datetime.now(timezone.utc).timestamp() # Akış başladığında zamanı kaydet
-        self.frame_sequence_number = 0 # Bağlantı kurulduğunda sıra numarasını sıfırla
+        with self._sequence_lock:
+            self.stream_start_time = datetime.now(timezone.utc).timestamp() # Akış başladığında zamanı kaydet
+            self.frame_sequence_number = 0 # Bağlantı kurulduğunda sıra numarasını sıfırla
 
 
     def on_disconnect(self):
         logger.info("Disconnected from server")
-        self.stop()
+        if not self._redirecting:
+            self.stop()
 
     def on_status(self, data):
         logger.info(f"Status update: {data}")
-        
-        
-    def send_batch_if_ready(self):
-        if len(self.frame_batch) >= self.batch_size:
+
+    def on_ingest_redirect(self, data):
+        # Çok düğümlü sunucu: bu kaynağın ingest'i başka düğümde işleniyor
+        url = data.get('url')
+        if url and url != self.server_url:
+            logger.info(f"Ingest for {self.source_id} is owned by {data.get('node_id')}, reconnecting to {url}")
+            self._redirect_url = url
+
+    def connect_url(self):
+        # source_id sorgu parametresi, yük dengeleyicinin kaynağa göre (sticky) hash'lemesi içindir
+        return f"{self.server_url}?source_id={self.source_id}"
+
+    def reconnect_to_redirect(self):
+        url, self._redirect_url = self._redirect_url, None
+        self._redirecting = True
+        try:
             if self.sio.connected:
-                # logger.info(f"Emitting batch of {len(self.frame_batch)} frames for {self.source_id}")
-                logger.info(f"Emitting batch of {len(self.frame_batch)} frames for {self.source_id}")
-
-                self.sio.emit('video_frame_batch', { # Yeni event adı
-                    'source_id': self.source_id,
-                    'frames': list(self.frame_batch) # Batch'in bir kopyasını gönder
-                })
-                self.frame_batch.clear() # Batch'i temizle
-            else:
-                logger.warning("Socket not connected, cannot send batch. Clearing batch.")
-                self.frame_batch.clear()
-
-    def start(self, video_path):
+                self.sio.disconnect()
+            self.server_url = url
+            self.sio.connect(self.connect_url())
+        finally:
+            self._redirecting = False
+
+    # ------------------------------------------------------------ capture
+    def _next_frame_meta(self):
+        """Yakalama anının mutlak/göreceli zaman damgası ve sıra numarası."""
+        with self._sequence_lock:
+            self.frame_sequence_number += 1
+            captured_at = datetime.now(timezone.utc).timestamp()
+            return {
+                'sequence': self.frame_sequence_number,
+                'client_timestamp_abs': captured_at, # Mutlak Unix zaman damgası
+                'client_timestamp_rel': int((captured_at - self.stream_start_time) * 1000), # Akış başlangıcına göre milisaniye
+                'captured_monotonic': time.monotonic(), # Yaşa göre atma için; sunucuya gönderilmez
+            }
+
+    def _capture_loop(self, loop_video):
+        next_due = time.monotonic()
+        while self.is_running and self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                if not loop_video:
+                    logger.info("Capture source ended.")
+                    break
+                logger.info("End of video reached. Resetting to beginning.")
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+
+            self._count('captured')
+            self._count('dropped_capture', _put_drop_oldest(self.capture_queue, (frame, self._next_frame_meta())))
+
+            if loop_video:
+                # Dosya kaynağı kendi fps'inde okunur; kamera okuması zaten sensör hızında bloklar
+                next_due += self.frame_time
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.monotonic()
+
+    # ------------------------------------------------------------- encode
+    def _encode_loop(self):
+        while self.is_running:
+            try:
+                frame, meta = self.capture_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            try:
+                if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size)
+                ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+                if not ok:
+                    raise ValueError("JPEG encode failed")
+            except Exception as e:
+                self._count('encode_errors')
+                logger.warning(f"Frame {meta['sequence']} could not be encoded: {e}")
+                continue
+            self._count('encoded')
+            # Ham JPEG; Socket.IO binary attachment olarak gider
+            self._count('dropped_send', _put_drop_oldest(self.send_queue, dict(meta, frame=buffer.tobytes())))
+
+    # --------------------------------------------------------------- send
+    def _collect_batch(self):
+        """İlk kareden sonra en fazla `batch_wait` saniye veya `batch_size` kareye kadar toplar; eski kareleri atar."""
+        batch = []
+        deadline = None
+        while self.is_running and len(batch) < self.batch_size:
+            timeout = 0.1 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                payload = self.send_queue.get(timeout=timeout)
+            except Empty:
+                if deadline is None:
+                    continue
+                break
+            if time.monotonic() - payload.pop('captured_monotonic') > self.max_age:
+                self._count('dropped_age')
+                continue
+            batch.append(payload)
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_wait
+        return batch
+
+    def _send_loop(self):
+        while self.is_running:
+            if self._redirect_url:
+                self.reconnect_to_redirect()
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            if not self.sio.connected:
+                logger.warning(f"Socket not connected, dropping batch of {len(batch)} frames.")
+                continue
+            logger.debug(f"Emitting batch of {len(batch)} frames for {self.source_id}")
+            self.sio.emit('video_frame_batch', {
+                'source_id': self.source_id,
+                'frames': batch
+            })
+            self._count('sent', len(batch))
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def get_stats(self):
+        """Sayaçların tutarlı bir kopyası."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _log_stats_loop(self, interval=10.0):
+        while self.is_running:
+            time.sleep(interval)
+            logger.info(f"Stream stats for {self.source_id}: {self.get_stats()}, "
+                        f"capture_queue={self.capture_queue.qsize()}, send_queue={self.send_queue.qsize()}")
+
+    def start(self, video_path, loop_video=None):
+        """
+        Akışı başlatır ve capture bitene (veya stop çağrılana) kadar bekler.
+        video_path bir dosya yolu, kamera indisi veya akış URL'si olabilir; loop_video verilmezse
+        dosyalar sona gelindiğinde başa sarılır.
+        """
         try:
             self.cap = cv2.VideoCapture(video_path)
             if not self.cap.isOpened():
-                raise Exception(f"Could not open video file: {video_path}")
+                raise Exception(f"Could not open video source: {video_path}")
+            if loop_video is None:
+                loop_video = isinstance(video_path, str) and '://' not in video_path
 
             self.fps = self.cap.get(cv2.CAP_PROP_FPS)
             if self.fps <= 0:
                 self.fps = 25  # Varsayılan FPS
             self.frame_time = 1.0 / self.fps
-            logger.info(f"Video FPS: {self.fps}")
+            logger.info(f"Video FPS: {self.fps}, encoders: {self.encoders}")
 
-            self.sio.connect(self.server_url)
+            self.sio.connect(self.connect_url())
             self.is_running = True
-            self.frame_batch.clear() # Akış başlarken batch'i temizle
-
-            while self.is_running and self.cap.isOpened():
-                loop_start_time = datetime.now(timezone.utc).timestamp()
 
-                ret, frame = self.cap.read()
-                if not ret:
-                    logger.info("End of video reached. Resetting to beginning.")
-                    self.send_batch_if_ready()
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    continue
+            self._threads = [threading.Thread(target=self._encode_loop, name=f"encoder-{i}", daemon=True)
+                             for i in range(self.encoders)]
+            self._threads.append(threading.Thread(target=self._send_loop, name="sender", daemon=True))
+            self._threads.append(threading.Thread(target=self._log_stats_loop, name="stream-stats", daemon=True))
+            for thread in self._threads:
+                thread.start()
 
-                # Frame işleme zamanını yakala (yaklaşık)
-                # Daha kesin bir timestamp için frame'in video kaynağından alındığı an kullanılabilir (mümkünse)
-                current_client_timestamp_abs = datetime.now(timezone.utc).timestamp()
-                current_client_timestamp_rel = int((current_client_timestamp_abs - self.stream_start_time) * 1000) # Milisaniye cinsinden göreceli
-                
-                
-                frame = cv2.resize(frame, (640, 480))
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                
-                self.frame_sequence_number += 1
-
-                payload = {
-                    'frame_b64': frame_base64,
-                    'sequence': self.frame_sequence_number,
-                    'client_timestamp_abs': current_client_timestamp_abs, # Mutlak Unix zaman damgası
-                    'client_timestamp_rel': current_client_timestamp_rel   # Akış başlangıcına göre milisaniye
-                }
-                self.frame_batch.append(payload)
-                self.send_batch_if_ready()
-
-                processing_time = datetime.now(timezone.utc).timestamp() - loop_start_time
-                sleep_duration = self.frame_time - processing_time
-                if sleep_duration > 0:
-                    time.sleep(sleep_duration)
-                # else:
-                #     logger.warning(f"Processing time ({processing_time:.4f}s) exceeded frame time ({self.frame_time:.4f}s). No sleep.")
+            # Capture bu thread'de çalışır; KeyboardInterrupt çağırana ulaşır
+            self._capture_loop(loop_video)
         except socketio.exceptions.ConnectionError as e:
             logger.error(f"Socket.IO ConnectionError: {e}. Server might be down or unreachable.")
         except Exception as e:
             logger.error(f"Error in video stream: {e}")
         finally:
-            if self.is_running and len(self.frame_batch) > 0: # Durdurulurken kalan frame'ler varsa gönder
-                logger.info(f"Sending remaining {len(self.frame_batch)} frames before stopping.")
-                self.send_batch_if_ready() # Bu aslında tüm batch'i göndermeyebilir, batch_size kontrolü var.
-                                          # Doğrudan self.sio.emit ile kalanları göndermek daha iyi olabilir.
-                                          # Veya send_batch_if_ready'yi buna göre modifiye et.
             self.stop()
 
     def stop(self):
         self.is_running = False
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self._threads = []
         if self.cap:
             self.cap.release()
         if self.sio.connected:
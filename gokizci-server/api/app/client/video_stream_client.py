@@ -15,6 +15,9 @@ def main():
     parser = argparse.ArgumentParser(description='Simulate a device source using test_video.mp4')
     parser.add_argument('--source-id', required=True, help='Unique source ID for the device')
     parser.add_argument('--server', default='http://127.0.0.1:5000', help='Server URL')
+    parser.add_argument('--encoders', type=int, default=2, help='JPEG encoder threads')
+    parser.add_argument('--batch-size', type=int, default=5, help='Frames per video_frame_batch')
+    parser.add_argument('--max-age-ms', type=float, default=1000, help='Drop frames older than this when the uplink is slow')
 
     args = parser.parse_args()
 
@@ -33,7 +36,10 @@ def main():
 
     client = VideoStreamClient(
         source_id=args.source_id,
-        server_url=args.server
+        server_url=args.server,
+        batch_size=args.batch_size,
+        encoders=args.encoders,
+        max_age=args.max_age_ms / 1000.0
     )
 
     try:
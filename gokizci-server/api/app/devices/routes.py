@@ -3,8 +3,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
-from models.device import Device
-from models.video_segment import VideoSegment
+from mongoengine import ValidationError
+from models.device import Device, RetentionPolicy
+from app.extensions import get_jitter_stats
+from app.storage.base import get_segment_store
+from app.storage.retention import resolve_retention
 import uuid
 
 device_bp = Blueprint('devices', __name__)
@@ -31,13 +34,63 @@ def get_devices():
 @jwt_required()
 def get_device_segments(device_id):
     one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-    segments = VideoSegment.objects(
-        source_id=device_id,
-        timestamp__gte=one_hour_ago
-    ).order_by('-timestamp')
+    segments = get_segment_store().iter_frames(device_id, one_hour_ago, include_frames=False)
 
     return jsonify({
-        'segments': [segment.to_dict() for segment in segments]
+        'segments': [
+            {
+                'id': segment['id'],
+                'source_id': device_id,
+                'timestamp': segment['timestamp'].isoformat(),
+                'anomaly_detected': segment['anomaly_detected'],
+                'confidence': segment['confidence']
+            }
+            for segment in reversed(list(segments))  # En yeniden eskiye
+        ]
+    })
+
+@device_bp.route('/<device_id>/stream/stats', methods=['GET'])
+@jwt_required()
+def get_device_stream_stats(device_id):
+    """Canlı yayın sıralama tamponunun derinliği ve atlanan/düşürülen kare sayaçları."""
+    return jsonify({
+        'source_id': device_id,
+        'jitter_buffer': get_jitter_stats(device_id)
+    })
+
+@device_bp.route('/<device_id>/retention', methods=['GET'])
+@jwt_required()
+def get_device_retention(device_id):
+    device = Device.objects(source_id=device_id).only('source_id', 'retention').first()
+    if not device:
+        return jsonify({'error': 'Device not found'}), 404
+    return jsonify({
+        'source_id': device_id,
+        'policy': device.retention.to_dict() if device.retention else None,
+        'effective': resolve_retention(device.retention)
+    })
+
+@device_bp.route('/<device_id>/retention', methods=['PUT'])
+@jwt_required()
+def update_device_retention(device_id):
+    """Gövde: full_rate_hours, keyframe_days, keyframe_fps, anomaly_days (boş alanlar varsayılana döner)."""
+    device = Device.objects(source_id=device_id).first()
+    if not device:
+        return jsonify({'error': 'Device not found'}), 404
+    data = request.get_json() or {}
+    fields = ('full_rate_hours', 'keyframe_days', 'keyframe_fps', 'anomaly_days')
+    try:
+        policy = RetentionPolicy(**{field: data[field] for field in fields if data.get(field) is not None})
+        policy.validate()
+    except (ValidationError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    device.retention = policy
+    device.updated_at = datetime.utcnow()
+    device.save()
+    return jsonify({
+        'source_id': device_id,
+        'policy': policy.to_dict(),
+        'effective': resolve_retention(policy)
     })
 
 @device_bp.route('', methods=['POST'])
@@ -1,13 +1,20 @@
 """api/app/extensions.py"""
 
+import base64
 import eventlet
-from eventlet import tpool
 from flask_socketio import SocketIO
 from .utils.video_processing import process_video_frame # .utils varsayımıyla
-from models.video_segment import VideoSegment
 from datetime import datetime, timezone # <--- timezone'u import edin
+from .utils.jitter_buffer import JitterBuffer
+from .storage.segment_writer import get_segment_writer
+from .storage.thumbnails import get_thumbnail_indexer
+from .inference.admission import get_admission_controller
+from .socket.fanout import get_live_fanout
+from .socket.renditions import PREVIEW, full_rooms, get_preview_scheduler, rendition_room
+from .inference.engine import get_engine
+from .inference.observer import get_window_observer
+from .settings import Config
 import threading
-from collections import OrderedDict
 import time
 import logging
 
@@ -22,107 +29,107 @@ socketio = SocketIO(
 WORKER_COUNT = 32
 pool = eventlet.GreenPool(size=WORKER_COUNT)
 
-# Thread-safe frame işleme için lock
-frame_processing_lock = threading.Lock() # Bu global lock performansı etkileyebilir, dikkatli kullanılmalı
-
-# Her kaynak için frame sıralaması
-frame_sequences = {}
-sequence_locks = {} # Her kaynak için ayrı lock daha iyi olabilir
-
-def get_or_create_sequence(source_id: str):
-    # Bu fonksiyon thread-safe değil, dikkatli olunmalı.
-    # sequence_locks[source_id] = threading.Lock() kısmı her çağrıda yeni lock oluşturur.
-    # Daha iyi bir yaklaşım:
-    if source_id not in sequence_locks:
-        sequence_locks[source_id] = threading.Lock() # Kaynağa özel lock
-    if source_id not in frame_sequences:
-        frame_sequences[source_id] = OrderedDict()
-    return frame_sequences[source_id], sequence_locks[source_id]
-
-"""
-def _process_frame_job(source_id: str, frame_payload: dict): # Artık tüm payload'ı alıyoruz
-    """"""
-    Frame işleme ve sıralama.
-    frame_payload: {'source_id': ..., 'frame': b64_str, 'sequence': int, 'client_timestamp_abs': float, 'client_timestamp_rel': int}
-    """"""
-    try:
-        frame_b64 = frame_payload.get('frame')
-        client_sequence = frame_payload.get('sequence')
-        client_ts_abs = frame_payload.get('client_timestamp_abs')
-        # client_ts_rel = frame_payload.get('client_timestamp_rel') # Bu da kullanılabilir
-
-        if not frame_b64:
-            print(f"Missing frame data in payload for {source_id}", flush=True)
-            return
-
-        # Global lock yerine, kaynağa özel bir lock veya daha az kısıtlayıcı bir mekanizma düşünülebilir.
-        with frame_processing_lock:
-            result = tpool.execute(process_video_frame, source_id, frame_b64)
-            if not result:
-                return
-
-            # Veritabanı için timestamp: İstemciden gelen mutlak zaman damgasını kullanmak daha doğru olabilir
-            # Eğer istemci ve sunucu saatleri senkronize ise. Değilse, sunucu zamanı (time.time()) tercih edilebilir.
-            # Şimdilik sunucu zamanını kullanalım ama istemci zamanını da loglayabiliriz.
-            server_received_unix_ts = time.time()
-            db_timestamp_utc = datetime.fromtimestamp(server_received_unix_ts, tz=timezone.utc)
-            
-            # Eğer istemci zamanını kullanmak isterseniz:
-            # if client_ts_abs:
-            #    db_timestamp_utc = datetime.fromtimestamp(client_ts_abs, tz=timezone.utc)
-
-            segment = VideoSegment(
-                source_id=source_id,
-                frame_data=frame_b64.encode('utf-8'), # frame_b64 string ise
-                timestamp=db_timestamp_utc,
-                anomaly_detected=result['anomaly_detected'],
-                confidence=result.get('confidence', 0.0)
-                # İsterseniz client_sequence ve client_ts_rel'i de buraya kaydedebilirsiniz
-            )
-            tpool.execute(segment.save)
-
-            frames_for_source, source_specific_lock = get_or_create_sequence(source_id)
-            with source_specific_lock:
-                # Sıralama için istemci sıra numarasını veya zaman damgasını kullanabiliriz.
-                # Unix timestamp (float) hala iyi bir anahtar olabilir.
-                # Ya da (client_sequence, server_received_unix_ts) gibi bir tuple.
-                # Şimdilik server_received_unix_ts'i kullanalım, çünkü bu artan ve benzersiz olmaya daha yakın.
-                
-                key_for_ordering = server_received_unix_ts # Veya client_sequence
-
-                frames_for_source[key_for_ordering] = {
-                    'source_id': source_id,
-                    'frame': result['frame'], # AI modelinden gelen frame
-                    'server_timestamp_iso': db_timestamp_utc.isoformat(), # Sunucu zamanı (ISO)
-                    'client_sequence': client_sequence,
-                    # 'client_timestamp_rel': client_ts_rel, # İsteğe bağlı
-                    'anomaly_detected': result['anomaly_detected'],
-                    'confidence': result.get('confidence')
-                }
-                
-                # Sıralı gönderim (OrderedDict en eski ekleneni (en düşük anahtar) önce verir)
-                while frames_for_source:
-                    oldest_key = next(iter(frames_for_source))
-                    # Bu kontrol, eğer key_for_ordering her zaman artıyorsa (örn: time.time())
-                    # ve tek bir thread ekleme yapıyorsa (source_specific_lock sayesinde)
-                    # aslında if oldest_key <= key_for_ordering: her zaman doğru olur.
-                    # Ama birden fazla worker aynı anda bu bloğa girebilseydi önemli olurdu.
-                    # Şimdilik mantığı koruyalım.
-                    if oldest_key <= key_for_ordering:
-                        frame_to_emit = frames_for_source.pop(oldest_key)
-                        socketio.emit('processed_frame', frame_to_emit, room=source_id)
-                    else:
-                        break
-    except Exception as e:
-        print(f"Frame processing error in _process_frame_job for {source_id} (seq: {frame_payload.get('sequence')}): {e}", flush=True)
-    finally:
-        eventlet.sleep(0)
-"""
-
-def _process_single_frame_from_batch(source_id: str, frame_data_in_batch: dict):
+# Her kaynak için canlı yayın yeniden sıralama tamponu (bkz. utils/jitter_buffer.py)
+jitter_buffers = {}
+jitter_locks = {} # Emit sırasını korumak için kaynağa özel lock
+
+def get_or_create_jitter_buffer(source_id: str):
+    # Green thread'ler arasında yield olmadan çalışır; setdefault ile tek örnek garanti edilir.
+    buffer = jitter_buffers.get(source_id)
+    if buffer is None:
+        buffer = jitter_buffers.setdefault(source_id, JitterBuffer(
+            reorder_window=Config.JITTER_REORDER_WINDOW,
+            max_latency=Config.JITTER_MAX_LATENCY_MS / 1000.0
+        ))
+        jitter_locks.setdefault(source_id, threading.Lock())
+    return buffer, jitter_locks[source_id]
+
+def get_jitter_stats(source_id: str):
+    buffer = jitter_buffers.get(source_id)
+    return buffer.stats() if buffer else None
+
+def reset_jitter_buffer(source_id: str):
+    buffer = jitter_buffers.get(source_id)
+    if buffer:
+        buffer.reset()
+
+def _emit_in_order(source_id: str, frames: list):
+    # Newest-wins: tampon birikmiş kareleri bir anda bırakırsa canlı görüntü geride kalmasın diye
+    # yalnızca en yeni LIVE_MAX_BURST kare gönderilir (hepsi zaten kaydedildi)
+    max_burst = max(1, Config.LIVE_MAX_BURST)
+    if len(frames) > max_burst:
+        get_admission_controller().record_live_drop(source_id, len(frames) - max_burst)
+        frames = frames[-max_burst:]
+    for frame_to_emit in frames:
+        logger.debug(f"[_PROCESSOR] Emitting 'processed_frame' to web. Source: {source_id}, ClientSeq: {frame_to_emit.get('client_sequence')}")
+        _publish_live(source_id, frame_to_emit)
+
+def _publish_live(source_id: str, payload: dict):
+    """Tam kareyi 'source_id' ve 'source_id:full' odalarına, varsa önizlemeyi 'source_id:preview' odasına gönderir."""
+    fanout = get_live_fanout()
+    preview = payload.pop('preview_frame', None)
+    fanout.publish(full_rooms(source_id), 'processed_frame', payload) # Oda başına tek encode
+    if preview is not None:
+        _publish_preview(source_id, payload, preview)
+
+def _publish_preview(source_id: str, payload: dict, preview: bytes):
+    get_live_fanout().publish(rendition_room(source_id, PREVIEW), 'processed_frame',
+                              dict(payload, frame=preview, rendition=PREVIEW))
+
+def _observe_shed_frame(source_id: str, frame_bytes: bytes, ticket, preview, payload: dict):
+    """
+    Inference'ı atlanan karenin decode işlerini (pencere, önizleme) handler dışına, sınırlı
+    WindowObserver kuyruğuna bırakır. Kare yalnızca beklenen bir sonraki klibe girecekse pencere
+    için decode edilir; gerekmiyorsa bileti hemen kapatılır. Bilet artık çağıranda değildir (None döner).
+    """
+    engine = get_engine()
+    if ticket is not None and not get_admission_controller().needed_for_window(source_id, engine.clip_length):
+        engine.release(ticket)
+        ticket = None
+    if ticket is None and preview is None:
+        return None
+    on_preview = None
+    if preview is not None:
+        live = {key: value for key, value in payload.items() if key != 'preview_frame'}
+        on_preview = lambda preview_bytes: _publish_preview(source_id, live, preview_bytes)
+    get_window_observer().submit(source_id, frame_bytes, ticket=ticket, preview=preview, on_preview=on_preview)
+    return None
+
+def _jitter_flush_loop():
+    """Yeni kare gelmese de deadline'ı geçen boşlukları atlayıp bekleyen kareleri gönderir."""
+    interval = Config.JITTER_MAX_LATENCY_MS / 2000.0
+    while True:
+        eventlet.sleep(interval)
+        for source_id, buffer in list(jitter_buffers.items()):
+            if not len(buffer):
+                continue
+            with jitter_locks[source_id]:
+                _emit_in_order(source_id, buffer.flush())
+
+_jitter_flusher = None
+
+def start_jitter_flusher():
+    global _jitter_flusher
+    if _jitter_flusher is None:
+        _jitter_flusher = eventlet.spawn(_jitter_flush_loop)
+
+def _process_single_frame_from_batch(source_id: str, frame_data_in_batch: dict, run_inference: bool = True,
+                                     ticket=None):
+    """
+    Kareyi kaydeder ve canlı yayına verir. run_inference=False ise (kabul kontrolü inference'ı
+    atladıysa, bkz. inference/admission.py) kare burada decode edilmez ve skorlanmaz: depoya
+    anomaly_detected=None (skorlanmamış) olarak segment writer kuyruğundan yazılır, canlı yayında
+    kaynağın son sonucu gösterilir; pencere/önizleme decode'u WindowObserver'a bırakılır.
+    `ticket`: handler'ın geliş sırasında aldığı pencere bileti (bkz. InferenceEngine.take_ticket).
+    """
     client_sequence = frame_data_in_batch.get('sequence', 'N/A') # Log için alalım
+    admission = get_admission_controller()
+    result = None
     try:
-        frame_b64 = frame_data_in_batch.get('frame_b64')
+        # Ham JPEG bytes (Socket.IO binary attachment); eski istemciler için base64 fallback
+        frame_bytes = frame_data_in_batch.get('frame')
+        if frame_bytes is None and frame_data_in_batch.get('frame_b64'):
+            frame_bytes = base64.b64decode(frame_data_in_batch['frame_b64'])
         client_ts_abs = frame_data_in_batch.get('client_timestamp_abs')
         client_ts_rel = frame_data_in_batch.get('client_timestamp_rel') # İstemciden gelen göreceli zaman damgasını al
 
@@ -131,126 +138,82 @@ def _process_single_frame_from_batch(source_id: str, frame_data_in_batch: dict):
             # Burada bir varsayılan değer atayabilir veya frame'i işlemeyebilirsiniz.
             # Şimdilik, eğer VideoStream.tsx'in buna ihtiyacı varsa, bu frame'in atlanmasına neden olabilir.
             
-        if not frame_b64 or client_ts_abs is None:
-            logger.warning(f"[_PROCESSOR] Missing frame_b64 in batch frame. Source: {source_id}, ClientSeq: {client_sequence}")
+        if not frame_bytes or client_ts_abs is None:
+            logger.warning(f"[_PROCESSOR] Missing frame data in batch frame. Source: {source_id}, ClientSeq: {client_sequence}")
             return
 
+        # Önizleme (düşük çözünürlük, düşük fps) yalnızca önizleme odasını izleyen varsa üretilir
+        previews = get_preview_scheduler()
+        want_preview = (get_live_fanout().has_subscribers(rendition_room(source_id, PREVIEW))
+                        and previews.due(source_id, client_ts_abs))
+
         # AI İşleme
-        result = process_video_frame(source_id, frame_b64)
-        if not result: return    
+        preview_frame = None
+        if run_inference:
+            ticket, window_ticket = None, ticket  # Bilet process'e verildi; o kapatır
+            # Önizleme inference için zaten yapılan decode'dan üretilir
+            result = process_video_frame(source_id, frame_bytes, preview=previews.options if want_preview else None,
+                                         ticket=window_ticket)
+            if not result: return
+            preview_frame = result.get('preview')
+        else:
+            # Atlanan kare burada decode edilmez (bkz. _observe_shed_frame)
+            result = admission.carried_result(source_id)
         
          # DB Kaydı
         db_timestamp_utc = datetime.fromtimestamp(client_ts_abs, tz=timezone.utc)
             
-        segment = VideoSegment(
-            source_id=source_id,
-            frame_data=frame_b64.encode('utf-8'),
-            timestamp=db_timestamp_utc,
-            anomaly_detected=result['anomaly_detected'],
-            confidence=result.get('confidence', 0.0),
-            # client_sequence=client_sequence # DB'ye de eklenebilir
-        )
-        tpool.execute(segment.save) # DB kaydını da tpool'a veriyoruz
-
+        # Inference'ı atlanan kare skorlanmamış (None) olarak kaydedilir; taşınan sonuç yalnızca canlı
+        # yayında gösterilir, anomali sayaçlarına, küçük resimlere ve saklama kararlarına girmez
+        stored_anomaly = result['anomaly_detected'] if run_inference else None
+        segment_record = {
+            'source_id': source_id,
+            'timestamp': db_timestamp_utc,
+            'frame': frame_bytes, # Ham JPEG, yeniden encode edilmeden
+            'anomaly_detected': stored_anomaly,
+            'confidence': result.get('confidence', 0.0) if run_inference else None,
+        }
+        get_segment_writer().write(segment_record) # Toplu, asenkron yazım (bkz. storage/segment_writer.py)
+        get_thumbnail_indexer().offer(source_id, db_timestamp_utc, frame_bytes, bool(stored_anomaly)) # Dilim başına bir küçük resim
+
+
+        # Sıralama ve Web'e Gönderme
+        payload_to_web = {
+            'source_id': source_id,
+            'frame': frame_bytes, # Ham JPEG bytes, binary attachment olarak gider
+            'server_timestamp_iso': db_timestamp_utc.isoformat(),
+            'client_sequence': client_sequence,
+            'client_timestamp_abs': client_ts_abs,
+            'client_timestamp_rel': client_ts_rel,
+            'anomaly_detected': result['anomaly_detected'],
+            'confidence': result.get('confidence'),
+            'inferred': run_inference,
+            'inference_fps': admission.inference_fps(source_id),
+            'preview_frame': preview_frame,
+        }
+
+        if not run_inference:
+            ticket = _observe_shed_frame(source_id, frame_bytes, ticket,
+                                         previews.options if want_preview else None, payload_to_web)
+
+        if not isinstance(client_sequence, int):
+            # Sıra numarası yoksa yeniden sıralama yapılamaz, doğrudan gönder
+            _publish_live(source_id, payload_to_web)
+            return
 
-            # Sıralama ve Web'e Gönderme
-        frames_for_source, source_specific_lock = get_or_create_sequence(source_id)
-        
+        jitter_buffer, source_specific_lock = get_or_create_jitter_buffer(source_id)
+        start_jitter_flusher()
         with source_specific_lock:
-            key_for_ordering = client_ts_abs # İstemci zaman damgası ile sırala
-
-            payload_to_web = {
-                'source_id': source_id,
-                'frame': result['frame'], # AI modelinden gelen (muhtemelen base64)
-                'server_timestamp_iso': db_timestamp_utc.isoformat(),
-                'client_sequence': client_sequence,
-                'client_timestamp_abs': client_ts_abs,
-                'client_timestamp_rel': client_ts_rel,
-                'anomaly_detected': result['anomaly_detected'],
-                'confidence': result.get('confidence')
-            }
-            frames_for_source[key_for_ordering] = payload_to_web
-            logger.debug(f"[_PROCESSOR] Frame added to ordering queue. Source: {source_id}, ClientSeq: {client_sequence}, QueueSize: {len(frames_for_source)}")
-            
-            while frames_for_source:
-                # OrderedDict anahtarları zaten eklendikleri sırayla tutar.
-                # Eğer anahtarlar (client_ts_abs) her zaman artan sırada eklenmiyorsa
-                # (farklı green thread'ler farklı zamanlarda bitirebileceği için),
-                # en düşük anahtarlı olanı almak için OrderedDict'i yeniden sıralamamız gerekir
-                # veya farklı bir veri yapısı (örn: heapq veya SortedDict) kullanmamız gerekir.
-
-                # Python 3.7+ OrderedDict ekleme sırasını korur.
-                # Anahtarlar (client_ts_abs) float olduğu için, OrderedDict'in anahtarlarını
-                # alıp sıralayarak en küçüğünü bulabiliriz.
-                
-                # En düşük anahtarı (en eski client_timestamp_abs) bul
-                if not frames_for_source: # Ekstra kontrol
-                    break
-                 # OrderedDict'in anahtarları üzerinde sıralama yaparak en küçüğünü almak yerine,
-                # OrderedDict'in kendisi zaten ekleme sırasını koruduğu için,
-                # ve biz client_ts_abs'yi anahtar olarak kullandığımız için,
-                # eğer greenlet'ler client_ts_abs sırasına yakın bir sırada ekleme yapıyorsa,
-                # next(iter(frames_for_source.keys())) genellikle en eskiyi verir.
-                # Ancak greenlet'lerin bitiş sırası garanti olmadığından, bu varsayım risklidir.
-
-                # Doğru ve güvenli yöntem: Kuyruktaki tüm anahtarların en küçüğünü bul.
-                # Bu, OrderedDict için çok verimli olmayabilir eğer sık sık yapılıyorsa.
-                # Daha iyi bir yapı SortedDict (örn: sortedcontainers kütüphanesinden) veya heapq olabilir.
-                # Şimdilik basit bir yaklaşımla devam edelim:
-                
-                # YAKLAŞIM 1: OrderedDict'i her seferinde sıralı anahtarlara göre işle (daha az verimli ama doğru)
-                # oldest_key = min(frames_for_source.keys()) # Bu, tüm key'ler üzerinde iterasyon yapar
-
-                # YAKLAŞIM 2: OrderedDict'in ilk elemanını al (ekleme sırasına göre)
-                # Bu, greenlet'lerin kabaca sıralı bittiği varsayımına dayanır.
-                # Loglardaki ClientSeq karışıklığı, bu varsayımın her zaman doğru olmadığını gösteriyor.
-                # ANCAK, OrderedDict'e client_ts_abs anahtarıyla ekleme yapıyoruz.
-                # OrderedDict, anahtarları sıralı tutmaz, ekleme sırasını korur.
-                # Bu yüzden, emit etmeden önce anahtarlara göre sıralanmış bir görünüm elde etmeliyiz.
+            ready_frames = jitter_buffer.push(client_sequence, payload_to_web)
+            logger.debug(f"[_PROCESSOR] Frame added to jitter buffer. Source: {source_id}, ClientSeq: {client_sequence}, Depth: {len(jitter_buffer)}")
+            _emit_in_order(source_id, ready_frames)
 
-                # DÜZELTİLMİŞ MANTIK:
-                # Kuyruktaki en düşük client_ts_abs'ye sahip frame'i bul ve gönder.
-                # Bu, kuyrukta birden fazla frame biriktiğinde doğru sıralamayı sağlar.
-                
-                # Eğer kuyrukta eleman varsa
-                # Anahtarları (client_ts_abs) al ve en küçüğünü bul.
-                # Bu, kuyruğun her zaman en eski frame'i göndermesini sağlar.
-                # Not: Bu, OrderedDict'in O(1) erişim avantajını biraz azaltır,
-                # ama sıralı gönderim için gereklidir.
-                # Daha performanslı bir çözüm için priority queue (heapq) düşünülebilir.
-                
-                # En basit ve anlaşılır yol:
-                # OrderedDict'in anahtarları zaten eklendikleri sırayla gelir.
-                # Eğer biz her zaman en düşük client_ts_abs'li olanı istiyorsak,
-                # ve greenlet'ler karışık sırada bitiriyorsa, OrderedDict'in ilk elemanı
-                # her zaman en düşük client_ts_abs'li olmayabilir.
-                
-                # GERÇEK ÇÖZÜM:
-                # OrderedDict'i (source_id için olan) anahtarlarına göre sıralanmış bir listeye çevirip
-                # ilk elemanı almak ve onu OrderedDict'ten çıkarmak.
-                
-                # Anahtarları (client_ts_abs) sıralı bir şekilde al
-                sorted_keys = sorted(list(frames_for_source.keys()))
-                if not sorted_keys: # Kuyruk boşaldıysa (başka bir thread tarafından)
-                    break
-                # Sıralı anahtarların en küçüğünü al
-                oldest_key = sorted_keys[0]
-                
-                # TODO: Burada bir "threshold" eklenebilir.
-                # Eğer oldest_key, o anki zamana göre çok eskiyse (belirli bir gecikme eşiğini aştıysa)
-                # veya kuyruk boyutu çok büyüdüyse, birden fazla frame gönderilebilir (catch-up).
-                # Şimdilik sadece en eskiyi gönderiyoruz.
-                frame_to_emit = frames_for_source.pop(oldest_key)
-                emit_client_seq = frame_to_emit.get('client_sequence', 'N/A')
-                logger.info(f"[_PROCESSOR] Emitting 'processed_frame' to web. Source: {source_id}, ClientSeq: {emit_client_seq}, EmitKey (client_ts_abs): {oldest_key:.4f}, QueueSize after pop: {len(frames_for_source)}")
-                socketio.emit('processed_frame', frame_to_emit, room=source_id)
-                # Bu if koşulu genellikle gereksiz olacak çünkü OrderedDict zaten sıralı
-                # if oldest_key > key_for_ordering: # Eğer bir şekilde daha yeni bir frame emit etmeye çalışırsak (olmamalı)
-                #     logger.warning(f"[_PROCESSOR] Attempted to emit a frame (key {oldest_key}) newer than current processing key ({key_for_ordering}). This should not happen with OrderedDict.")
-                #     frames_for_source[oldest_key] = frame_to_emit # Geri koy
-                #     break
-                                
     except Exception as e:
         logger.error(f"[_PROCESSOR] Error processing single frame. Source: {source_id}, ClientSeq: {client_sequence}, Error: {e}", exc_info=True)
     finally:
+        if ticket is not None:
+            # Kare pencereye ulaşmadan bırakıldı; sonraki kareler bu bileti beklememeli
+            get_engine().release(ticket)
+        if run_inference:
+            admission.done(source_id, result)
         eventlet.sleep(0) # Eventlet'e kontrolü bırak
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""api/app/inference/admission.py"""
+
+import logging
+import time
+from collections import deque
+
+from app.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SourceAdmission:
+    """Bir kaynağın inference yük durumu: işlenmekte olan kareler, seyreltme adımı ve etkin fps."""
+
+    def __init__(self, fps_window):
+        self.pending = 0          # Inference'ı süren kareler
+        self.counter = 0          # Gelen kare sayacı (seyreltme adımı için)
+        self.last_result = None   # Son inference sonucu (atlanan karelerin canlı gösterimi için)
+        self.fps_window = fps_window
+        self._completed = deque() # Son `fps_window` saniyede biten inference'ların anları
+        self.stats = {'received': 0, 'inferred': 0, 'shed': 0, 'live_dropped': 0}
+
+    def record_done(self, now):
+        self._completed.append(now)
+        self._expire(now)
+
+    def _expire(self, now):
+        while self._completed and now - self._completed[0] > self.fps_window:
+            self._completed.popleft()
+
+    def inference_fps(self, now=None):
+        self._expire(time.monotonic() if now is None else now)
+        return len(self._completed) / self.fps_window
+
+
+class AdmissionController:
+    """
+    Kaynak başına inference kabul kontrolü (admission control).
+
+    Her kare kaydedilir ve canlı yayına gider; inference ise yalnızca kabul edilen karelerde çalışır:
+      * kaynağın bekleyen inference'ı `target_pending`'in altındaysa her kare işlenir
+      * üstündeyse her `1 + pending // target_pending` karede bir kare işlenir (seyreltme)
+      * `max_pending`'e ulaşıldıysa veya ortak havuzda yer yoksa inference atlanır
+    Atlanan kareler skorlanmamış olarak (anomaly_detected=None) kaydedilir; canlı yayında yalnızca
+    gösterim için kaynağın son inference sonucu taşınır (bkz. carried_result).
+    Böylece bir kaynağın birikmesi diğer kaynakları ve canlı gecikmeyi etkilemez.
+    """
+
+    def __init__(self, max_pending=16, target_pending=4, fps_window=5.0):
+        self.max_pending = max_pending
+        self.target_pending = max(1, target_pending)
+        self.fps_window = fps_window
+        self._sources = {}  # source_id -> SourceAdmission
+
+    def _source(self, source_id):
+        state = self._sources.get(source_id)
+        if state is None:
+            state = self._sources[source_id] = SourceAdmission(self.fps_window)
+        return state
+
+    def stride(self, source_id):
+        """Şu anki seyreltme adımı: her kaç karede bir inference yapılacağı."""
+        return 1 + self._source(source_id).pending // self.target_pending
+
+    def admit(self, source_id, capacity=True):
+        """
+        Kare için inference yapılıp yapılmayacağına karar verir. True dönerse çağıran, iş bitince
+        `done` çağırmalıdır. `capacity`: ortak işleme havuzunda yer olup olmadığı.
+        """
+        state = self._source(source_id)
+        state.stats['received'] += 1
+        index = state.counter
+        state.counter += 1
+        if not capacity or state.pending >= self.max_pending or index % self.stride(source_id):
+            state.stats['shed'] += 1
+            return False
+        state.pending += 1
+        return True
+
+    def done(self, source_id, result):
+        """Kabul edilen karenin inference'ı bitti (result None ise başarısız)."""
+        state = self._source(source_id)
+        state.pending = max(0, state.pending - 1)
+        if result:
+            state.last_result = result
+            state.stats['inferred'] += 1
+            state.record_done(time.monotonic())
+
+    def needed_for_window(self, source_id, clip_length):
+        """
+        Son atlanan kare, seyreltme adımına göre beklenen bir sonraki kabul edilen karenin klibine
+        (ondan önceki `clip_length` kare) girer mi? Girmeyen kareler pencere için decode edilmez.
+        """
+        stride = self.stride(source_id)
+        index = self._source(source_id).counter - 1
+        return stride - index % stride <= clip_length
+
+    def carried_result(self, source_id):
+        """
+        Inference'ı atlanan karenin canlı yayında gösterilecek sonucu: kaynağın son sonucu (yoksa
+        anomali yok). Yalnızca canlı gösterim içindir; depoya yazılmaz, anomali sayaçlarına girmez.
+        """
+        last = self._source(source_id).last_result or {}
+        return {
+            'anomaly_detected': bool(last.get('anomaly_detected', False)),
+            'confidence': last.get('confidence', 0.0),
+        }
+
+    def record_live_drop(self, source_id, count):
+        self._source(source_id).stats['live_dropped'] += count
+
+    def inference_fps(self, source_id):
+        return round(self._source(source_id).inference_fps(), 2)
+
+    def reset_source(self, source_id):
+        self._sources.pop(source_id, None)
+
+    def get_stats(self):
+        return {
+            source_id: dict(state.stats, pending=state.pending, stride=self.stride(source_id),
+                            inference_fps=round(state.inference_fps(), 2))
+            for source_id, state in list(self._sources.items())
+        }
+
+
+_controller = None
+
+
+def get_admission_controller():
+    """Süreç başına tek AdmissionController örneği."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_pending=Config.INGEST_MAX_PENDING_PER_SOURCE,
+            target_pending=Config.INGEST_TARGET_PENDING_PER_SOURCE,
+            fps_window=Config.INFERENCE_FPS_WINDOW_SECONDS,
+        )
+    return _controller
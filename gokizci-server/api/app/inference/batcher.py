@@ -0,0 +1,96 @@
+"""api/app/inference/batcher.py"""
+
+import logging
+import time
+
+import eventlet
+from eventlet.event import Event
+from eventlet.queue import LightQueue, Empty
+from eventlet.semaphore import Semaphore
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBatcher:
+    """
+    Kaynaklar arası dinamik mikro-batch zamanlayıcısı.
+
+    Tüm kaynaklardan gelen bekleyen 5 karelik klipler tek bir kuyrukta toplanır; ilk klip
+    geldikten sonra en fazla `max_wait` saniye ya da `max_batch_size` klibe ulaşılana kadar
+    beklenir ve hepsi tek bir tensor batch olarak predictor'a verilir. Her klibin sonucu,
+    submit sırasında dönen Event (future) üzerinden çağırana iletilir.
+
+    Aynı anda en fazla `predictor.max_concurrency` batch çalışır (worker havuzunda worker sayısı).
+    """
+
+    def __init__(self, predictor, max_batch_size=16, max_wait=0.02):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = LightQueue()
+        self._inflight = Semaphore(max(1, getattr(predictor, 'max_concurrency', 1)))
+        self._loop = None
+        self.stats = {'batches': 0, 'clips': 0, 'last_batch_size': 0, 'last_batch_ms': 0.0}
+
+    def start(self):
+        if self._loop is None:
+            self._loop = eventlet.spawn(self._run)
+            logger.info(f"[BATCHER] Started (max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def submit(self, clip, target):
+        """Klibi kuyruğa ekler; sonucu (mse, validity) taşıyacak Event'i döner."""
+        self.start()
+        future = Event()
+        self._queue.put((clip, target, future))
+        return future
+
+    def predict(self, clip, target):
+        """submit + wait; çağıran green thread sonuç gelene kadar bekler."""
+        return self.submit(clip, target).wait()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._inflight.acquire()
+            eventlet.spawn_n(self._execute, batch)
+
+    def _execute(self, batch):
+        futures = [future for _, _, future in batch]
+        try:
+            if not self.predictor.load():
+                raise RuntimeError("FutureFramePredictor is not available")
+            clips = np.stack([clip for clip, _, _ in batch])
+            targets = np.stack([target for _, target, _ in batch])
+
+            started = time.monotonic()
+            results = self.predictor.predict_batch(clips, targets)
+            elapsed_ms = (time.monotonic() - started) * 1000
+
+            self.stats['batches'] += 1
+            self.stats['clips'] += len(batch)
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_batch_ms'] = elapsed_ms
+            logger.debug(f"[BATCHER] Ran batch of {len(batch)} clips in {elapsed_ms:.1f}ms")
+
+            for future, result in zip(futures, results):
+                future.send(result)
+        except Exception as e:
+            logger.error(f"[BATCHER] Batch inference failed for {len(batch)} clips: {e}", exc_info=True)
+            for future in futures:
+                future.send_exception(e)
+        finally:
+            self._inflight.release()
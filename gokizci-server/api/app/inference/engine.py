@@ -0,0 +1,360 @@
+"""api/app/inference/engine.py
+
+OpenCV, numpy ve TensorFlow bu modülde ilk kullanıldıkları fonksiyonda import edilir; `import app`
+ve hafif araçlar ML yığınının yükleme maliyetini ödemez.
+"""
+
+import base64
+import logging
+import threading
+import time
+from collections import deque
+
+import eventlet
+from eventlet.event import Event
+
+from app.settings import Config
+from app.utils.image_ops import encode_scaled
+
+logger = logging.getLogger(__name__)
+
+
+def _run_inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def decode_frame(frame_data, frame_size, preview=None, reduced=False):
+    """
+    JPEG (ham bytes veya base64 str) -> (frame_size, frame_size, 3) uint8 RGB.
+    `preview` (genişlik, JPEG kalitesi) verilirse aynı decode'dan küçük bir önizleme JPEG'i de
+    üretilir ve (kare, önizleme) döner. `reduced` ise JPEG yarı ölçekte açılır (hedeflerden
+    küçük kalırsa tam ölçeğe dönülür).
+    """
+    import cv2
+    import numpy as np
+
+    if isinstance(frame_data, str):
+        frame_data = base64.b64decode(frame_data)
+    buffer = np.frombuffer(frame_data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_COLOR_2) if reduced else None
+    if image is None or min(image.shape[:2]) < frame_size or (preview and image.shape[1] < preview[0]):
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Frame could not be decoded as JPEG")
+    preview_bytes = encode_scaled(image, *preview) if preview else None
+    image = cv2.resize(image, (frame_size, frame_size), interpolation=cv2.INTER_AREA)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return (image, preview_bytes) if preview else image
+
+
+class LocalPredictor:
+    """
+    FutureFramePredictor'ı bu süreç içinde çalıştırır.
+
+    Model süreç başına yalnızca bir kez yüklenir. Ağır işler (model yükleme, forward pass)
+    `run_blocking` üzerinden çalıştırılır; eventlet altında bu `tpool.execute` olmalıdır.
+    Inference worker süreçlerinde (bkz. workers.py) doğrudan, inline çalıştırılır.
+    """
+
+    max_concurrency = 1
+
+    def __init__(self, weights_path=None, clip_length=5, frame_size=224, run_blocking=None):
+        self.weights_path = weights_path
+        self.clip_length = clip_length
+        self.frame_size = frame_size
+        self._run_blocking = run_blocking or _run_inline
+
+        self._model = None
+        self._model_error = None
+        self._model_lock = threading.Lock()
+
+    def _build_model(self):
+        from app.utils.big_model import build_future_frame_predictor
+
+        input_shape = (None, self.clip_length, self.frame_size, self.frame_size, 3)
+        model = build_future_frame_predictor(input_shape)
+        if self.weights_path:
+            model.load_weights(self.weights_path)
+            logger.info(f"[INFERENCE] Model weights loaded from {self.weights_path}")
+        else:
+            logger.warning("[INFERENCE] MODEL_WEIGHTS_PATH is not set, FutureFramePredictor runs with untrained weights.")
+        return model
+
+    def load(self):
+        """Modeli (henüz yüklenmediyse) yükler. Hata durumunda False döner ve hata bir kez loglanır."""
+        if self._model is not None or self._model_error is not None:
+            return self._model is not None
+        with self._model_lock:
+            if self._model is None and self._model_error is None:
+                try:
+                    self._model = self._run_blocking(self._build_model)
+                except Exception as e:
+                    self._model_error = e
+                    logger.error(f"[INFERENCE] FutureFramePredictor could not be loaded: {e}", exc_info=True)
+        return self._model is not None
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def _predict(self, clips, targets):
+        import numpy as np
+
+        clips = np.asarray(clips, dtype=np.float32) / 255.0
+        targets = np.asarray(targets, dtype=np.float32) / 255.0
+
+        predicted, disc_output = self._model.predict_with_disc(clips, training=False)
+        predicted = np.asarray(predicted)[:, 0]
+        disc_output = np.asarray(disc_output).reshape(-1)
+
+        mse = np.mean(np.square(predicted - targets), axis=(1, 2, 3))
+        validity = 1.0 / (1.0 + np.exp(-disc_output))
+        return list(zip(mse.tolist(), validity.tolist()))
+
+    def predict_batch(self, clips, targets):
+        """
+        clips: (B, clip_length, H, W, 3) uint8, targets: (B, H, W, 3) uint8.
+        Her örnek için (mse, validity) listesi döner.
+        """
+        return self._run_blocking(self._predict, clips, targets)
+
+
+class _SourceWindow:
+    """
+    Bir kaynağın son `maxlen` karesi. Kareler decode sırasında paralel işlenebildiği için
+    pencereye giriş, geliş sırasında alınan bilet (ticket) numarasına göre sıralanır.
+    Karesiz kapatılan bilet (decode hatası, gözlemlenmeyen atlanmış kare) pencereyi boşaltır:
+    klip her zaman ardışık karelerden oluşur, dolana kadar skorlanmaz.
+    """
+
+    def __init__(self, maxlen):
+        self.frames = deque(maxlen=maxlen)
+        self.next_ticket = 0
+        self.next_commit = 0
+        self.waiters = {}  # ticket -> Event
+        self.parked = {}   # ticket -> kare; klip beklemeyen (wait=False) erken gelen girişler
+
+    def take_ticket(self):
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        return ticket
+
+    def _enter(self, frame):
+        if frame is None:
+            self.frames.clear()  # Ardışıklık bozuldu
+        else:
+            self.frames.append(frame)
+
+    def commit(self, ticket, frame, wait=True):
+        """
+        Önceki biletler işlenene kadar bekler, kareyi ekler ve (ekleme öncesi) klibi döner.
+        wait=False ise sırası gelmemiş kare bekletilmeden park edilir ve sırası gelince eklenir;
+        bu durumda klip dönmez.
+        """
+        import numpy as np
+
+        if ticket != self.next_commit:
+            if not wait:
+                self.parked[ticket] = frame
+                return None
+            waiter = self.waiters[ticket] = Event()
+            waiter.wait()
+        clip = np.stack(self.frames) if wait and len(self.frames) == self.frames.maxlen else None
+        self._enter(frame)
+        self.next_commit += 1
+        while self.next_commit in self.parked:
+            self._enter(self.parked.pop(self.next_commit))
+            self.next_commit += 1
+        waiter = self.waiters.pop(self.next_commit, None)
+        if waiter is not None:
+            waiter.send()
+        return clip
+
+
+class InferenceEngine:
+    """
+    FutureFramePredictor ile kaynak bazlı kayan pencere (sliding window) çıkarımı.
+
+    Her kaynak son `clip_length` kareyi (decode edilmiş, yeniden boyutlandırılmış, uint8 RGB)
+    bir ring buffer'da tutar. Yeni gelen kare, modelin bu pencereden tahmin ettiği
+    "bir sonraki kare" ile karşılaştırılır; tahmin hatası (MSE) eşiği aşarsa anomali sayılır.
+
+    Tahminin nerede çalıştığı `predictor`'a bağlıdır: LocalPredictor (aynı süreç, tpool)
+    veya InferenceWorkerPool (ayrı süreçler, shared memory).
+    """
+
+    def __init__(self, predictor, clip_length=5, frame_size=224, mse_threshold=0.01, run_blocking=None):
+        self.predictor = predictor
+        self.clip_length = clip_length
+        self.frame_size = frame_size
+        self.mse_threshold = mse_threshold
+        self._run_blocking = run_blocking or _run_inline
+
+        self._windows = {}  # source_id -> _SourceWindow
+        self.batcher = None  # Atanırsa tahminler kaynaklar arası batch'lenir (bkz. batcher.py)
+        self.warmed_up = False
+        self._warm_up_thread = None
+
+    @property
+    def model_ready(self):
+        return self.predictor.ready
+
+    # -------------------------------------------------------------- warm-up
+    def warm_up(self):
+        """
+        Modeli yükler ve sıfır kliplerle bir forward pass yapar (graph/bellek ilk çağrıda hazırlanır).
+        Worker havuzunda her worker'a bir batch düşecek kadar paralel çalıştırılır. Başarıda True döner.
+        """
+        import numpy as np
+
+        started = time.monotonic()
+        try:
+            if not self.predictor.load():
+                return False
+            clips = np.zeros((1, self.clip_length, self.frame_size, self.frame_size, 3), dtype=np.uint8)
+            targets = np.zeros((1, self.frame_size, self.frame_size, 3), dtype=np.uint8)
+            pool = eventlet.GreenPool(self.predictor.max_concurrency)
+            for _ in pool.imap(lambda _: self.predictor.predict_batch(clips, targets),
+                               range(self.predictor.max_concurrency)):
+                pass
+        except Exception as e:
+            logger.error(f"[INFERENCE] Model warm-up failed: {e}", exc_info=True)
+            return False
+        self.warmed_up = True
+        logger.info(f"[INFERENCE] Model warmed up in {time.monotonic() - started:.1f}s")
+        return True
+
+    def start_warm_up(self):
+        """warm_up'ı (henüz başlatılmadıysa) arka planda başlatır; GreenThread'i döner."""
+        if self._warm_up_thread is None:
+            self._warm_up_thread = eventlet.spawn(self.warm_up)
+        return self._warm_up_thread
+
+    # ------------------------------------------------------------ windowing
+    def _window(self, source_id):
+        window = self._windows.get(source_id)
+        if window is None:
+            window = self._windows[source_id] = _SourceWindow(self.clip_length)
+        return window
+
+    def reset_source(self, source_id):
+        """Kaynağın penceresini temizler (ör: akış yeniden başladığında)."""
+        self._windows.pop(source_id, None)
+
+    def take_ticket(self, source_id):
+        """
+        Karenin pencereye giriş sırasını geliş anında ayırır. Bilet process, observe veya
+        release'den biriyle kapatılmalıdır; yoksa sonraki kareler bekler.
+        """
+        window = self._window(source_id)
+        return window, window.take_ticket()
+
+    @staticmethod
+    def release(ticket):
+        """İşlenemeyen veya pencere için gerekmeyen karenin biletini kare eklemeden kapatır (pencere boşalır)."""
+        window, number = ticket
+        window.commit(number, None, wait=False)
+
+    def observe(self, source_id, frame_data, preview=None, ticket=None):
+        """
+        Inference'ı atlanan kareyi skorlamadan pencereye ekler. Pencere böylece her zaman ardışık
+        karelerden oluşur; model seyreltme altında da eğitildiği gibi art arda karelerle çalışır.
+        Decode yarı ölçekte yapılır. `preview` verilirse aynı decode'dan önizleme JPEG'i döner.
+        """
+        window, number = ticket or self.take_ticket(source_id)
+        target = preview_bytes = None
+        try:
+            decoded = self._run_blocking(decode_frame, frame_data, self.frame_size, preview, True)
+            target, preview_bytes = decoded if preview else (decoded, None)
+        finally:
+            window.commit(number, target, wait=False)
+        return preview_bytes
+
+    # -------------------------------------------------------------- scoring
+    def score(self, mse, validity):
+        """Tahmin hatasını anomali kararına ve [0, 1] aralığında bir güven skoruna çevirir."""
+        ratio = mse / self.mse_threshold if self.mse_threshold > 0 else 0.0
+        return {
+            'anomaly_detected': ratio >= 1.0,
+            'confidence': float(min(1.0, ratio)),
+            'prediction_error': float(mse),
+            'validity': float(validity),
+        }
+
+    def process(self, source_id, frame_data, preview=None, ticket=None):
+        """
+        Tek kareyi işler: decode -> pencereye ekle -> (klip hazırsa) tahmin -> skor.
+        Pencere dolmadıysa veya model henüz yüklenmediyse anomali yok kabul edilir; model yükleme
+        kareyi bekletmez, arka planda başlatılır (bkz. start_warm_up).
+        `preview` (genişlik, kalite) verilirse sonuçta aynı decode'dan üretilen 'preview' JPEG'i döner.
+        `ticket` (take_ticket) verilmezse sıra burada alınır.
+        """
+        window, number = ticket or self.take_ticket(source_id)
+        target = preview_bytes = None
+        try:
+            decoded = self._run_blocking(decode_frame, frame_data, self.frame_size, preview)
+            target, preview_bytes = decoded if preview else (decoded, None)
+        finally:
+            # Decode başarısız olsa da bilet kapatılmalı, yoksa sonraki kareler bekler
+            clip = window.commit(number, target)
+
+        if not self.model_ready:
+            self.start_warm_up()
+        if clip is None or not self.model_ready:
+            result = {'anomaly_detected': False, 'confidence': 0.0,
+                      'prediction_error': None, 'validity': None}
+        elif self.batcher is not None:
+            result = self.score(*self.batcher.predict(clip, target))
+        else:
+            [(mse, validity)] = self.predictor.predict_batch(clip[None], target[None])
+            result = self.score(mse, validity)
+        if preview:
+            result['preview'] = preview_bytes
+        return result
+
+
+_engine = None
+
+
+def get_engine():
+    """Süreç başına tek InferenceEngine örneği (model bir kez yüklenir)."""
+    global _engine
+    if _engine is None:
+        from eventlet import tpool
+        from app.inference.batcher import InferenceBatcher
+
+        if Config.INFERENCE_WORKERS > 0:
+            import atexit
+            from app.inference.workers import InferenceWorkerPool
+
+            predictor = InferenceWorkerPool(
+                workers=Config.INFERENCE_WORKERS,
+                # Eşzamanlı batch'lerin slot beklerken kilitlenmemesi için en az workers * batch kadar slot
+                slots=max(Config.INFERENCE_SHM_SLOTS, Config.INFERENCE_WORKERS * Config.INFERENCE_MAX_BATCH_SIZE),
+                weights_path=Config.MODEL_WEIGHTS_PATH,
+                clip_length=Config.INFERENCE_CLIP_LENGTH,
+                frame_size=Config.INFERENCE_FRAME_SIZE,
+            )
+            atexit.register(predictor.close)
+        else:
+            predictor = LocalPredictor(
+                weights_path=Config.MODEL_WEIGHTS_PATH,
+                clip_length=Config.INFERENCE_CLIP_LENGTH,
+                frame_size=Config.INFERENCE_FRAME_SIZE,
+                run_blocking=tpool.execute,
+            )
+
+        engine = InferenceEngine(
+            predictor,
+            clip_length=Config.INFERENCE_CLIP_LENGTH,
+            frame_size=Config.INFERENCE_FRAME_SIZE,
+            mse_threshold=Config.ANOMALY_MSE_THRESHOLD,
+            run_blocking=tpool.execute,
+        )
+        engine.batcher = InferenceBatcher(
+            predictor,
+            max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+            max_wait=Config.INFERENCE_MAX_WAIT_MS / 1000.0,
+        )
+        _engine = engine
+    return _engine
@@ -0,0 +1,87 @@
+"""api/app/inference/observer.py"""
+
+import logging
+
+import eventlet
+from eventlet import tpool
+from eventlet.queue import LightQueue, Full
+
+from app.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class WindowObserver:
+    """
+    Inference'ı atlanan karelerin decode işleri: kayan pencereye ekleme (InferenceEngine.observe)
+    ve istenen önizleme. Socket.IO handler'ında değil, sınırlı bir kuyruktan `workers` green thread
+    ile yapılır; handler kareyi kuyruğa bırakıp bir sonraki kareye geçer.
+
+    Kuyruk doluysa kare gözlemlenmez: bileti kare eklenmeden kapatılır ve pencere ardışık kareler
+    gelene kadar boşalır (bkz. _SourceWindow.commit); önizleme de atlanır.
+    """
+
+    def __init__(self, engine, max_queue=64, workers=2):
+        self.engine = engine
+        self.workers = max(1, workers)
+        self._queue = LightQueue(maxsize=max_queue)
+        self._threads = []
+        self.stats = {'observed': 0, 'previews': 0, 'dropped': 0, 'failed': 0}
+
+    def start(self):
+        if not self._threads:
+            self._threads = [eventlet.spawn(self._run) for _ in range(self.workers)]
+
+    def submit(self, source_id, frame_bytes, ticket=None, preview=None, on_preview=None):
+        """
+        İşi kuyruğa ekler. `ticket` verilirse kare pencereye eklenir; `preview` (genişlik, kalite)
+        verilirse üretilen önizleme `on_preview(bytes)` ile bildirilir. Kuyruğa alındıysa True döner.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((source_id, frame_bytes, ticket, preview, on_preview))
+        except Full:
+            self.stats['dropped'] += 1
+            if ticket is not None:
+                self.engine.release(ticket)
+            return False
+        return True
+
+    def _observe(self, source_id, frame_bytes, ticket, preview):
+        if ticket is not None:
+            self.stats['observed'] += 1
+            return self.engine.observe(source_id, frame_bytes, preview=preview, ticket=ticket)
+        from app.storage.thumbnails import make_thumbnail
+        return tpool.execute(make_thumbnail, frame_bytes, *preview)
+
+    def _run(self):
+        while True:
+            source_id, frame_bytes, ticket, preview, on_preview = self._queue.get()
+            try:
+                preview_bytes = self._observe(source_id, frame_bytes, ticket, preview)
+                if preview_bytes is not None and on_preview is not None:
+                    self.stats['previews'] += 1
+                    on_preview(preview_bytes)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.warning(f"[WINDOW_OBSERVER] Shed frame could not be observed. Source: {source_id}, Error: {e}")
+
+    def get_stats(self):
+        return dict(self.stats, queue_depth=self._queue.qsize(), queue_capacity=self._queue.maxsize)
+
+
+_observer = None
+
+
+def get_window_observer():
+    """Süreç başına tek WindowObserver örneği."""
+    global _observer
+    if _observer is None:
+        from app.inference.engine import get_engine
+
+        _observer = WindowObserver(
+            get_engine(),
+            max_queue=Config.INGEST_OBSERVE_QUEUE_SIZE,
+            workers=Config.INGEST_OBSERVE_WORKERS,
+        )
+    return _observer
@@ -0,0 +1,221 @@
+"""api/app/inference/workers.py"""
+
+import itertools
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import eventlet
+from eventlet import hubs
+from eventlet.event import Event
+from eventlet.queue import LightQueue
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFrameRing:
+    """
+    Web süreci ile inference worker'ları arasında paylaşılan, sabit sayıda slot'tan oluşan
+    shared-memory alanı. Her slot bir klip + hedef kare tutar: (clip_length + 1, H, W, 3) uint8.
+    Kareler pickle'lanmadan doğrudan bu alana yazılır; worker'lara yalnızca slot numaraları gider.
+    """
+
+    def __init__(self, slots, clip_length, frame_size, name=None):
+        self.shape = (slots, clip_length + 1, frame_size, frame_size, 3)
+        size = int(np.prod(self.shape))
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, slot, clip, target):
+        self.array[slot, :-1] = clip
+        self.array[slot, -1] = target
+
+    def read(self, slots):
+        """Slot'ları (B, clip_length, H, W, 3) klipler ve (B, H, W, 3) hedefler olarak döner."""
+        data = self.array[slots]
+        return data[:, :-1], data[:, -1]
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _worker_main(worker_id, shm_name, slots, clip_length, frame_size, weights_path, job_conn, result_conn):
+    """Inference worker süreci: modeli bir kez yükler, slot numaralarıyla gelen batch'leri işler."""
+    from app.inference.engine import LocalPredictor
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ring = SharedFrameRing(slots, clip_length, frame_size, name=shm_name)
+    predictor = LocalPredictor(weights_path=weights_path, clip_length=clip_length, frame_size=frame_size)
+    result_conn.send(('ready', predictor.load()))
+
+    try:
+        while True:
+            message = job_conn.recv()
+            if message is None:
+                break
+            batch_id, batch_slots = message
+            try:
+                clips, targets = ring.read(batch_slots)
+                result_conn.send((batch_id, predictor.predict_batch(clips, targets), None))
+            except Exception as e:
+                result_conn.send((batch_id, None, repr(e)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+class InferenceWorkerPool:
+    """
+    FutureFramePredictor'ı ayrı süreçlerde çalıştıran predictor.
+
+    CPU-yoğun forward pass eventlet hub'ını bloklamaz ve tüm çekirdekler kullanılır.
+    Klipler SharedFrameRing üzerinden aktarılır; iş ve sonuç mesajları (batch_id, slot listesi,
+    skorlar) her worker için ayrı bir Pipe ile taşınır. Sonuçlar, pipe fd'si üzerinde
+    trampoline eden bir green thread tarafından okunur.
+    """
+
+    def __init__(self, workers=2, slots=64, weights_path=None, clip_length=5, frame_size=224):
+        self.workers = workers
+        self.slots = slots
+        self.weights_path = weights_path
+        self.clip_length = clip_length
+        self.frame_size = frame_size
+
+        self._ring = None
+        self._free_slots = None
+        self._workers = []
+        self._pending = {}  # batch_id -> Event
+        self._batch_ids = itertools.count()
+        self._ready_event = Event()
+
+    @property
+    def max_concurrency(self):
+        return self.workers
+
+    @property
+    def ready(self):
+        return any(worker['ready'] for worker in self._workers)
+
+    def start(self):
+        if self._ring is not None:
+            return
+        # 'spawn': TF'in fork edilmiş bir eventlet sürecinde başlatılmasından kaçınmak için
+        ctx = multiprocessing.get_context('spawn')
+        self._ring = SharedFrameRing(self.slots, self.clip_length, self.frame_size)
+        self._free_slots = LightQueue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+
+        for worker_id in range(self.workers):
+            job_recv, job_send = ctx.Pipe(duplex=False)
+            result_recv, result_send = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_worker_main,
+                args=(worker_id, self._ring.name, self.slots, self.clip_length, self.frame_size,
+                      self.weights_path, job_recv, result_send),
+                name=f"inference-worker-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            job_recv.close()
+            result_send.close()
+
+            worker = {'id': worker_id, 'process': process, 'jobs': job_send, 'results': result_recv,
+                      'ready': False, 'reported': False, 'pending': set()}
+            self._workers.append(worker)
+            eventlet.spawn_n(self._read_results, worker)
+        logger.info(f"[WORKERS] Started {self.workers} inference workers (shm={self._ring.name}, slots={self.slots})")
+
+    def load(self):
+        """Worker'lar modeli yükleyene kadar bekler; en az biri hazırsa True döner."""
+        self.start()
+        self._ready_event.wait()
+        return self.ready
+
+    def _mark_reported(self, worker, ready):
+        worker['ready'] = ready
+        worker['reported'] = True
+        if all(w['reported'] for w in self._workers) or ready:
+            if not self._ready_event.ready():
+                self._ready_event.send()
+
+    def _read_results(self, worker):
+        conn = worker['results']
+        while True:
+            try:
+                hubs.trampoline(conn.fileno(), read=True)
+                message = conn.recv()
+            except (EOFError, OSError):
+                logger.error(f"[WORKERS] Inference worker {worker['id']} exited (exitcode={worker['process'].exitcode})")
+                worker['ready'] = False
+                for batch_id in worker['pending']:
+                    pending = self._pending.pop(batch_id, None)
+                    if pending is not None:
+                        pending.send((None, f"inference worker {worker['id']} exited"))
+                worker['pending'].clear()
+                self._mark_reported(worker, False)
+                return
+
+            if message[0] == 'ready':
+                logger.info(f"[WORKERS] Inference worker {worker['id']} ready={message[1]}")
+                self._mark_reported(worker, message[1])
+                continue
+
+            batch_id, results, error = message
+            worker['pending'].discard(batch_id)
+            pending = self._pending.pop(batch_id, None)
+            if pending is not None:
+                pending.send((results, error))
+
+    def predict_batch(self, clips, targets):
+        """Klipleri shared memory'ye yazar, en az yüklü worker'a gönderir ve sonucu bekler."""
+        candidates = [worker for worker in self._workers if worker['ready']]
+        if not candidates:
+            raise RuntimeError("No inference worker is available")
+
+        batch_slots = [self._free_slots.get() for _ in range(len(clips))]
+        try:
+            for slot, clip, target in zip(batch_slots, clips, targets):
+                self._ring.write(slot, clip, target)
+
+            worker = min(candidates, key=lambda w: len(w['pending']))
+            batch_id = next(self._batch_ids)
+            done = self._pending[batch_id] = Event()
+            worker['pending'].add(batch_id)
+            worker['jobs'].send((batch_id, batch_slots))
+
+            results, error = done.wait()
+            if error is not None:
+                raise RuntimeError(f"Inference worker failed: {error}")
+            return results
+        finally:
+            for slot in batch_slots:
+                self._free_slots.put(slot)
+
+    def close(self):
+        for worker in self._workers:
+            try:
+                worker['jobs'].send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        self._workers = []
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
@@ -0,0 +1,94 @@
+"""api/app/replay/backfill_meta.py
+
+Geçmiş saat pencereleri için replay meta'yı depodaki karelerden yeniden hesaplar (backfill/onarım).
+Pencereler kaynak × saat işleri olarak paralel çalıştırılır.
+
+Kullanım (api/ dizininden):
+    python -m app.replay.backfill_meta --start 2025-05-19T00:00:00Z [--end ISO] [--source-id ID ...]
+                                       [--workers 8] [--finalize]
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from mongoengine import connect
+
+from app.settings import Config
+from app.storage.base import to_naive_utc
+from app.replay.meta_utils import compute_replay_meta
+from models.device import Device
+from models.replay_meta import ReplayMeta
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value):
+    return to_naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+
+def iter_windows(start, end):
+    """[start, end) aralığına değen saat pencerelerinin başlangıçları."""
+    window = start.replace(minute=0, second=0, microsecond=0)
+    while window < end:
+        yield window
+        window += timedelta(hours=1)
+
+
+def _compute(source_id, window_start, finalize):
+    compute_replay_meta(source_id, window_start)
+    if finalize:
+        ReplayMeta.objects(source_id=source_id, window_start=window_start).update(set__finalized=True)
+
+
+def backfill_meta(start, end, source_ids=None, workers=8, finalize=False):
+    """Tüm (kaynak, pencere) çiftlerini `workers` paralel iş ile hesaplar. (başarılı, hatalı) döner."""
+    source_ids = source_ids or [d.source_id for d in Device.objects.only('source_id')]
+    jobs = [(source_id, window) for window in iter_windows(start, end) for source_id in source_ids]
+    logger.info(f"[BACKFILL_META] {len(jobs)} windows for {len(source_ids)} sources, workers={workers}")
+
+    started = time.monotonic()
+    done = failed = 0
+    # compute_replay_meta işinin çoğu Mongo aggregation'ında geçer; thread'ler yeterli
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_compute, source_id, window, finalize): (source_id, window)
+                   for source_id, window in jobs}
+        for future in as_completed(futures):
+            source_id, window = futures[future]
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"[BACKFILL_META] {source_id} {window.isoformat()} failed: {e}")
+            if (done + failed) % 100 == 0:
+                logger.info(f"[BACKFILL_META] {done + failed}/{len(jobs)}")
+
+    logger.info(f"[BACKFILL_META] Done in {time.monotonic() - started:.1f}s. ok={done}, failed={failed}")
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute replay meta for past windows')
+    parser.add_argument('--start', required=True, help='ISO timestamp; first window is its hour')
+    parser.add_argument('--end', help='ISO timestamp (default: now)')
+    parser.add_argument('--source-id', action='append', dest='source_ids', help='Limit to source (repeatable)')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel window computations')
+    parser.add_argument('--finalize', action='store_true', help='Mark recomputed windows as finalized')
+    args = parser.parse_args()
+
+    start = _parse_time(args.start)
+    end = _parse_time(args.end) if args.end else datetime.utcnow()
+    connect(db=Config.MONGODB_DB, host=Config.MONGODB_HOST)
+    _, failed = backfill_meta(start, end, source_ids=args.source_ids, workers=args.workers, finalize=args.finalize)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""api/app/replay/meta_tracker.py"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import eventlet
+
+from app.replay.meta_utils import apply_meta_counts
+from app.settings import Config
+from app.storage.base import to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMetaTracker:
+    """
+    Replay meta'sını ingest ile artımlı olarak tutar.
+
+    Veritabanına yazılan her kare için (bkz. SegmentWriter.on_written) pencere başına saniye ve
+    dakika sayaçları bellekte artırılır; `flush_interval` saniyede bir bekleyen artışlar
+    apply_meta_counts ile ($inc) ReplayMeta'ya yazılır. Maliyet ingest hızıyla orantılıdır;
+    pencere başına tam tarama yalnızca başlangıç ve onarımda yapılır.
+    """
+
+    def __init__(self, flush_interval=5.0):
+        self.flush_interval = flush_interval
+        self._pending = {}      # (source_id, window_start) -> (saniye, dakika kare, dakika anomali) Counter'ları
+        self.last_ingest = {}   # source_id -> son yazılan karenin işlendiği an (time.time())
+        self._held = set()      # Depodan yeniden hesaplanmakta olan pencereler; flush edilmez
+        self._loop = None
+
+    def start(self):
+        if self._loop is None:
+            self._loop = eventlet.spawn(self._run)
+
+    def _counters(self, source_id, window_start):
+        key = (source_id, window_start)
+        counters = self._pending.get(key)
+        if counters is None:
+            counters = self._pending[key] = (Counter(), Counter(), Counter())
+        return counters
+
+    def record_many(self, records):
+        """Yazılmış kare kayıtlarını (bkz. storage/base.py) sayaçlara ekler."""
+        self.start()
+        now = time.time()
+        for record in records:
+            timestamp = to_naive_utc(record['timestamp'])
+            window_start = timestamp.replace(minute=0, second=0, microsecond=0)
+            second = int((timestamp - window_start).total_seconds())
+            seconds, minute_frames, minute_anomalies = self._counters(record['source_id'], window_start)
+            seconds[str(second)] += 1
+            minute_frames[str(second // 60)] += 1
+            if record['anomaly_detected']:
+                minute_anomalies[str(second // 60)] += 1
+            self.last_ingest[record['source_id']] = now
+
+    def pending_windows(self):
+        return list(self._pending)
+
+    @contextmanager
+    def hold(self, source_id, window_start):
+        """
+        Pencere depodan yeniden hesaplanırken (compute_replay_meta, sayaçları $set ile ezer) o pencerenin
+        artışlarını bekletir. O ana kadar biriken artışlar zaten depodaki kareler olduğu için atılır;
+        hesaplama sürerken gelenler bittikten sonra $inc edilir. Aggregation sırasında yazılan
+        birkaç kare iki kez sayılabilir; saat kapanırken yapılan yeniden hesaplama bunu düzeltir.
+        """
+        key = (source_id, to_naive_utc(window_start))
+        self._held.add(key)
+        self._pending.pop(key, None)
+        try:
+            yield
+        finally:
+            self._held.discard(key)
+
+    def flush(self, source_id=None):
+        """Bekleyen artışları yazar (source_id verilirse yalnızca o kaynağınkileri). Yazılamayanlar geri konur."""
+        keys = [key for key in self._pending
+                if (source_id is None or key[0] == source_id) and key not in self._held]
+        for key in keys:
+            counters = self._pending.pop(key)
+            try:
+                apply_meta_counts(key[0], key[1], *counters)
+            except Exception as e:
+                logger.error(f"[META_TRACKER] Flush failed for {key[0]} window {key[1].isoformat()}: {e}", exc_info=True)
+                for pending, failed in zip(self._counters(*key), counters):
+                    pending.update(failed)
+
+    def _run(self):
+        while True:
+            eventlet.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[META_TRACKER] Flush loop error: {e}", exc_info=True)
+
+
+_tracker = None
+
+
+def get_meta_tracker():
+    """Süreç başına tek ReplayMetaTracker örneği."""
+    global _tracker
+    if _tracker is None:
+        _tracker = ReplayMetaTracker(flush_interval=Config.REPLAY_META_FLUSH_SECONDS)
+    return _tracker
@@ -1,106 +1,172 @@
 """api/app/replay/meta_utils.py"""
 
 from datetime import datetime, timedelta
-from models.video_segment import VideoSegment
 from models.replay_meta import ReplayMeta
+from app.storage.base import get_segment_store, to_naive_utc
+from pymongo import ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
 
+EXPECTED_FPS = 25
+SECOND_FILLED_RATIO = 0.9   # saniyede 25 frame'in %90'ı varsa dolu
+MINUTE_ANOMALY_RATIO = 0.8  # dakikadaki karelerin %80'i anomali ise dakika anomali
+
+_COUNTER_FIELDS = ('second_counts', 'minute_frames', 'minute_anomalies')
+
+
+def _dense(counts, length):
+    import numpy as np
+
+    if isinstance(counts, np.ndarray):
+        return counts
+    values = np.zeros(length, dtype=np.int64)
+    for key, count in (counts or {}).items():
+        index = int(key)
+        if 0 <= index < length:
+            values[index] = count
+    return values
+
+
+def pack_meta_bits(second_counts, minute_frames, minute_anomalies):
+    """
+    Sayaçlardan (saniye/dakika indisi -> sayı dict'i veya numpy dizisi) bit dizilerini üretir.
+    Biçim öncekiyle aynıdır: en anlamlı bit ilk saniye/dakika; 60 dakika biti 8 byte'ın son 60 bitidir.
+    """
+    import numpy as np
+
+    seconds = _dense(second_counts, 3600)
+    frames = _dense(minute_frames, 60)
+    anomalies = _dense(minute_anomalies, 60)
+
+    second_filled = seconds >= SECOND_FILLED_RATIO * EXPECTED_FPS
+    minute_anomaly = (frames > 0) & (anomalies >= MINUTE_ANOMALY_RATIO * frames)
+
+    second_filled_bytes = np.packbits(second_filled).tobytes()
+    minute_anomaly_bytes = np.packbits(np.concatenate([np.zeros(4, dtype=bool), minute_anomaly])).tobytes()
+    return minute_anomaly_bytes, second_filled_bytes
+
+
+def unpack_meta_bits(minute_anomaly_bits, second_filled_bits):
+    """pack_meta_bits'in tersi: (60, 3600) uzunlukta bool dizileri; eksik veri sıfır kabul edilir."""
+    import numpy as np
+
+    minutes = np.unpackbits(np.frombuffer(minute_anomaly_bits or bytes(8), dtype=np.uint8))[-60:]
+    seconds = np.unpackbits(np.frombuffer(second_filled_bits or bytes(450), dtype=np.uint8))[:3600]
+    return minutes.astype(bool), seconds.astype(bool)
+
+
+def bit_runs(bits):
+    """Bool dizisindeki 1 dizilerini [[başlangıç, bitiş), ...] aralıklarına çevirir (run-length)."""
+    import numpy as np
+
+    padded = np.concatenate([[False], bits, [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges.reshape(-1, 2).tolist()
+
+
+def _window_filter(source_id, window_start):
+    return {'source_id': source_id, 'window_start': to_naive_utc(window_start)}
+
+
+def _store_bits(document, extra=None):
+    """Dokümanın sayaçlarından bitleri yeniden üretip yazar; araya başka güncelleme girdiyse o güncelleme yazar."""
+    minute_anomaly_bytes, second_filled_bytes = pack_meta_bits(
+        *(document.get(field) for field in _COUNTER_FIELDS))
+    update = {'minute_anomaly_bits': minute_anomaly_bytes, 'second_filled_bits': second_filled_bytes}
+    update.update(extra or {})
+    ReplayMeta._get_collection().update_one(
+        {'_id': document['_id'], 'version': document.get('version', 0)},
+        {'$set': update}
+    )
+
+
+def apply_meta_counts(source_id, window_start, second_counts, minute_frames, minute_anomalies):
+    """
+    Ingest sayaçlarını pencerenin ReplayMeta dokümanına atomik $inc ile ekler ve bitleri günceller.
+    Sayaçlar {indis: artış} dict'leridir; doküman yoksa oluşturulur.
+    """
+    increments = {'version': 1}
+    for field, counts in zip(_COUNTER_FIELDS, (second_counts, minute_frames, minute_anomalies)):
+        for index, count in counts.items():
+            if count:
+                increments[f"{field}.{index}"] = count
+    empty_minutes, empty_seconds = pack_meta_bits({}, {}, {})
+    document = ReplayMeta._get_collection().find_one_and_update(
+        _window_filter(source_id, window_start),
+        {
+            '$inc': increments,
+            '$set': {'updated_at': datetime.utcnow()},
+            '$setOnInsert': {'minute_anomaly_bits': empty_minutes, 'second_filled_bits': empty_seconds,
+                             'finalized': False},
+        },
+        projection={field: 1 for field in _COUNTER_FIELDS + ('version',)},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _store_bits(document)
+
+
+def finalize_replay_meta(source_id, window_start):
+    """Kapanmış pencerenin bitlerini sayaçlardan son kez üretir ve pencereyi kapalı işaretler."""
+    collection = ReplayMeta._get_collection()
+    document = collection.find_one_and_update(
+        _window_filter(source_id, window_start),
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+        projection={field: 1 for field in _COUNTER_FIELDS + ('version',)},
+        return_document=ReturnDocument.AFTER
+    )
+    if document is None:
+        return
+    if not any(field in document for field in _COUNTER_FIELDS):
+        # Sayaçsız (eski sürümde hesaplanmış) pencere: mevcut bitler korunur
+        collection.update_one({'_id': document['_id']}, {'$set': {'finalized': True}})
+        return
+    _store_bits(document, extra={'finalized': True})
+
+
+def _sparse(values):
+    """numpy sayaç dizisi -> yalnızca sıfır olmayan indisleri içeren {'indis': sayı} dict'i."""
+    import numpy as np
+
+    return {str(index): int(values[index]) for index in np.flatnonzero(values)}
+
+
 def compute_replay_meta(source_id, window_start):
+    """
+    Pencerenin meta'sını depodaki karelerden baştan hesaplar (başlangıç, onarım, backfill).
+    Saniye başına sayılar depoda aggregation ile ($group) hesaplanır; kare verisi ve kare başına
+    doküman Python'a taşınmaz. Sayaçlar da yeniden yazılır; sonraki artımlı güncellemeler bunların üzerine eklenir.
+    """
+    window_start = to_naive_utc(window_start)
     window_end = window_start + timedelta(hours=1)
-    
+
     logger.info(f"COMPUTE_META: Querying segments for source_id={source_id}, "
         f"window_start_utc={window_start.isoformat()}, window_end_utc={window_end.isoformat()}")
-    
-    segments = VideoSegment.objects(
-        source_id=source_id,
-        timestamp__gte=window_start,
-        timestamp__lt=window_end
-    )
-    found_segments_count = segments.count() # Sayıyı bir kere alalım
 
-    logger.info(f"COMPUTE_META: Found {found_segments_count} segments for this window.") # Kaç segment bulundu?
-    minute_anomaly = [0] * 60
-    second_filled = [0] * 3600
+    second_frames, second_anomalies = get_segment_store().second_histogram(source_id, window_start, window_end)
+    minute_frames = second_frames.reshape(60, 60).sum(axis=1)
+    minute_anomalies = second_anomalies.reshape(60, 60).sum(axis=1)
+    minute_anomaly_bytes, second_filled_bytes = pack_meta_bits(second_frames, minute_frames, minute_anomalies)
+    found_segments_count = int(second_frames.sum())
 
-    minute_anomaly_bytes = int(''.join(map(str, minute_anomaly)), 2).to_bytes(8, 'big')[-8:]
-    second_filled_bytes = int(''.join(map(str, second_filled)), 2).to_bytes(450, 'big')[-450:]
-    if not segments:
+    logger.info(f"COMPUTE_META: Found {found_segments_count} segments for this window.") # Kaç segment bulundu?
+    if not found_segments_count:
         logger.warning(f"COMPUTE_META: No segments found for source_id={source_id} in window {window_start.isoformat()}. Meta will be empty.")
-        return ReplayMeta(
-            source_id=source_id,
-            window_start=window_start,
-            minute_anomaly_bits=minute_anomaly_bytes,
-            second_filled_bits=second_filled_bytes
-        )
-
-    # Saniye ve dakika bazında frame ve anomaly sayılarını hesapla
-    second_frames = [[] for _ in range(3600)]
-    minute_anomaly_counts = [0] * 60
-    minute_total_counts = [0] * 60
-
-    for seg in segments:
-        try:
-            time_diff_seconds = (seg.timestamp - window_start).total_seconds()
-        except TypeError:
-            logger.error(f"COMPUTE_META: Error calculating time difference for segment {seg.id}. "
-                         f"Timestamp: {seg.timestamp}, Window start: {window_start}")
-            continue
-
-        sec_idx = int(time_diff_seconds)
-        min_idx = sec_idx // 60
-        if 0 <= sec_idx < 3600 and 0 <= min_idx < 60:
-            second_frames[sec_idx].append(seg.anomaly_detected)
-            minute_total_counts[min_idx] += 1
-            if seg.anomaly_detected:
-                minute_anomaly_counts[min_idx] += 1
-
-    # Doluluk ve anomaly bitlerini hesapla
-    for i in range(3600):
-        if len(second_frames[i]) >= 0.9 * 25:  # saniyede 25 frame'in %90'ı varsa dolu
-            second_filled[i] = 1
-
-    for i in range(60):
-        if minute_total_counts[i] > 0 and (minute_anomaly_counts[i] / minute_total_counts[i]) >= 0.8:
-            minute_anomaly[i] = 1
-
-    # Bit dizilerini bytes'a çevir
-    minute_anomaly_bytes = int(''.join(map(str, minute_anomaly)), 2).to_bytes(8, 'big')[-8:]
-    second_filled_bytes = int(''.join(map(str, second_filled)), 2).to_bytes(450, 'big')[-450:]
-
-    
-    # Hesaplamalardan sonra bit dizilerinin içeriğini loglayın (kısaca)
-    minute_anomaly_str = ''.join(map(str, minute_anomaly))
-    second_filled_str = ''.join(map(str, second_filled))
-    logger.info(f"COMPUTE_META: Minute Anomaly Bits (first 10): {minute_anomaly_str[:10]}")
-    logger.info(f"COMPUTE_META: Second Filled Bits (first 30): {second_filled_str[:30]}")
-    
-    # DB'ye kaydet/güncelle
-    # meta, _ = ReplayMeta.objects.get_or_create(  # <--- ORİJİNAL SATIR
-    #     source_id=source_id,
-    #     window_start=window_start,
-    #     defaults={
-    #         'minute_anomaly_bits': minute_anomaly_bytes,
-    #         'second_filled_bits': second_filled_bytes
-    #     }
-    # )
-
-    # ALTERNATİF (get_or_create doğrudan çalışmazsa):
-    meta = ReplayMeta.objects(source_id=source_id, window_start=window_start).first()
-    created = False
-    if not meta:
-        meta = ReplayMeta(
-            source_id=source_id,
-            window_start=window_start,
-            minute_anomaly_bits=minute_anomaly_bytes, # defaults içeriği buraya gelir
-            second_filled_bits=second_filled_bytes
-        )
-        created = True # Eğer bu bilgiye ihtiyacınız varsa
-    else:
-        meta.minute_anomaly_bits = minute_anomaly_bytes
-        meta.second_filled_bits = second_filled_bytes
-        
-        
-    meta.save()
-    return meta
+
+    ReplayMeta._get_collection().update_one(
+        _window_filter(source_id, window_start),
+        {
+            '$set': {
+                'second_counts': _sparse(second_frames),
+                'minute_frames': _sparse(minute_frames),
+                'minute_anomalies': _sparse(minute_anomalies),
+                'minute_anomaly_bits': minute_anomaly_bytes,
+                'second_filled_bits': second_filled_bytes,
+                'updated_at': datetime.utcnow(),
+            },
+            '$inc': {'version': 1},
+        },
+        upsert=True
+    )
+    return ReplayMeta.objects(**_window_filter(source_id, window_start)).first()
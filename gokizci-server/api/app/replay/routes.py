@@ -1,74 +1,156 @@
 """api/app/replay/routes.py"""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
-from models.video_segment import VideoSegment
 from models.replay_meta import ReplayMeta
+from models.thumbnail import Thumbnail
+from app.settings import Config
+from app.storage.base import get_segment_store, to_naive_utc
+from app.replay.meta_utils import unpack_meta_bits, bit_runs
+import base64
+import hashlib
+import itertools
+import json
 import urllib.parse
 import logging
 
 replay_bp = Blueprint('replay', __name__)
 logger = logging.getLogger(__name__)
 
+SEGMENTS_DEFAULT_LIMIT = 500
+SEGMENTS_MAX_LIMIT = 5000
+
+def _parse_iso_arg(name, default=None):
+    value = request.args.get(name)
+    if not value:
+        return default
+    return datetime.fromisoformat(urllib.parse.unquote(value).replace('Z', '+00:00'))
+
 @replay_bp.route('/<string:source_id>/segments', methods=['GET'])
 @jwt_required()
 def get_replay_segments(source_id):
     """
-    Son 1 saate ait segment metadata'sını (timestamp, anomaly, confidence) döner.
+    Segment metadata'sını (timestamp, anomaly, confidence) sayfa sayfa, akış halinde döner.
     Opsiyonel query params:
-      - start: ISO timestamp (e.g. 2025-05-19T10:00:00Z)
-      - end:   ISO timestamp
+      - start: ISO timestamp (varsayılan: 1 saat önce)
+      - end:   ISO timestamp (varsayılan: şimdi)
+      - after: ISO timestamp; bu zamandan itibaren devam edilir (önceki yanıtın next_after'ı)
+      - after_ids: virgülle ayrılmış id'ler; `after` zamanındaki bu kareler zaten döndü, atlanır
+        (önceki yanıtın next_after_ids'i). Aynı milisaniyeye düşen kareler sayfa sınırında kaybolmaz.
+      - limit: sayfa boyutu (varsayılan 500, en fazla 5000)
+      - include_frames: 1/true ise kareler base64 olarak eklenir
+    Yanıt: {"segments": [...], "has_more": bool, "next_after": ISO timestamp | null, "next_after_ids": [...]}
     """
-    # parametreleri al
-    start_iso = request.args.get('start')
-    end_iso   = request.args.get('end')
     now = datetime.utcnow()
-    one_hour_ago = now - timedelta(hours=1)
-
     try:
-        # URL decode ve timestamp parse
-        if start_iso:
-            start_iso = urllib.parse.unquote(start_iso)
-            start_time = datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
-        else:
-            start_time = one_hour_ago
-
-        if end_iso:
-            end_iso = urllib.parse.unquote(end_iso)
-            end_time = datetime.fromisoformat(end_iso.replace('Z', '+00:00'))
-        else:
-            end_time = now
-
+        start_time = _parse_iso_arg('start', now - timedelta(hours=1))
+        end_time = _parse_iso_arg('end', now)
+        after = _parse_iso_arg('after')
+        after_ids = set(filter(None, request.args.get('after_ids', '').split(',')))
     except ValueError as e:
         return jsonify({ "error": f"Invalid timestamp format: {str(e)}" }), 400
-
     try:
-        segments = (
-            VideoSegment.objects(
-                source_id=source_id,
-                timestamp__gte=start_time,
-                timestamp__lte=end_time
-            )
-            .order_by('timestamp')
-            .only('timestamp', 'anomaly_detected', 'confidence', 'frame_data')
-        )
+        limit = min(SEGMENTS_MAX_LIMIT, max(1, int(request.args.get('limit', SEGMENTS_DEFAULT_LIMIT))))
+    except ValueError:
+        return jsonify({ "error": "limit must be an integer" }), 400
+    include_frames = request.args.get('include_frames', '').lower() in ('1', 'true', 'yes')
 
-        return jsonify({
-            "segments": [
-                {
-                    "timestamp": seg.timestamp.isoformat(),
-                    "anomaly": seg.anomaly_detected,
-                    "confidence": seg.confidence,
-                    "frame": seg.frame_data.decode('utf-8') if seg.frame_data else None
-                }
-                for seg in segments
-            ]
-        }), 200
+    if after is not None:
+        after = to_naive_utc(after)
+        start_time = max(to_naive_utc(start_time), after)
 
+    try:
+        # Tek cursor, yalnızca istenen alanlar; sayfanın bir fazlası has_more için okunur
+        segments = get_segment_store().iter_frames(source_id, start_time, end_time,
+                                                   include_frames=include_frames,
+                                                   batch_size=min(limit + 1, 1000))
+        if after is not None:
+            segments = (seg for seg in segments
+                        if seg['timestamp'] > after or (seg['timestamp'] == after and seg['id'] not in after_ids))
+        segments = itertools.islice(segments, limit + 1)
+        first = next(segments, None)  # Sorgu hataları yanıt başlamadan yakalanır
     except Exception as e:
         return jsonify({ "error": f"Database error: {str(e)}" }), 500
 
+    def generate():
+        yield '{"segments":['
+        count = 0
+        last_timestamp = None
+        last_ids = []  # Son zaman damgasındaki karelerin id'leri (sonraki sayfanın after_ids'i)
+        has_more = False
+        for seg in itertools.chain([first] if first else [], segments):
+            if count == limit:
+                has_more = True  # limit + 1. kare: sonraki sayfa var
+                break
+            yield (',' if count else '') + json.dumps({
+                "id": seg['id'],
+                "timestamp": seg['timestamp'].isoformat(),
+                "anomaly": seg['anomaly_detected'],
+                "confidence": seg['confidence'],
+                "frame": base64.b64encode(seg['frame']).decode('ascii') if seg['frame'] else None
+            })
+            count += 1
+            if seg['timestamp'] != last_timestamp:
+                last_timestamp, last_ids = seg['timestamp'], []
+            last_ids.append(seg['id'])
+        if has_more and last_timestamp == after:
+            # Sayfanın tamamı aynı zaman damgasındaysa öncekiler de atlanmaya devam etmeli
+            last_ids = sorted(after_ids) + last_ids
+        yield '],' + json.dumps({
+            "has_more": has_more,
+            "next_after": last_timestamp.isoformat() if has_more else None,
+            "next_after_ids": last_ids if has_more else []
+        })[1:]
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@replay_bp.route('/<string:source_id>/segments/<string:segment_id>/frame.jpg', methods=['GET'])
+@jwt_required()
+def get_replay_frame(source_id, segment_id):
+    """Tek bir karenin ham JPEG'ini döner (base64/JSON sarmalaması olmadan)."""
+    frame = get_segment_store().get_frame(source_id, segment_id)
+    if not frame:
+        return jsonify({"error": "Frame not found"}), 404
+
+    return Response(frame, mimetype='image/jpeg',
+                    headers={'Cache-Control': 'private, max-age=3600'})
+
+@replay_bp.route('/<string:source_id>/thumbnails', methods=['GET'])
+@jwt_required()
+def get_replay_thumbnails(source_id):
+    """
+    [start, end) aralığındaki zaman çizelgesi küçük resimlerini tek yanıtta döner.
+    Query params: start, end (ISO timestamp, zorunlu). En fazla THUMBNAIL_MAX_PER_REQUEST adet.
+    """
+    try:
+        start_time = datetime.fromisoformat(urllib.parse.unquote(request.args['start']).replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(urllib.parse.unquote(request.args['end']).replace('Z', '+00:00'))
+    except KeyError as e:
+        return jsonify({"error": f"Missing query parameter: {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Invalid timestamp format: {str(e)}"}), 400
+
+    thumbnails = (Thumbnail.objects(source_id=source_id,
+                                    timestamp__gte=to_naive_utc(start_time),
+                                    timestamp__lt=to_naive_utc(end_time))
+                  .order_by('timestamp')
+                  .only('timestamp', 'captured_at', 'image', 'anomaly_detected')
+                  .limit(Config.THUMBNAIL_MAX_PER_REQUEST))
+
+    return jsonify({
+        "interval_seconds": Config.THUMBNAIL_INTERVAL_SECONDS,
+        "thumbnails": [
+            {
+                "timestamp": thumb.timestamp.isoformat(),
+                "captured_at": thumb.captured_at.isoformat(),
+                "anomaly": thumb.anomaly_detected,
+                "image": base64.b64encode(thumb.image).decode('ascii')
+            }
+            for thumb in thumbnails
+        ]
+    }), 200
+
 @replay_bp.route('/<string:source_id>/meta', methods=['GET'])
 @jwt_required()
 def get_replay_meta(source_id):
@@ -123,6 +205,86 @@ def get_replay_meta(source_id):
     })
 
 
+META_RANGE_MAX_WINDOWS = 24 * 7
+
+def _window_etag(meta):
+    """
+    Pencere ETag'i: pencere başlangıcı, meta sürümü ve bitlerin özeti. Saklama işi meta'yı silip
+    yeniden oluşturduğunda sürüm baştan başlar; içerik özeti sayesinde eski bir ETag yeniden kullanılmaz.
+    """
+    digest = hashlib.sha1((meta.minute_anomaly_bits or b'') + b'|' + (meta.second_filled_bits or b'')).hexdigest()[:16]
+    return f'"{int((meta.window_start - datetime(1970, 1, 1)).total_seconds())}.{meta.version or 0}.{digest}"'
+
+def _requested_etags():
+    header = request.headers.get('If-None-Match', '')
+    return {tag.strip() for tag in header.split(',') if tag.strip()}
+
+@replay_bp.route('/<string:source_id>/meta/range', methods=['GET'])
+@jwt_required()
+def get_replay_meta_range(source_id):
+    """
+    [start, end) aralığındaki tüm saat pencerelerinin meta'sını tek yanıtta, sıkıştırılmış olarak döner.
+    Query params:
+      - start, end: ISO timestamp (zorunlu, en fazla 7 günlük aralık)
+      - format: 'rle' (varsayılan; dolu saniye / anomali dakika aralıkları) veya 'base64' (ham bitset)
+    Her pencerenin ETag'i meta sürümünden ve bitlerinin özetinden türetilir. If-None-Match ile gönderilen pencere ETag'leri
+    değişmediyse o pencere yalnızca {"window_start", "etag", "not_modified": true} olarak döner;
+    yanıtın tamamı (aralık ETag'i) değişmediyse 304 döner. Meta'sı olmayan pencereler yanıtta yer almaz.
+    """
+    try:
+        start_time = _parse_iso_arg('start')
+        end_time = _parse_iso_arg('end')
+    except ValueError as e:
+        return jsonify({"error": f"Invalid timestamp format: {str(e)}"}), 400
+    if start_time is None or end_time is None:
+        return jsonify({"error": "start and end are required"}), 400
+    start_time = to_naive_utc(start_time).replace(minute=0, second=0, microsecond=0)
+    end_time = to_naive_utc(end_time)
+    if (end_time - start_time) > timedelta(hours=META_RANGE_MAX_WINDOWS):
+        return jsonify({"error": f"Range too large (max {META_RANGE_MAX_WINDOWS} windows)"}), 400
+    output_format = request.args.get('format', 'rle')
+    if output_format not in ('rle', 'base64'):
+        return jsonify({"error": "format must be 'rle' or 'base64'"}), 400
+
+    metas = (ReplayMeta.objects(source_id=source_id, window_start__gte=start_time, window_start__lt=end_time)
+             .only('window_start', 'version', 'minute_anomaly_bits', 'second_filled_bits', 'finalized')
+             .order_by('window_start'))
+    metas = list(metas)
+    window_etags = [_window_etag(meta) for meta in metas]
+    range_etag = '"' + hashlib.sha1(
+        f"{source_id}|{output_format}|{start_time.isoformat()}|{end_time.isoformat()}|{','.join(window_etags)}".encode()
+    ).hexdigest() + '"'
+
+    known = _requested_etags()
+    if range_etag in known:
+        return Response(status=304, headers={'ETag': range_etag})
+
+    windows = []
+    for meta, etag in zip(metas, window_etags):
+        entry = {"window_start": meta.window_start.isoformat(), "etag": etag}
+        if etag in known:
+            entry["not_modified"] = True
+            windows.append(entry)
+            continue
+        entry["finalized"] = bool(meta.finalized)
+        if output_format == 'base64':
+            entry["minute_anomaly_bits"] = base64.b64encode(meta.minute_anomaly_bits or bytes(8)).decode('ascii')
+            entry["second_filled_bits"] = base64.b64encode(meta.second_filled_bits or bytes(450)).decode('ascii')
+        else:
+            minute_anomaly, second_filled = unpack_meta_bits(meta.minute_anomaly_bits, meta.second_filled_bits)
+            entry["minute_anomaly_ranges"] = bit_runs(minute_anomaly)
+            entry["second_filled_ranges"] = bit_runs(second_filled)
+        windows.append(entry)
+
+    response = jsonify({
+        "source_id": source_id,
+        "format": output_format,
+        "windows": windows
+    })
+    response.headers['ETag'] = range_etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @replay_bp.route('/<string:source_id>/meta/available_windows', methods=['GET'])
 @jwt_required()
 def get_available_replay_windows(source_id):
@@ -1,53 +1,159 @@
 # api/app/replay/scheduler.py
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
-from .meta_utils import compute_replay_meta
+from datetime import datetime, timedelta
+from .meta_utils import compute_replay_meta, finalize_replay_meta
+from .meta_tracker import get_meta_tracker
+from app.settings import Config
+from app.system.cluster import get_cluster
 from models.device import Device
+from models.replay_meta import ReplayMeta
+import eventlet
 import logging
+import random
+import time
+import zlib
 
 logger = logging.getLogger(__name__)
 
 def get_all_source_ids():
     return [d.source_id for d in Device.objects.only('source_id')]
 
-def scheduled_replay_meta_job():
+def get_owned_source_ids():
+    """Meta işleri yalnızca kaynağın sahibi olan düğümde çalışır (bkz. app/system/cluster.py)."""
+    return get_cluster().owned(get_all_source_ids())
+
+
+class ReplayMetaScheduler:
     """
-    Her 5 dakikada bir (saatin 0, 5, 10... dakikalarında) çalışacak olan iş.
+    Kaynak başına replay meta işlerini planlar.
+
+    Her turda (APScheduler, `interval` saniye) kaynaklar aynı anda değil, aralığa yayılarak
+    işlenir: kaynağın kimliğinden türetilen sabit bir kaydırma + `jitter` kadar rastgele gecikme.
+    İşler `workers` boyutlu bir GreenPool'da çalışır. Bir kaynak için:
+      * son turdan beri yeni kare yazılmadıysa ve saat dönmediyse iş atlanır
+      * bekleyen artımlı sayaçlar yazılır (bkz. meta_tracker.py)
+      * saat döndüyse önceki saat depodan yeniden hesaplanıp sonlandırılır (daha eski açık
+        pencereler için bkz. backfill_meta.py); bu sırada
+        tracker o pencerenin artışlarını bekletir (bkz. ReplayMetaTracker.hold)
     """
-    now = datetime.utcnow()
-    current_window_start = now.replace(minute=0, second=0, microsecond=0)
-    logger.info(f"Scheduler running for current window_start: {current_window_start}")
-    source_ids = get_all_source_ids() # Aktif cihazların source_id'leri
-    if not source_ids:
-        logger.info("No source_ids found to process for replay meta.")
-        return
 
-    for source_id in source_ids:
+    def __init__(self, interval=300, workers=4, jitter=0.1, recompute_on_finalize=True):
+        self.interval = interval
+        self.jitter = jitter
+        self.recompute_on_finalize = recompute_on_finalize
+        self.pool = eventlet.GreenPool(size=workers)
+        self._last_run = {}      # source_id -> son işlenme zamanı (time.time())
+        self._last_window = {}   # source_id -> son işlendiğinde geçerli olan pencere
+        self._scheduled = set()  # Kuyrukta bekleyen kaynaklar (turlar üst üste binmesin)
+        self.stats = {'runs': 0, 'processed': 0, 'skipped': 0, 'finalized': 0, 'failed': 0, 'last_job_ms': 0.0}
+
+    def offset(self, source_id):
+        """Kaynağın tur içindeki gecikmesi: kimliğe göre sabit yayılım + rastgele jitter."""
+        spread = (zlib.crc32(source_id.encode('utf-8')) % 10000) / 10000.0
+        return (spread + random.uniform(0, self.jitter)) % 1.0 * self.interval
+
+    def run(self):
+        """APScheduler işi: bu turun kaynak işlerini aralığa yayarak planlar."""
+        self.stats['runs'] += 1
+        for source_id in get_owned_source_ids():
+            if source_id in self._scheduled:
+                continue
+            self._scheduled.add(source_id)
+            eventlet.spawn_after(self.offset(source_id), self.pool.spawn_n, self.process_source, source_id)
+
+    def process_source(self, source_id, now=None):
+        started = time.monotonic()
+        self._scheduled.discard(source_id)
+        now = now or datetime.utcnow()
+        current_window_start = now.replace(minute=0, second=0, microsecond=0)
+        tracker = get_meta_tracker()
+
+        last_run = self._last_run.get(source_id)
+        rolled_over = self._last_window.get(source_id) != current_window_start
+        new_ingest = last_run is None or tracker.last_ingest.get(source_id, 0) > last_run
+        if not new_ingest and not rolled_over:
+            self.stats['skipped'] += 1
+            return
+
         try:
-            logger.info(f"Computing replay meta for source_id: {source_id}, window: {current_window_start}")
-            compute_replay_meta(source_id, current_window_start)
+            self._last_run[source_id] = time.time()
+            tracker.flush(source_id)
+            if rolled_over:
+                # Yalnızca bir önceki saat sonlandırılır. Yeniden başlatma sonrası ilk tur da "dönmüş"
+                # sayılır; daha eski açık pencereler (kesinti, eski sürümler) burada taranmaz, backfill_meta ile onarılır.
+                open_windows = ReplayMeta.objects(
+                    source_id=source_id, finalized__ne=True,
+                    window_start=current_window_start - timedelta(hours=1)
+                ).only('window_start')
+                for meta in open_windows:
+                    logger.info(f"Finalizing replay meta for source_id: {source_id}, window: {meta.window_start}")
+                    # Geç gelen kareler depodan yeniden hesaplanırken ayrıca $inc edilip iki kez sayılmasın
+                    with tracker.hold(source_id, meta.window_start):
+                        if self.recompute_on_finalize:
+                            compute_replay_meta(source_id, meta.window_start)
+                        finalize_replay_meta(source_id, meta.window_start)
+                    self.stats['finalized'] += 1
+                self._last_window[source_id] = current_window_start
+            self.stats['processed'] += 1
         except Exception as e:
-            logger.error(f"Error computing replay meta for {source_id} at {current_window_start}: {e}", exc_info=True)
-    logger.info(f"Replay meta computation complete for window_start: {current_window_start}")
-    # Ek olarak, bir önceki saatin meta verisinin "son halini" garantilemek için
-    # saat başlarında (örn: XX:01:00) bir önceki saat için de bir hesaplama tetiklenebilir.
-    # Ama sürekli güncelleme genellikle yeterli olacaktır.
+            self.stats['failed'] += 1
+            logger.error(f"Error processing replay meta for {source_id}: {e}", exc_info=True)
+        finally:
+            self.stats['last_job_ms'] = (time.monotonic() - started) * 1000
+
+    def get_stats(self):
+        return dict(self.stats, queued=len(self._scheduled), running=self.pool.running())
+
+
+_scheduler = None
+
+def get_meta_scheduler():
+    """Süreç başına tek ReplayMetaScheduler örneği."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReplayMetaScheduler(
+            interval=Config.REPLAY_META_INTERVAL,
+            workers=Config.REPLAY_META_WORKERS,
+            jitter=Config.REPLAY_META_JITTER,
+            recompute_on_finalize=Config.REPLAY_META_FINALIZE_RECOMPUTE,
+        )
+    return _scheduler
+
+def scheduled_replay_meta_job():
+    """
+    Her REPLAY_META_INTERVAL saniyede bir çalışır; iş kaynaklara bölünüp aralığa yayılır
+    (bkz. ReplayMetaScheduler). Tarama yapılmaz; meta ingest ile artımlı tutulur.
+    """
+    get_meta_scheduler().run()
 
 # Uygulama başlangıcında meta verilerini bir kez yenileme fonksiyonu
-def initial_replay_meta_update():
+def initial_replay_meta_update(workers=None):
+    """
+    Bellekteki sayaçlar süreçle birlikte kaybolduğu için mevcut saatin meta'sı başlangıçta
+    depodan bir kez baştan hesaplanır; sonraki kareler bunun üzerine $inc edilir.
+    Başlangıcı bekletmemesi için arka planda çalıştırılır (bkz. app/system/readiness.py);
+    kaynaklar `workers` boyutlu bir GreenPool'da işlenir ve hesaplama süresince tracker o pencereyi
+    flush etmez (bkz. ReplayMetaTracker.hold).
+    """
     logger.info("Performing initial replay meta update...")
     now = datetime.utcnow()
     # Mevcut saat diliminin başını al
     window_start = now.replace(minute=0, second=0, microsecond=0)
-    source_ids = get_all_source_ids()
+    source_ids = get_owned_source_ids()
     if not source_ids:
         logger.info("No source_ids found for initial replay meta update.")
         return
+    tracker = get_meta_tracker()
 
-    for source_id in source_ids:
+    def compute(source_id):
         try:
             logger.info(f"Initial compute replay meta for source_id: {source_id}, window: {window_start}")
-            compute_replay_meta(source_id, window_start)
+            with tracker.hold(source_id, window_start):
+                compute_replay_meta(source_id, window_start)
         except Exception as e:
             logger.error(f"Error in initial replay meta for {source_id} at {window_start}: {e}", exc_info=True)
-    logger.info("Initial replay meta update complete.")
\ No newline at end of file
+
+    pool = eventlet.GreenPool(size=workers or Config.REPLAY_META_WORKERS)
+    for source_id in source_ids:
+        pool.spawn_n(compute, source_id)
+    pool.waitall()
+    logger.info("Initial replay meta update complete.")
@@ -0,0 +1,214 @@
+"""api/app/replay/sessions.py"""
+
+import logging
+
+import eventlet
+from eventlet.event import Event
+
+from app.extensions import socketio
+from app.replay.streamer import ReplayStreamer
+from app.settings import Config
+from app.storage.base import get_segment_store
+
+logger = logging.getLogger(__name__)
+
+MIN_SPEED = 0.25
+MAX_SPEED = 16.0
+
+
+class ReplaySession:
+    """
+    Bir socket bağlantısının (SID) replay oturumu. Her izleyicinin kendi oturumu vardır;
+    aynı kamerayı izleyen iki istemci birbirini durdurmaz.
+
+    Oynatma bir green thread'de ReplayStreamer üzerinden yapılır:
+      * pause / resume : akış (ve cursor) açık kalır, yalnızca yayın bekletilir
+      * set_speed      : saat yeniden hizalanır; okuma modu değişmiyorsa cursor korunur, değişirse
+                         streamer son yayınlanan karenin hemen sonrasından (timestamp, id) yeniden açılır
+      * seek           : mevcut konum bırakılır, streamer yeni konumdan (dahil) yeniden açılır
+      * close          : okuma ve yayın durdurulur (stop_replay veya disconnect)
+    """
+
+    def __init__(self, sid, source_id, start, end=None, max_fps=30, speed=1.0, store=None):
+        self.sid = sid
+        self.source_id = source_id
+        self.position = start
+        self._position_ids = set()  # position zamanında yayınlanmış karelerin id'leri (yeniden açılışta atlanır)
+        self.end = end
+        self.max_fps = max_fps
+        self.speed = speed
+        self.store = store or get_segment_store()
+        self._streamer = None
+        self._thread = None
+        self._closed = False
+        self._restart = False
+        self._show_next = False  # Duraklatılmışken seek sonrası yeni konumdaki kare gösterilir
+        self._resumed = Event()
+        self._resumed.send()
+
+    @property
+    def paused(self):
+        return not self._resumed.ready()
+
+    def state(self):
+        return {
+            'source_id': self.source_id,
+            'position': self.position.isoformat() if self.position else None,
+            'speed': self.speed,
+            'paused': self.paused,
+        }
+
+    def _status(self, status, **extra):
+        socketio.emit('replay_status', dict(self.state(), status=status, **extra), room=self.sid)
+
+    def _make_streamer(self):
+        return ReplayStreamer(
+            self.store, self.source_id, self.position, self.end,
+            max_fps=self.max_fps,
+            speed=self.speed,
+            index_only=self.speed >= Config.REPLAY_INDEX_ONLY_SPEED,
+            prefetch=Config.REPLAY_PREFETCH_FRAMES,
+            batch_size=Config.REPLAY_BATCH_SIZE,
+            max_gap=Config.REPLAY_MAX_GAP_SECONDS,
+            skip_ids=self._position_ids,
+        )
+
+    def start(self):
+        self._thread = eventlet.spawn(self._run)
+
+    def _run(self):
+        emitted = 0
+        try:
+            while not self._closed:
+                self._streamer = self._make_streamer()
+                for segment in self._streamer.frames():
+                    if self._show_next:
+                        self._show_next = False
+                    elif self.paused:
+                        self._resumed.wait()
+                        self._streamer.reanchor()
+                    if self._closed or self._restart:
+                        break
+                    # Konum emit'ten önce güncellenir: mesaj kuyruğu manager'ında emit yield eder ve
+                    # bu sırada gelen seek'in yazdığı konum eski zaman damgasıyla ezilmemelidir
+                    if segment['timestamp'] != self.position:
+                        self._position_ids = set()
+                    self.position = segment['timestamp']
+                    self._position_ids.add(segment['id'])
+                    socketio.emit('replay_frame', {
+                        'frame': segment['frame'],
+                        'timestamp': segment['timestamp'].isoformat(),
+                        'anomaly_detected': segment['anomaly_detected'],
+                        'confidence': segment['confidence'],
+                        'source_id': self.source_id
+                    }, room=self.sid)
+                    emitted += 1
+                    if self._closed or self._restart:
+                        break
+                self._streamer.stop()
+                if self._restart:
+                    self._restart = False
+                    continue
+                if not self._closed:
+                    if emitted == 0:
+                        self._status('no_segments_found',
+                                     message='Replay failed: No segments found for the specified time range.')
+                    else:
+                        self._status('ended')
+                break
+        except Exception as e:
+            logger.error(f"[REPLAY_SESSION] Replay failed for {self.source_id} (sid={self.sid}): {e}", exc_info=True)
+            self._status('query_error', message='An error occurred while querying the database.')
+        finally:
+            if self._streamer is not None:
+                self._streamer.stop()
+            get_replay_sessions().discard(self)
+
+    def _restart_streamer(self):
+        self._restart = True
+        if self._streamer is not None:
+            self._streamer.stop()
+
+    def seek(self, timestamp):
+        self.position = timestamp
+        self._position_ids = set()  # Seek konumundaki kareler dahil gösterilir
+        self._show_next = self.paused
+        self._restart_streamer()
+        if self.paused:
+            self._resumed_wakeup()
+
+    def _resumed_wakeup(self):
+        # Duraklatılmış döngü bir kare elinde bekliyorsa yeniden başlatma için uyandırılır
+        resumed, self._resumed = self._resumed, Event()
+        if not resumed.ready():
+            resumed.send()
+
+    def set_speed(self, speed):
+        speed = min(MAX_SPEED, max(MIN_SPEED, float(speed)))
+        index_only = speed >= Config.REPLAY_INDEX_ONLY_SPEED
+        self.speed = speed
+        if self._streamer is not None and self._streamer.index_only != index_only:
+            self._restart_streamer()  # Okuma modu değişti; mevcut konumdan yeniden açılır
+        elif self._streamer is not None:
+            self._streamer.set_speed(speed)
+        return speed
+
+    def pause(self):
+        if not self.paused:
+            self._resumed = Event()
+
+    def resume(self):
+        if self.paused:
+            self._resumed.send()
+
+    def close(self):
+        self._closed = True
+        if self._streamer is not None:
+            self._streamer.stop()
+        if self.paused:
+            self._resumed.send()
+
+
+class ReplaySessionManager:
+    """SID -> ReplaySession. Bir SID'nin aynı anda tek oturumu olur; yenisi eskisini kapatır."""
+
+    def __init__(self):
+        self._sessions = {}
+
+    def start(self, sid, source_id, start, end=None, max_fps=30, speed=1.0):
+        self.close(sid)
+        session = ReplaySession(sid, source_id, start, end, max_fps=max_fps,
+                                speed=min(MAX_SPEED, max(MIN_SPEED, float(speed))))
+        self._sessions[sid] = session
+        session.start()
+        logger.info(f"[REPLAY_SESSION] Started {source_id} for sid={sid} from {start.isoformat()}")
+        return session
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def close(self, sid):
+        session = self._sessions.pop(sid, None)
+        if session is not None:
+            session.close()
+            logger.info(f"[REPLAY_SESSION] Closed {session.source_id} for sid={sid}")
+        return session
+
+    def discard(self, session):
+        """Kendiliğinden biten oturumu, yerine yenisi açılmadıysa kaldırır."""
+        if self._sessions.get(session.sid) is session:
+            del self._sessions[session.sid]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+_sessions = None
+
+
+def get_replay_sessions():
+    """Süreç başına tek ReplaySessionManager örneği."""
+    global _sessions
+    if _sessions is None:
+        _sessions = ReplaySessionManager()
+    return _sessions
@@ -0,0 +1,138 @@
+"""api/app/replay/streamer.py"""
+
+import logging
+import time
+
+import eventlet
+from eventlet.queue import Queue, Empty
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class ReplayStreamer:
+    """
+    Kayıtlı kareleri tek bir cursor'dan okuyup yayınlayan oynatıcı.
+
+    Okuma ayrı bir green thread'de yapılır ve kareler sınırlı bir tampona (`prefetch`) önceden
+    alınır; böylece Mongo gecikmesi yayın aralığına eklenmez. Yayın zamanı her karenin kayıt
+    zamanından hesaplanır ve monoton saatle beklenir (birikmeli kayma olmaz):
+
+        due = anchor_clock + (timestamp - anchor_timestamp) / speed
+
+    Kayıtta `max_gap`'ten uzun boşluklar ve okumanın `max_gap`'ten fazla geride kaldığı durumlar
+    saati yeniden hizalar; kareler ne uzun süre beklenir ne de toplu halde basılır.
+
+    Hızlı oynatmada kareler daha sık basılmaz, seyreltilir: kayıt zamanında birbirine
+    `speed / max_fps` saniyeden yakın kareler (anomali kareleri hariç) okuma tarafında atlanır.
+    `index_only` ise kareler metadata olarak okunur ve yalnızca yayınlanacakların JPEG'i
+    get_frame ile çekilir; yüksek hızlarda atlanan karelerin baytları hiç taşınmaz.
+
+    Okuma `start` dahil başlar; `skip_ids` verilirse tam `start` zamanındaki bu kareler (zaten
+    yayınlanmış olanlar) atlanır ve oynatma son yayınlanan karenin hemen sonrasından sürer.
+    """
+
+    def __init__(self, store, source_id, start, end=None, max_fps=None, speed=1.0, index_only=False,
+                 prefetch=150, batch_size=100, max_gap=2.0, clock=time.monotonic, skip_ids=()):
+        self.store = store
+        self.source_id = source_id
+        self.start = start
+        self.skip_ids = frozenset(skip_ids)
+        self.end = end
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.speed = speed
+        self.index_only = index_only
+        self.batch_size = batch_size
+        self.max_gap = max_gap
+        self.clock = clock
+        self._queue = Queue(maxsize=prefetch)
+        self._producer = None
+        self._stopped = False
+        self._reanchor = False
+
+    def set_speed(self, speed):
+        self.speed = speed
+        self._reanchor = True
+
+    def reanchor(self):
+        """Sonraki kareyi hemen yayınlar ve saati ona göre hizalar (duraklatma/devam sonrası)."""
+        self._reanchor = True
+
+    def _produce(self):
+        last_kept = None
+        try:
+            frames = self.store.iter_frames(self.source_id, self.start, self.end,
+                                            include_frames=not self.index_only, batch_size=self.batch_size)
+            for frame in frames:
+                if self._stopped:
+                    return
+                timestamp = frame['timestamp']
+                if timestamp == self.start and frame['id'] in self.skip_ids:
+                    continue
+                if (last_kept is not None and not frame['anomaly_detected']
+                        and (timestamp - last_kept).total_seconds() < self.min_interval * self.speed):
+                    continue
+                last_kept = timestamp
+                if self.index_only:
+                    frame['frame'] = self.store.get_frame(self.source_id, frame['id'])
+                    if frame['frame'] is None:
+                        continue
+                self._queue.put(frame)
+        except Exception as e:
+            logger.error(f"[REPLAY_STREAMER] Read failed for {self.source_id}: {e}", exc_info=True)
+            self._queue.put(_Failure(e))
+            return
+        self._queue.put(_END)
+
+    def stop(self):
+        """Okumayı sonlandırır; tamponda bekleyen tüketici _END ile uyandırılır."""
+        self._stopped = True
+        if self._producer is not None:
+            self._producer.kill()
+            self._producer = None
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                break
+        self._queue.put_nowait(_END)
+
+    def frames(self):
+        """Kareleri yayın zamanları geldikçe üretir. Okuma hatası çağırana yeniden fırlatılır."""
+        if self._producer is None:
+            self._producer = eventlet.spawn(self._produce)
+
+        anchor_clock = anchor_timestamp = previous = None
+        try:
+            while not self._stopped:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+
+                timestamp = item['timestamp']
+                if self._reanchor or (previous is not None and (timestamp - previous).total_seconds() > self.max_gap):
+                    self._reanchor = False
+                    anchor_clock = None  # Duraklatma/hız değişimi veya kayıtta boşluk
+                previous = timestamp
+                if anchor_clock is not None:
+                    wait = anchor_clock + (timestamp - anchor_timestamp).total_seconds() / self.speed - self.clock()
+                    if wait < -self.max_gap:
+                        anchor_clock = None  # Okuma geride kaldı; birikenler toplu basılmaz
+                    elif wait > 0:
+                        eventlet.sleep(wait)
+                if anchor_clock is None:
+                    anchor_clock, anchor_timestamp = self.clock(), timestamp
+
+                if self._stopped:
+                    return
+                yield item
+        finally:
+            self.stop()
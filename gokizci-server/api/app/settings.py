@@ -1,6 +1,7 @@
 # api/app/config.py
 
 import os
+import socket
 from datetime import timedelta
 
 class Config:
@@ -36,3 +37,75 @@ class Config:
     # MongoDB
     MONGODB_DB = 'Gokizci'
     MONGODB_HOST = 'mongodb://127.0.0.1:27017'
+
+    # Kare depolama yerleşimi: 'document' (kare başına VideoSegment) | 'chunked' (saniye başına VideoChunk)
+    # | 'file' (diskte saatlik segment dosyaları + Mongo'da offset index'i)
+    SEGMENT_STORE = os.environ.get('SEGMENT_STORE', 'document')
+    SEGMENT_FILE_ROOT = os.environ.get('SEGMENT_FILE_ROOT', 'segment_data')
+
+    # Kademeli saklama (bkz. app/storage/retention.py). Device.retention ile cihaz başına ezilebilir.
+    RETENTION_FULL_RATE_HOURS = float(os.environ.get('RETENTION_FULL_RATE_HOURS', 6))  # Tüm karelerin tutulduğu süre
+    RETENTION_KEYFRAME_DAYS = float(os.environ.get('RETENTION_KEYFRAME_DAYS', 7))      # Seyreltilmiş karelerin tutulduğu süre
+    RETENTION_KEYFRAME_FPS = float(os.environ.get('RETENTION_KEYFRAME_FPS', 1))        # Seyreltme sonrası kare hızı
+    RETENTION_ANOMALY_DAYS = float(os.environ.get('RETENTION_ANOMALY_DAYS', 30))       # Anomali karelerinin tutulduğu süre
+    RETENTION_COMPACTION_INTERVAL = int(os.environ.get('RETENTION_COMPACTION_INTERVAL', 600))  # Sıkıştırma işi aralığı (sn)
+
+    # VideoSegment toplu yazıcı (bkz. app/storage/segment_writer.py)
+    SEGMENT_WRITER_QUEUE_SIZE = int(os.environ.get('SEGMENT_WRITER_QUEUE_SIZE', 5000))  # Bekleyen en fazla doküman
+    SEGMENT_WRITER_BATCH_SIZE = int(os.environ.get('SEGMENT_WRITER_BATCH_SIZE', 200))   # insert_many başına doküman
+    SEGMENT_WRITER_FLUSH_MS = float(os.environ.get('SEGMENT_WRITER_FLUSH_MS', 500))     # İlk dokümandan sonra en fazla bekleme
+    SEGMENT_WRITER_POLICY = os.environ.get('SEGMENT_WRITER_POLICY', 'drop_oldest')      # drop_oldest | drop_newest | block
+
+    # Canlı yayın jitter buffer (kaynak başına yeniden sıralama)
+    JITTER_REORDER_WINDOW = int(os.environ.get('JITTER_REORDER_WINDOW', 10))         # Boşluk atlanmadan önce beklenen en fazla kare
+    JITTER_MAX_LATENCY_MS = float(os.environ.get('JITTER_MAX_LATENCY_MS', 500))      # Eksik kare için en fazla bekleme
+    LIVE_MAX_BURST = int(os.environ.get('LIVE_MAX_BURST', 2))                         # Tek seferde gönderilen en fazla kare (en yeniler)
+    LIVE_SUBSCRIBER_MAX_PENDING = int(os.environ.get('LIVE_SUBSCRIBER_MAX_PENDING', 2))  # İzleyici başına gönderilmeyi bekleyen en fazla kare
+
+    # Canlı önizleme rendition'ı ('source_id:preview' odası, bkz. app/socket/renditions.py)
+    PREVIEW_WIDTH = int(os.environ.get('PREVIEW_WIDTH', 160))              # Yükseklik orantılı (640x480 -> 160x120)
+    PREVIEW_FPS = float(os.environ.get('PREVIEW_FPS', 5))
+    PREVIEW_JPEG_QUALITY = int(os.environ.get('PREVIEW_JPEG_QUALITY', 60))
+
+    # Çok düğümlü çalışma (bkz. app/system/cluster.py, app/socket/message_queue.py)
+    NODE_ID = os.environ.get('NODE_ID', socket.gethostname())            # Bu düğümün CLUSTER_NODES'taki adı
+    CLUSTER_NODES = os.environ.get('CLUSTER_NODES', '')                  # 'api-1=http://10.0.0.1:5000,api-2=...' (boş: tek düğüm)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')  # redis://..., amqp://... veya local:// (boş: tek düğüm)
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'gokizci-socketio')
+    LIVE_PRESENCE_INTERVAL_SECONDS = float(os.environ.get('LIVE_PRESENCE_INTERVAL_SECONDS', 5))  # Önizleme odası izleyici sayılarının düğümler arası duyuru aralığı
+
+    # Ingest kabul kontrolü (bkz. app/inference/admission.py)
+    INGEST_MAX_PENDING_PER_SOURCE = int(os.environ.get('INGEST_MAX_PENDING_PER_SOURCE', 16))      # Kaynak başına en fazla bekleyen inference
+    INGEST_TARGET_PENDING_PER_SOURCE = int(os.environ.get('INGEST_TARGET_PENDING_PER_SOURCE', 4))  # Bunun üstünde kareler seyreltilir
+    INFERENCE_FPS_WINDOW_SECONDS = float(os.environ.get('INFERENCE_FPS_WINDOW_SECONDS', 5))        # Etkin fps ölçüm penceresi
+    INGEST_OBSERVE_QUEUE_SIZE = int(os.environ.get('INGEST_OBSERVE_QUEUE_SIZE', 64))  # Atlanan karelerin bekleyen decode işi (bkz. app/inference/observer.py)
+    INGEST_OBSERVE_WORKERS = int(os.environ.get('INGEST_OBSERVE_WORKERS', 2))         # Bu işleri yapan green thread sayısı
+
+    # Replay meta (bkz. app/replay/meta_tracker.py)
+    REPLAY_META_FLUSH_SECONDS = float(os.environ.get('REPLAY_META_FLUSH_SECONDS', 5))  # Artımlı sayaçların yazılma aralığı
+    REPLAY_META_INTERVAL = int(os.environ.get('REPLAY_META_INTERVAL', 300))          # Kaynak başına meta işi aralığı (sn)
+    REPLAY_META_WORKERS = int(os.environ.get('REPLAY_META_WORKERS', 4))              # Aynı anda çalışan kaynak işi
+    REPLAY_META_JITTER = float(os.environ.get('REPLAY_META_JITTER', 0.1))            # Aralığın bu oranı kadar rastgele kaydırma
+    REPLAY_META_FINALIZE_RECOMPUTE = os.environ.get('REPLAY_META_FINALIZE_RECOMPUTE', '1') == '1'  # Kapanan saat depodan yeniden hesaplansın
+
+    # Zaman çizelgesi küçük resimleri (bkz. app/storage/thumbnails.py)
+    THUMBNAIL_INTERVAL_SECONDS = int(os.environ.get('THUMBNAIL_INTERVAL_SECONDS', 10))  # Kaynak başına kaç saniyede bir
+    THUMBNAIL_WIDTH = int(os.environ.get('THUMBNAIL_WIDTH', 160))                       # Genişlik (yükseklik orantılı)
+    THUMBNAIL_JPEG_QUALITY = int(os.environ.get('THUMBNAIL_JPEG_QUALITY', 70))
+    THUMBNAIL_MAX_PER_REQUEST = int(os.environ.get('THUMBNAIL_MAX_PER_REQUEST', 720))   # Tek yanıttaki en fazla küçük resim
+
+    # Replay akışı (bkz. app/replay/streamer.py)
+    REPLAY_BATCH_SIZE = int(os.environ.get('REPLAY_BATCH_SIZE', 100))          # Cursor batch'i (kare)
+    REPLAY_PREFETCH_FRAMES = int(os.environ.get('REPLAY_PREFETCH_FRAMES', 150))  # Önceden okunan en fazla kare
+    REPLAY_MAX_GAP_SECONDS = float(os.environ.get('REPLAY_MAX_GAP_SECONDS', 2))  # Kayıttaki daha uzun boşluklar beklenmeden atlanır
+    REPLAY_INDEX_ONLY_SPEED = float(os.environ.get('REPLAY_INDEX_ONLY_SPEED', 4))  # Bu hızdan itibaren yalnızca yayınlanan karelerin JPEG'i okunur
+
+    # Inference (FutureFramePredictor)
+    MODEL_WEIGHTS_PATH = os.environ.get('MODEL_WEIGHTS_PATH')  # Boşsa model rastgele ağırlıklarla çalışır
+    INFERENCE_CLIP_LENGTH = 5        # Modelin girdi olarak aldığı frame sayısı
+    INFERENCE_FRAME_SIZE = 224       # Modelin beklediği kare boyutu (224x224)
+    ANOMALY_MSE_THRESHOLD = float(os.environ.get('ANOMALY_MSE_THRESHOLD', 0.01))  # Tahmin hatası eşiği
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 16))  # Bir batch'teki en fazla klip
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 20))       # İlk klipten sonra en fazla bekleme
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))        # 0: model web sürecinde (tpool), >0: ayrı süreçler
+    INFERENCE_SHM_SLOTS = int(os.environ.get('INFERENCE_SHM_SLOTS', 64))   # Shared-memory ring'deki klip slot sayısı
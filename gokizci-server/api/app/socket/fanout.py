@@ -0,0 +1,217 @@
+"""api/app/socket/fanout.py"""
+
+import logging
+import time
+from importlib import metadata
+
+import eventlet
+from engineio import packet as eio_packet
+from socketio import packet
+
+from app.settings import Config
+from app.socket.message_queue import LiveFanoutMixin
+
+logger = logging.getLogger(__name__)
+
+LIVE_EVENTS = ('processed_frame',)  # LiveFanout ile dağıtılan olaylar
+ENGINEIO_MAJOR = 4  # Doğrudan teslimin dayandığı Engine.IO sürümü (requirements.txt'te sabit)
+
+
+def engineio_direct_supported(eio):
+    """
+    Hazır paketleri izleyici kuyruğuna doğrudan koymak ve kuyruk derinliğini okumak için kullanılan
+    Engine.IO iç API'si (Server._get_socket(...).queue, Server.send_packet) bu sürümde var mı?
+    """
+    try:
+        major = int(metadata.version('python-engineio').split('.')[0])
+    except (metadata.PackageNotFoundError, ValueError):
+        major = None
+    if major != ENGINEIO_MAJOR:
+        logger.error(f"[LIVE_FANOUT] python-engineio major version {major} is not supported "
+                     f"(expected {ENGINEIO_MAJOR}.x); falling back to per-viewer emit")
+        return False
+    if not (callable(getattr(eio, '_get_socket', None)) and callable(getattr(eio, 'send_packet', None))):
+        logger.error("[LIVE_FANOUT] Engine.IO server lacks _get_socket/send_packet; falling back to per-viewer emit")
+        return False
+    return True
+
+
+class LiveFanout:
+    """
+    Canlı kareleri bir odadaki tüm izleyicilere dağıtır (fan-out).
+
+    Kare, Socket.IO paketine (başlık + binary attachment) oda başına yalnızca bir kez
+    serialize edilir; aynı Engine.IO paketleri tüm izleyicilerin gönderim kuyruğuna konur.
+    İzleyici başına kuyruk sınırlıdır: gönderilmeyi bekleyen kare sayısı `max_pending`'e
+    ulaşmış yavaş bir izleyicinin yeni karesi kuyruğa değil izleyicinin (yayın başına) tek karelik
+    bekleme yuvasına konur; yuvadaki eski kare atılır (newest wins). Kuyruk boşaldıkça yuva
+    `drain_interval` aralıkla boşaltılır; yavaş izleyici böylece her zaman en yeni kareyi alır.
+
+    Mesaj kuyruğuyla çok düğümlü çalışırken (bkz. message_queue.py) kare kuyruğa bir kez yazılır;
+    her düğüm kendi izleyicilerine deliver_local ile dağıtır.
+
+    Doğrudan teslim ve kuyruk derinliği Engine.IO'nun iç API'sine dayanır (python-engineio 4.x,
+    requirements.txt'te sabit). Sürüm veya API uymazsa (bkz. engineio_direct_supported) hata
+    loglanır ve izleyici başına public `emit(..., to=sid)` ile gönderilir: doğru ama encode izleyici başınadır.
+    """
+
+    def __init__(self, server=None, max_pending=2, namespace='/', drain_interval=0.02):
+        self._server = server
+        self.max_pending = max(1, max_pending)
+        self.namespace = namespace
+        self.drain_interval = drain_interval
+        self._direct = None  # Engine.IO iç API'si kullanılabilir mi (ilk kullanımda kontrol edilir)
+        self._slots = {}     # (eio_sid, yayın) -> bekleyen en yeni kare paketleri
+        self._drainer = None
+        self.stats = {'frames': 0, 'deliveries': 0, 'dropped': 0, 'deferred': 0,
+                      'last_encode_ms': 0.0, 'last_fanout_ms': 0.0}
+
+    @property
+    def server(self):
+        if self._server is None:
+            from app.extensions import socketio
+            self._server = socketio.server
+        return self._server
+
+    def encode(self, event, data):
+        """Olayı bir kez Engine.IO MESSAGE paketlerine çevirir (binary veride birden fazla paket)."""
+        encoded = packet.Packet(packet.EVENT, namespace=self.namespace, data=[event, data]).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        return [eio_packet.Packet(eio_packet.MESSAGE, part) for part in encoded]
+
+    @property
+    def direct(self):
+        if self._direct is None:
+            self._direct = engineio_direct_supported(self.server.eio)
+        return self._direct
+
+    def subscribers(self, room):
+        """Odadaki (sid, eio_sid) çiftleri."""
+        return list(self.server.manager.get_participants(self.namespace, room))
+
+    def _recipients(self, rooms):
+        """
+        Bir veya birden fazla odanın izleyicileri (eio_sid -> sid); birden fazla odadaki izleyici
+        bir kez sayılır.
+        """
+        recipients = {}
+        for room in [rooms] if isinstance(rooms, str) else rooms:
+            for sid, eio_sid in self.subscribers(room):
+                recipients.setdefault(eio_sid, sid)
+        return recipients
+
+    @property
+    def clustered(self):
+        return isinstance(self.server.manager, LiveFanoutMixin)
+
+    def has_subscribers(self, room):
+        """
+        Odada izleyici var mı? Çok düğümde diğer düğümlerin duyurduğu sayılara da bakılır
+        (yalnızca önizleme odaları izlenir, bkz. message_queue.LiveFanoutMixin).
+        """
+        if self.clustered:
+            return self.server.manager.has_presence(room)
+        return bool(self.subscribers(room))
+
+    def presence_changed(self, room):
+        """Bu düğümde odaya katılım/ayrılma oldu; çok düğümde yeni sayı diğer düğümlere duyurulur."""
+        if self.clustered:
+            self.server.manager.announce_presence([room])
+
+    def backlog(self, eio_sid):
+        """İzleyicinin Engine.IO kuyruğunda gönderilmeyi bekleyen paket sayısı."""
+        try:
+            return self.server.eio._get_socket(eio_sid).queue.qsize()
+        except KeyError:
+            return 0  # İzleyici bu arada ayrıldı
+        except AttributeError as e:
+            # Engine.IO'nun soket yapısı değişmiş: sessizce 0 dönmek yerine doğrudan teslim kapatılır
+            logger.error(f"[LIVE_FANOUT] Engine.IO socket queue is not available ({e}); falling back to per-viewer emit")
+            self._direct = False
+            return 0
+
+    def deliver(self, eio_sid, packets):
+        for pkt in packets:
+            self.server.eio.send_packet(eio_sid, pkt)
+
+    def publish(self, rooms, event, data):
+        """Kareyi odadaki (veya odalardaki) tüm izleyicilere gönderir; çok düğümde mesaj kuyruğu üzerinden."""
+        if self.clustered:
+            self.server.manager.emit(event, data, namespace=self.namespace, room=rooms)
+            return
+        self.deliver_local(rooms, event, data)
+
+    def deliver_local(self, rooms, event, data):
+        """
+        Kareyi bir kez encode edip bu düğümdeki her izleyiciye gönderir; kuyruğu dolu izleyicinin
+        karesi bekleme yuvasına konur. İzleyici yoksa encode edilmez.
+        """
+        recipients = self._recipients(rooms)
+        if not recipients:
+            return
+        if not self.direct:
+            self._emit_each(recipients, event, data)
+            return
+        started = time.perf_counter()
+        packets = self.encode(event, data)
+        encoded_at = time.perf_counter()
+
+        stream = rooms if isinstance(rooms, str) else tuple(rooms)
+        for eio_sid in recipients:
+            self._offer(eio_sid, stream, packets)
+
+        self.stats['frames'] += 1
+        self.stats['last_encode_ms'] = (encoded_at - started) * 1000
+        self.stats['last_fanout_ms'] = (time.perf_counter() - encoded_at) * 1000
+
+    def _offer(self, eio_sid, stream, packets):
+        """Kuyrukta yer varsa kareyi gönderir; yoksa yuvaya koyar (yuvadaki eski kare atılır)."""
+        key = (eio_sid, stream)
+        if self.backlog(eio_sid) < self.max_pending * len(packets):
+            self._slots.pop(key, None)  # Yuvadaki kare bundan eski
+            self.deliver(eio_sid, packets)
+            self.stats['deliveries'] += 1
+            return
+        if self._slots.get(key) is not None:
+            self.stats['dropped'] += 1
+        self._slots[key] = packets
+        self.stats['deferred'] += 1
+        if self._drainer is None:
+            self._drainer = eventlet.spawn(self._drain_loop)
+
+    def _drain_loop(self):
+        """Yuvalardaki kareleri, izleyicinin kuyruğu boşaldıkça gönderir; yuva kalmayınca biter."""
+        try:
+            while self._slots:
+                eventlet.sleep(self.drain_interval)
+                for (eio_sid, stream), packets in list(self._slots.items()):
+                    if self._slots.get((eio_sid, stream)) is not packets:
+                        continue  # Bu arada daha yeni bir kare geldi
+                    if self.backlog(eio_sid) < self.max_pending * len(packets):
+                        del self._slots[(eio_sid, stream)]
+                        self.deliver(eio_sid, packets)
+                        self.stats['deliveries'] += 1
+        finally:
+            self._drainer = None
+
+    def _emit_each(self, recipients, event, data):
+        """Engine.IO iç API'si kullanılamıyorken: izleyici başına public emit (kuyruk sınırı yok)."""
+        for sid in recipients.values():
+            self.server.emit(event, data, to=sid, namespace=self.namespace)
+            self.stats['deliveries'] += 1
+        self.stats['frames'] += 1
+
+    def get_stats(self):
+        return dict(self.stats, direct=bool(self._direct), waiting=len(self._slots))
+
+
+_fanout = None
+
+
+def get_live_fanout():
+    """Süreç başına tek LiveFanout örneği."""
+    global _fanout
+    if _fanout is None:
+        _fanout = LiveFanout(max_pending=Config.LIVE_SUBSCRIBER_MAX_PENDING)
+    return _fanout
@@ -0,0 +1,122 @@
+"""api/app/socket/fanout_benchmark.py
+
+Canlı fan-out'un izleyici başına sunucu CPU maliyetini ölçer. Ağ yoktur: izleyiciler, paketleri
+yalnızca sayan sahte Engine.IO kuyruklarıdır; ölçülen iş serialize + kuyruğa koymadır.
+İki yol karşılaştırılır:
+  * shared:     LiveFanout (kare oda başına bir kez encode edilir)
+  * per_viewer: her izleyici için ayrı encode (kare başına ayrı emit)
+
+Kullanım (api/ dizininden):
+    python -m app.socket.fanout_benchmark [--viewers 1,2,5,10,20,50] [--frames 500] [--frame-kb 40]
+
+Paylaşılan yolun encode sayısının izleyici sayısından bağımsız kaldığı tests/test_fanout_benchmark.py'de doğrulanır.
+"""
+
+import argparse
+import os
+import time
+
+from app.socket.fanout import LiveFanout
+
+
+class _BenchFanout(LiveFanout):
+    """Gerçek Socket.IO sunucusu yerine N sahte izleyiciye 'gönderen' fan-out."""
+
+    def __init__(self, viewers, per_viewer_encode=False):
+        super().__init__(server=object(), max_pending=2)
+        self._subscribers = [(f"sid{i}", f"eio{i}") for i in range(viewers)]
+        self.per_viewer_encode = per_viewer_encode
+        self.sent_bytes = 0
+        self.encodes = 0  # Socket.IO paket serialize sayısı
+
+    def encode(self, event, data):
+        self.encodes += 1
+        return super().encode(event, data)
+
+    @property
+    def clustered(self):
+        return False
+
+    @property
+    def direct(self):
+        return True
+
+    def subscribers(self, room):
+        return self._subscribers
+
+    def backlog(self, eio_sid):
+        return 0
+
+    def deliver(self, eio_sid, packets):
+        for pkt in packets:
+            # Engine.IO websocket yazıcısının paket başına yaptığı encode
+            self.sent_bytes += len(pkt.encode())
+
+    def publish(self, room, event, data):
+        if not self.per_viewer_encode:
+            return super().publish(room, event, data)
+        for eio_sid in self._recipients(room):
+            self.deliver(eio_sid, self.encode(event, data))
+
+
+def _payload(frame_kb, sequence):
+    return {
+        'source_id': 'bench',
+        'frame': os.urandom(frame_kb * 1024),
+        'server_timestamp_iso': '2025-01-01T00:00:00+00:00',
+        'client_sequence': sequence,
+        'client_timestamp_abs': 1735689600.0 + sequence / 25,
+        'client_timestamp_rel': sequence / 25,
+        'anomaly_detected': False,
+        'confidence': 0.0,
+    }
+
+
+def run(viewers, frames, frame_kb, per_viewer_encode):
+    """Kareleri yayınlar; (kare başına CPU süresi µs, kullanılan _BenchFanout) döner."""
+    fanout = _BenchFanout(viewers, per_viewer_encode=per_viewer_encode)
+    payloads = [_payload(frame_kb, i) for i in range(min(frames, 50))]
+    started = time.process_time()
+    for i in range(frames):
+        fanout.publish('bench', 'processed_frame', payloads[i % len(payloads)])
+    return (time.process_time() - started) / frames * 1e6, fanout
+
+
+def measure(viewers, frames, frame_kb, per_viewer_encode):
+    """Kare başına CPU süresi (µs)."""
+    return run(viewers, frames, frame_kb, per_viewer_encode)[0]
+
+
+def _slope(points):
+    """En küçük kareler eğimi: ek izleyici başına µs."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    den = sum((x - mean_x) ** 2 for x, _ in points) or 1.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / den
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure server CPU per additional live viewer')
+    parser.add_argument('--viewers', default='1,2,5,10,20,50', help='Comma separated viewer counts')
+    parser.add_argument('--frames', type=int, default=500, help='Frames published per measurement')
+    parser.add_argument('--frame-kb', type=int, default=40, help='JPEG payload size (640x480 ~ 30-60 KB)')
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.viewers.split(',')]
+    print(f"{'viewers':>8} {'shared us/frame':>16} {'per_viewer us/frame':>20}")
+    results = {'shared': [], 'per_viewer': []}
+    for count in counts:
+        shared = measure(count, args.frames, args.frame_kb, per_viewer_encode=False)
+        per_viewer = measure(count, args.frames, args.frame_kb, per_viewer_encode=True)
+        results['shared'].append((count, shared))
+        results['per_viewer'].append((count, per_viewer))
+        print(f"{count:>8} {shared:>16.1f} {per_viewer:>20.1f}")
+
+    if len(counts) > 1:
+        print(f"CPU per additional viewer: shared={_slope(results['shared']):.1f}us/frame, "
+              f"per_viewer={_slope(results['per_viewer']):.1f}us/frame")
+
+
+if __name__ == "__main__":
+    main()
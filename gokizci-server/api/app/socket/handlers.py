@@ -5,10 +5,19 @@ from flask_socketio import emit, join_room, leave_room
 from datetime import datetime
 from app.extensions import socketio
 from models.device import Device
-from app.extensions import pool, _process_single_frame_from_batch
+from app.extensions import pool, _process_single_frame_from_batch, reset_jitter_buffer
+from app.inference.engine import get_engine
+from app.inference.admission import get_admission_controller
+from app.replay.sessions import get_replay_sessions
+from app.socket.fanout import get_live_fanout
+from app.socket.renditions import RENDITIONS, get_preview_scheduler, rendition_room
+from app.system.cluster import get_cluster
 import logging
 
-sid_to_source = {}
+# Bağlantıya (SID) ait durum: bir bağlantı tek düğümde yaşadığı için düğümler arası paylaşılmaz.
+# Kaynak başına durum ise kaynağın sahibi olan düğümdedir (bkz. app/system/cluster.py).
+sid_to_source = {}      # ingest yapan cihaz bağlantısı -> source_id (disconnect'te offline işaretlemek için)
+redirected_sids = set() # Sahibi olmadığı kaynağı gönderdiği için yönlendirilen bağlantılar
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +26,6 @@ def handle_connect():
     try:
         print(f"Client connected: {request.sid}")
         if request.sid:
-                # Eşleştirmeyi tut
-            sid_to_source[request.sid] = request.sid
             join_room(request.sid)
             emit('status', {'status': 'connected', 'room': request.sid}, room=request.sid)
             print(f"[SERVER] ✅ connect from SID={request.sid}, namespace={request.namespace}")
@@ -30,6 +37,9 @@ def handle_connect():
 def handle_disconnect():
     try:
         print(f"Client disconnected: {request.sid}")
+        # Bu bağlantının replay oturumu varsa okuma ve yayını durdur
+        get_replay_sessions().close(request.sid)
+        redirected_sids.discard(request.sid)
         source_id = sid_to_source.pop(request.sid, None)
         if source_id:
             # Odayı terket
@@ -47,15 +57,42 @@ def handle_disconnect():
 
 @socketio.on('join')
 def handle_join(data):
+    """
+    Canlı yayın odasına katılır. `rendition` ('full' | 'preview') verilirse 'source_id:rendition'
+    odasına katılınır (ör: grid görünümü için düşük çözünürlüklü önizleme); verilmezse tam
+    çözünürlüklü karelerin de gönderildiği 'source_id' odasına.
+    """
     try:
         source_id = data.get('source_id')
+        rendition = data.get('rendition')
         if source_id:
-            join_room(source_id)
-            print(f"Client {request.sid} joined room {source_id}")
-            emit('status', {'status': 'connected', 'room': source_id})
+            if rendition and rendition not in RENDITIONS:
+                emit('error', {'message': f'join: unknown rendition {rendition}'})
+                return
+            room = rendition_room(source_id, rendition) if rendition else source_id
+            join_room(room)
+            if rendition:
+                get_live_fanout().presence_changed(room) # Önizleme yalnızca izleyicisi varken üretilir
+            print(f"Client {request.sid} joined room {room}")
+            emit('status', {'status': 'connected', 'room': room})
     except Exception as e:
         print(f"Error in join handler: {e}")
 
+@socketio.on('leave')
+def handle_leave(data):
+    try:
+        source_id = data.get('source_id')
+        rendition = data.get('rendition')
+        if source_id:
+            if rendition in RENDITIONS:
+                room = rendition_room(source_id, rendition)
+                leave_room(room)
+                get_live_fanout().presence_changed(room)
+            else:
+                leave_room(source_id)
+    except Exception as e:
+        print(f"Error in leave handler: {e}")
+
 
 """
 @socketio.on('video_frame')
@@ -97,6 +134,16 @@ def handle_video_frame_batch(batch_payload: dict):
         return
 
     logger.info(f"[HANDLER] Received batch of {len(frames_in_batch)} frames for source_id: {source_id} from SID: {request.sid}")
+    sid_to_source.setdefault(request.sid, source_id)
+
+    # Sticky ingest: kaynağın sahibi başka bir düğümse istemci oraya yönlendirilir. Yönlendirme
+    # tamamlanana kadar gelen kareler kaybolmasın diye burada yine işlenir.
+    cluster = get_cluster()
+    if cluster.enabled and not cluster.owns(source_id) and request.sid not in redirected_sids:
+        redirected_sids.add(request.sid)
+        logger.warning(f"[HANDLER] {source_id} is owned by {cluster.owner(source_id)}, redirecting SID {request.sid}")
+        emit('ingest_redirect', {'source_id': source_id, 'node_id': cluster.owner(source_id),
+                                 'url': cluster.owner_url(source_id)}, room=request.sid)
     
     # Batch içindeki frame'leri istemci zaman damgasına göre sırala (isteğe bağlı ama önerilir)
     # Bu, ağda veya istemci tarafındaki buffer'lamada oluşabilecek küçük sıra kaymalarını düzeltir.
@@ -107,11 +154,22 @@ def handle_video_frame_batch(batch_payload: dict):
         sorted_frames = frames_in_batch # Sıralama yapmadan devam et
 
 
+    # Kabul kontrolü: her kare kaydedilir; inference yalnızca kaynağın bütçesi ve ortak havuz
+    # izin veriyorsa yapılır. Kalanlar handler içinde decode edilmeden segment writer kuyruğuna ve
+    # canlı yayına verilir; pencere için gereken decode sınırlı WindowObserver kuyruğunda yapılır.
+    # Böylece havuz dolduğunda spawn_n'de beklenmez ve kuyruk sınırsız büyümez.
+    # Kayan penceredeki sıra burada, geliş sırasıyla ayrılır.
+    admission = get_admission_controller()
+    engine = get_engine()
     for frame_index, frame_data in enumerate(sorted_frames):
-        # Log: Batch içindeki bir frame işlenmek üzere pool'a gönderiliyor
         client_seq = frame_data.get('sequence', 'N/A')
-        logger.debug(f"[HANDLER] Spawning job for frame {frame_index + 1}/{len(sorted_frames)} from batch. Source: {source_id}, ClientSeq: {client_seq}")
-        pool.spawn_n(_process_single_frame_from_batch, source_id, frame_data)
+        ticket = engine.take_ticket(source_id)
+        if admission.admit(source_id, capacity=pool.free() > 0):
+            logger.debug(f"[HANDLER] Spawning job for frame {frame_index + 1}/{len(sorted_frames)} from batch. Source: {source_id}, ClientSeq: {client_seq}")
+            pool.spawn_n(_process_single_frame_from_batch, source_id, frame_data, ticket=ticket)
+        else:
+            logger.debug(f"[HANDLER] Inference shed for frame {frame_index + 1}/{len(sorted_frames)}. Source: {source_id}, ClientSeq: {client_seq}")
+            _process_single_frame_from_batch(source_id, frame_data, run_inference=False, ticket=ticket)
 
 
 @socketio.on('device_connect')
@@ -127,8 +185,15 @@ def handle_device_connect(data):
             return
 
         join_room(source_id)
+        sid_to_source[request.sid] = source_id
         print(f"Device {source_id} connected to room")
 
+        # Yeni akış: önceki oturumdan kalan kayan pencereyi ve sıralama tamponunu temizle
+        get_engine().reset_source(source_id)
+        reset_jitter_buffer(source_id)
+        get_admission_controller().reset_source(source_id)
+        get_preview_scheduler().reset_source(source_id)
+
         # Cihaz durumunu veritabanında işaretle
         device = Device.objects(source_id=source_id).first()
         if device:
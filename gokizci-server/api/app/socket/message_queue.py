@@ -0,0 +1,155 @@
+"""api/app/socket/message_queue.py
+
+Socket.IO'nun düğümler arası emit'i için client manager seçimi (SOCKETIO_MESSAGE_QUEUE):
+  * boş           : tek düğüm, varsayılan bellek içi manager
+  * redis://...   : socketio.RedisManager (Redis veya Redis uyumlu yerel bir sunucu)
+  * local://kanal : LocalPubSubManager; aynı süreçteki sunucular arasında bellek içi pub/sub
+                    (birden fazla uygulama örneğini tek süreçte denemek için)
+  * diğerleri     : socketio.KombuManager (amqp:// vb.)
+
+Tüm manager'larda canlı kareler (LiveFanout olayları) her düğümde yerel izleyicilere
+LiveFanout üzerinden dağıtılır: düğüm başına tek encode ve izleyici başına sınırlı kuyruk korunur.
+Önizleme odalarının izleyici sayıları da aynı kuyruktan düğümler arasında duyurulur; önizleme
+yalnızca herhangi bir düğümde izleyicisi varsa üretilir.
+"""
+
+import logging
+import queue
+import time
+import uuid
+
+import socketio
+
+from app.settings import Config
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_EVENT = '__room_presence__'  # Düğümler arası oda doluluğu; kuyrukta kalır, istemcilere gönderilmez
+
+
+class LiveFanoutMixin:
+    """
+    Kuyruktan gelen canlı kare emit'lerini bu düğümün LiveFanout'una yönlendirir ve izlenen
+    (önizleme) odalarının düğümler arası izleyici sayılarını tutar.
+
+    Her düğüm izlenen odalardaki yerel izleyici sayılarını `presence_interval` saniyede bir tam liste
+    olarak, odaya katılım/ayrılmada da yalnızca o oda için duyurur. `3 * presence_interval` saniyedir
+    duyuru yapmayan düğümün sayıları (ör. çöken düğüm) dikkate alınmaz.
+    """
+
+    presence_interval = 5.0
+
+    def initialize(self):
+        self._presence_node = uuid.uuid4().hex
+        self._remote_presence = {}  # düğüm -> (son duyurunun alındığı an, {oda: izleyici sayısı})
+        super().initialize()
+        if not self.write_only:
+            self.server.start_background_task(self._presence_loop)
+
+    @staticmethod
+    def _tracked(room):
+        from app.socket.renditions import PREVIEW
+
+        return isinstance(room, str) and room.endswith(f":{PREVIEW}")
+
+    def _local_presence(self, rooms=None, namespace='/'):
+        namespace_rooms = self.rooms.get(namespace, {})
+        if rooms is None:
+            rooms = [room for room in namespace_rooms if self._tracked(room)]
+        return {room: len(namespace_rooms.get(room) or ()) for room in rooms if self._tracked(room)}
+
+    def announce_presence(self, rooms=None):
+        """Yerel izleyici sayılarını kuyruğa yazar; rooms None ise izlenen tüm odaların tam listesi."""
+        self._publish({
+            'method': 'emit', 'event': PRESENCE_EVENT, 'namespace': '/', 'room': None,
+            'skip_sid': None, 'callback': None,
+            'data': {'node': self._presence_node, 'counts': self._local_presence(rooms), 'full': rooms is None},
+        })
+
+    def _update_presence(self, data):
+        if data.get('node') == getattr(self, '_presence_node', None):
+            return
+        _, counts = self._remote_presence.get(data['node'], (None, {}))
+        counts = dict(data['counts']) if data.get('full') else dict(counts, **data['counts'])
+        self._remote_presence[data['node']] = (time.monotonic(), counts)
+
+    def has_presence(self, room):
+        """Odada bu düğümde veya yakın zamanda duyuru yapmış başka bir düğümde izleyici var mı?"""
+        if self._local_presence([room]).get(room):
+            return True
+        fresh_after = time.monotonic() - 3 * self.presence_interval
+        return any(seen >= fresh_after and counts.get(room)
+                   for seen, counts in list(getattr(self, '_remote_presence', {}).values()))
+
+    def _presence_loop(self):
+        while True:
+            self.server.sleep(self.presence_interval)
+            try:
+                self.announce_presence()
+            except Exception as e:
+                logger.warning(f"[CLUSTER] Room presence could not be announced: {e}")
+
+    def _handle_emit(self, message):
+        from app.socket.fanout import LIVE_EVENTS, get_live_fanout
+
+        if message.get('event') == PRESENCE_EVENT:
+            self._update_presence(message['data'])
+            return
+        if message.get('event') in LIVE_EVENTS and not message.get('callback'):
+            get_live_fanout().deliver_local(message.get('room'), message['event'], message['data'])
+            return
+        return super()._handle_emit(message)
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """
+    Süreç içi pub/sub: aynı kanala bağlı tüm manager'lar her mesajı (kendisi dahil) alır.
+    Redis/AMQP olmadan çok düğümlü davranışı (oda üyeliği, düğümler arası emit) denemek içindir.
+    """
+
+    name = 'local'
+    _channels = {}  # kanal -> abone kuyrukları
+
+    def __init__(self, url='local://', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def initialize(self):
+        self._queue = queue.Queue()
+        if not self.write_only:
+            self._channels.setdefault(self.channel, []).append(self._queue)
+        super().initialize()
+
+    def _publish(self, data):
+        for subscriber in list(self._channels.get(self.channel, [])):
+            subscriber.put(data)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+
+class RedisClusterManager(LiveFanoutMixin, socketio.RedisManager):
+    pass
+
+
+class KombuClusterManager(LiveFanoutMixin, socketio.KombuManager):
+    pass
+
+
+class LocalClusterManager(LiveFanoutMixin, LocalPubSubManager):
+    pass
+
+
+def build_client_manager(url, channel='gokizci-socketio'):
+    """Mesaj kuyruğu URL'sine göre Socket.IO client manager'ı; URL boşsa None (tek düğüm)."""
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://')):
+        manager = RedisClusterManager(url, channel=channel)
+    elif url.startswith('local://'):
+        manager = LocalClusterManager(url, channel=url[len('local://'):] or channel)
+    else:
+        manager = KombuClusterManager(url, channel=channel)
+    manager.presence_interval = Config.LIVE_PRESENCE_INTERVAL_SECONDS
+    logger.info(f"[CLUSTER] Socket.IO message queue: {type(manager).__name__} (channel={manager.channel})")
+    return manager
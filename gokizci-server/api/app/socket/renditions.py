@@ -0,0 +1,63 @@
+"""api/app/socket/renditions.py"""
+
+from app.settings import Config
+
+FULL = 'full'
+PREVIEW = 'preview'
+RENDITIONS = (FULL, PREVIEW)
+
+
+def rendition_room(source_id, rendition):
+    """Canlı yayın odası: 'source_id:full' veya 'source_id:preview'."""
+    return f"{source_id}:{rendition}"
+
+
+def full_rooms(source_id):
+    """Tam çözünürlüklü karelerin gönderildiği odalar (rendition seçmeyen eski istemciler: source_id)."""
+    return [source_id, rendition_room(source_id, FULL)]
+
+
+class PreviewScheduler:
+    """
+    Kaynak başına düşük çözünürlüklü önizleme karelerinin zamanlaması.
+
+    Önizleme `fps` hızında üretilir: bir kare, kaynağın son önizlemesinden en az 1/fps saniye
+    sonraysa (istemci zaman damgasına göre) önizleme alır. Zaman geri giderse (akış yeniden
+    başladıysa) sayaç sıfırlanır.
+    """
+
+    def __init__(self, fps=5.0, width=160, quality=60):
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.width = width
+        self.quality = quality
+        self._last = {}  # source_id -> son önizleme karesinin zaman damgası (sn)
+
+    @property
+    def options(self):
+        """decode_frame/make_thumbnail için (genişlik, kalite)."""
+        return self.width, self.quality
+
+    def due(self, source_id, timestamp):
+        last = self._last.get(source_id)
+        if last is not None and last <= timestamp < last + self.interval:
+            return False
+        self._last[source_id] = timestamp
+        return True
+
+    def reset_source(self, source_id):
+        self._last.pop(source_id, None)
+
+
+_scheduler = None
+
+
+def get_preview_scheduler():
+    """Süreç başına tek PreviewScheduler örneği."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PreviewScheduler(
+            fps=Config.PREVIEW_FPS,
+            width=Config.PREVIEW_WIDTH,
+            quality=Config.PREVIEW_JPEG_QUALITY,
+        )
+    return _scheduler
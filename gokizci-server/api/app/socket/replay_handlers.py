@@ -2,89 +2,89 @@
 
 from flask import request
 from flask_socketio import emit
-from datetime import datetime, timedelta
+from datetime import datetime
 from app.extensions import socketio
-from models.video_segment import VideoSegment
+from app.replay.sessions import get_replay_sessions
 import logging
-import eventlet
-from bson.binary import Binary
-
-replay_flags = {}
 
 logger = logging.getLogger(__name__)
 
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+def _session_or_error(event):
+    session = get_replay_sessions().get(request.sid)
+    if session is None:
+        emit('replay_status', {'status': 'no_session', 'message': f'{event}: no active replay'}, room=request.sid)
+    return session
+
 @socketio.on('start_replay')
 def handle_start_replay(data):
     source_id = data.get('source_id')
     fps = data.get('fps', 30)
-    delay = 1.0 / fps
 
-    if not source_id:
-        emit('error', {'message': 'source_id is required for replay'})
+    if not source_id or not data.get('start'):
+        emit('error', {'message': 'source_id and start are required for replay'})
         return
     try:
-        logger.info(f"[REPLAY_HANDLER] Received 'start_replay' for source_id: {data.get('source_id')}, start_time: {data.get('start')}")
-        
-        start_time_obj = datetime.fromisoformat(data.get('start').replace('Z', '+00:00'))
-        # endTime client'tan gelmiyorsa, örneğin start_time_obj + 1 saat veya tüm kayıtlar gibi bir mantık kurulabilir.
-        # Şimdilik sadece start_time_obj'den sonrasını alalım:
-        logger.info(f"[REPLAY_HANDLER] Querying segments from: {start_time_obj.isoformat()}")
+        logger.info(f"[REPLAY_HANDLER] Received 'start_replay' for source_id: {source_id}, start_time: {data.get('start')}, end_time: {data.get('end')}")
+        start_time_obj = _parse_time(data.get('start'))
+        end_time_obj = _parse_time(data.get('end'))
+        speed = float(data.get('speed', 1.0))
+    except (AttributeError, TypeError, ValueError) as e:
+        emit('replay_status', {'status': 'query_error', 'message': f'Invalid replay range: {e}'}, room=request.sid)
+        return
 
-        segments = VideoSegment.objects(
-            source_id=source_id,
-            timestamp__gte=start_time_obj 
-            # Eğer endTime da geliyorsa: timestamp__lte=end_time_obj
-        ).order_by('timestamp')
-        logger.info(f"[REPLAY_HANDLER] Found {segments.count()} segments for replay.")
+    # Oturum SID'ye bağlıdır; aynı kaynağı izleyen diğer istemcileri etkilemez (bkz. app/replay/sessions.py).
+    # fps yalnızca üst sınırdır, oynatma hızı kayıttaki gerçek hız × speed'dir
+    session = get_replay_sessions().start(request.sid, source_id, start_time_obj, end_time_obj,
+                                          max_fps=fps, speed=speed)
+    emit('replay_status', dict(session.state(), status='started'), room=request.sid)
 
-    except Exception as e:
-        logger.error(f"[REPLAY] Error during start_replay for {source_id}: {e}", exc_info=True)
-        emit('replay_status', {'status': 'query_error', 'message': 'An error occurred while querying the database.'}, room=request.sid)
-        replay_flags[source_id] = False
+@socketio.on('replay_seek')
+def handle_replay_seek(data):
+    session = _session_or_error('replay_seek')
+    if session is None:
         return
-    
-    if not segments:
-        logger.info(f"[REPLAY] No segments found for {source_id} starting from {start_time_obj}")
-        emit('replay_status', {'status': 'no_segments_found', 'message': 'Replay failed: No segments found for the specified time range.'}, room=request.sid)
-        replay_flags[source_id] = False # Başka bir işlem yapma
+    try:
+        timestamp = _parse_time(data.get('timestamp'))
+    except (AttributeError, ValueError) as e:
+        emit('replay_status', {'status': 'invalid_seek', 'message': str(e)}, room=request.sid)
         return
+    if timestamp is None:
+        emit('replay_status', {'status': 'invalid_seek', 'message': 'timestamp is required'}, room=request.sid)
+        return
+    session.seek(timestamp)
+    emit('replay_status', dict(session.state(), status='seeked'), room=request.sid)
 
-    logger.info(f"[REPLAY] Starting replay for {source_id} with {len(segments)} frames")
-    replay_flags[source_id] = True
-
-    for segment in segments:
-        try:
-            if not replay_flags[source_id]:
-                break
+@socketio.on('replay_set_speed')
+def handle_replay_set_speed(data):
+    session = _session_or_error('replay_set_speed')
+    if session is None:
+        return
+    try:
+        session.set_speed(data.get('speed'))
+    except (TypeError, ValueError):
+        emit('replay_status', {'status': 'invalid_speed', 'message': 'speed must be a number'}, room=request.sid)
+        return
+    emit('replay_status', dict(session.state(), status='speed_changed'), room=request.sid)
 
-            # frame_base64 = segment.frame_data.decode("utf-8") \
-            #     if isinstance(segment.frame_data, Binary) else segment.frame_data
-            
-            if isinstance(segment.frame_data, bytes): # MongoEngine BinaryField'ı bytes olarak döndürür
-                frame_base64 = segment.frame_data.decode('utf-8')
-            else: # Bu durum olmamalı ama fallback
-                frame_base64 = str(segment.frame_data)
+@socketio.on('replay_pause')
+def handle_replay_pause(data=None):
+    session = _session_or_error('replay_pause')
+    if session is not None:
+        session.pause()
+        emit('replay_status', dict(session.state(), status='paused'), room=request.sid)
 
-                
-            logger.debug(f"[REPLAY_HANDLER] Emitting replay_frame for ts: {segment.timestamp.isoformat()}")
-            logger.debug(f"Emitting base64 (first 100 chars): {frame_base64[:100]}")
-            emit('replay_frame', {
-                'frame': frame_base64,
-                'timestamp': segment.timestamp.isoformat(),
-                'anomaly_detected': segment.anomaly_detected,
-                'confidence': segment.confidence,
-                'source_id': source_id
-            }, room=request.sid)
+@socketio.on('replay_resume')
+def handle_replay_resume(data=None):
+    session = _session_or_error('replay_resume')
+    if session is not None:
+        session.resume()
+        emit('replay_status', dict(session.state(), status='resumed'), room=request.sid)
 
-            eventlet.sleep(delay)
-        except Exception as e:
-            logger.error(f"[REPLAY] Error during replay: {e}")
-            break
-        
-        
 @socketio.on('stop_replay')
-def handle_stop_replay(data):
-    source_id = data.get('source_id')
-    if source_id:
-        replay_flags[source_id] = False
-        emit('status', {'message': f'replay for {source_id} stopped'})
\ No newline at end of file
+def handle_stop_replay(data=None):
+    session = get_replay_sessions().close(request.sid)
+    if session is not None:
+        emit('status', {'message': f'replay for {session.source_id} stopped'})
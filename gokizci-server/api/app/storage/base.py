@@ -0,0 +1,150 @@
+"""api/app/storage/base.py"""
+
+from datetime import datetime, timezone
+
+from app.settings import Config
+
+
+def to_naive_utc(dt):
+    """Mongo naive UTC datetime döndürür; karşılaştırmalar için girdiler de naive UTC'ye çevrilir."""
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def histogram_from_groups(groups, length):
+    """{'_id': saniye indisi, 'frames': n, 'anomalies': m} aggregation çıktısını saniye dizilerine çevirir."""
+    import numpy as np
+
+    frames = np.zeros(length, dtype=np.int64)
+    anomalies = np.zeros(length, dtype=np.int64)
+    for group in groups:
+        index = int(group['_id'])
+        if 0 <= index < length:
+            frames[index] += group['frames']
+            anomalies[index] += group['anomalies']
+    return frames, anomalies
+
+
+def second_group_pipeline(match, time_field, start, end):
+    """Kare başına doküman tutan koleksiyonlar için saniyeye göre $group pipeline'ı."""
+    return [
+        {'$match': dict(match, **{time_field: {'$gte': start, '$lt': end}})},
+        {'$group': {
+            '_id': {'$floor': {'$divide': [{'$subtract': [f'${time_field}', start]}, 1000]}},
+            'frames': {'$sum': 1},
+            'anomalies': {'$sum': {'$cond': [{'$eq': ['$anomaly_detected', True]}, 1, 0]}},
+        }},
+    ]
+
+
+class SegmentStore:
+    """
+    Kare depolama arayüzü. Ingest, replay, /segments ve replay meta hesaplaması bu arayüz
+    üzerinden çalışır; alttaki yerleşim (kare başına doküman, saniye başına chunk, ...)
+    SEGMENT_STORE ayarıyla seçilir ('document', 'chunked', 'file').
+
+    Yazılan kayıt (record) bir dict'tir:
+        {'source_id', 'timestamp' (UTC datetime), 'frame' (ham JPEG bytes),
+         'anomaly_detected', 'confidence'}
+    anomaly_detected None ise kare skorlanmamıştır (inference'ı atlandı, bkz. inference/admission.py);
+    anomali sayılmaz ve saklamada anomali karesi olarak korunmaz.
+    Okunan kareler de dict'tir:
+        {'id', 'timestamp' (naive UTC), 'anomaly_detected', 'confidence', 'frame' (bytes veya None)}
+
+    Saklama kademeleri (bkz. retention.py) iter_index / delete_frames / delete_range üzerinden
+    uygulanır; buradaki kare id'leri depoya özgüdür ve yalnızca aynı deponun delete_frames'ine verilir.
+    """
+
+    name = None
+
+    def write_many(self, records):
+        """Kayıtları toplu yazar (bkz. segment_writer.SegmentWriter)."""
+        raise NotImplementedError
+
+    def iter_frames(self, source_id, start, end=None, include_frames=True, batch_size=200):
+        """[start, end] aralığındaki kareleri zaman sırasıyla üretir."""
+        raise NotImplementedError
+
+    def iter_flags(self, source_id, start, end):
+        """[start, end) aralığındaki karelerin (timestamp, anomaly_detected) çiftlerini üretir."""
+        raise NotImplementedError
+
+    def get_frame(self, source_id, frame_id):
+        """iter_frames'in döndürdüğü id ile tek karenin ham JPEG'ini döner (yoksa None)."""
+        raise NotImplementedError
+
+    def second_histogram(self, source_id, start, end):
+        """
+        [start, end) aralığında saniye başına (kare sayısı, anomali karesi sayısı) dizileri
+        (numpy int64, uzunluk = aralığın saniyesi). Varsayılan uygulama iter_flags + bincount;
+        depolar bunu Mongo aggregation ile ezer.
+        """
+        import numpy as np
+
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        length = int((end - start).total_seconds())
+        seconds, anomalies = [], []
+        for timestamp, anomaly in self.iter_flags(source_id, start, end):
+            seconds.append(int((timestamp - start).total_seconds()))
+            anomalies.append(bool(anomaly))
+        seconds = np.asarray(seconds, dtype=np.int64)
+        frames = np.bincount(seconds, minlength=length)[:length]
+        anomaly_frames = np.bincount(seconds, weights=np.asarray(anomalies, dtype=np.float64),
+                                     minlength=length)[:length].astype(np.int64)
+        return frames, anomaly_frames
+
+    def iter_index(self, source_id, start, end):
+        """[start, end) aralığındaki karelerin (id, timestamp, anomaly_detected) üçlülerini zaman sırasıyla üretir."""
+        raise NotImplementedError
+
+    def delete_frames(self, source_id, frame_ids):
+        """iter_index'in döndürdüğü id'lerle verilen kareleri siler; silinen kare sayısını döner."""
+        raise NotImplementedError
+
+    def delete_range(self, source_id, start, end, keep_anomalies=False):
+        """
+        [start, end) aralığındaki kareleri siler (start None ise end'den öncekilerin tümü).
+        keep_anomalies ise anomali işaretli kareler kalır. Silinen kare sayısını döner.
+        """
+        raise NotImplementedError
+
+    def decimate(self, source_id, start, end, keyframe_interval):
+        """
+        [start, end) aralığını seyreltir: her `keyframe_interval` saniyelik dilimin ilk karesi ile
+        anomali işaretli kareler kalır, diğerleri silinir. Tekrar çalıştırılması aynı kareleri korur.
+        """
+        doomed = []
+        last_slot = None
+        for frame_id, timestamp, anomaly in self.iter_index(source_id, start, end):
+            slot = int((timestamp - _EPOCH).total_seconds() // keyframe_interval)
+            if slot != last_slot:
+                last_slot = slot
+                continue
+            if not anomaly:
+                doomed.append(frame_id)
+        return self.delete_frames(source_id, doomed) if doomed else 0
+
+
+_store = None
+
+
+def get_segment_store():
+    """Config.SEGMENT_STORE'a göre süreç başına tek SegmentStore örneği."""
+    global _store
+    if _store is None:
+        if Config.SEGMENT_STORE == 'chunked':
+            from app.storage.chunk_store import ChunkedSegmentStore
+            _store = ChunkedSegmentStore()
+        elif Config.SEGMENT_STORE == 'file':
+            from app.storage.file_store import FileSegmentStore
+            _store = FileSegmentStore(Config.SEGMENT_FILE_ROOT)
+        elif Config.SEGMENT_STORE == 'document':
+            from app.storage.document_store import DocumentSegmentStore
+            _store = DocumentSegmentStore()
+        else:
+            raise ValueError(f"Unknown SEGMENT_STORE: {Config.SEGMENT_STORE}")
+    return _store
@@ -0,0 +1,212 @@
+"""api/app/storage/chunk_store.py"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne, DeleteOne, ASCENDING
+
+from app.storage.base import SegmentStore, to_naive_utc, histogram_from_groups
+from models.video_chunk import VideoChunk
+
+
+def _flag(anomaly_detected):
+    """Skorlanmamış kare (None) listede None olarak kalır; anomaly_count'a girmez."""
+    return None if anomaly_detected is None else bool(anomaly_detected)
+
+
+def _score(confidence):
+    return None if confidence is None else float(confidence)
+
+
+class ChunkedSegmentStore(SegmentStore):
+    """
+    Kaynak başına saniyede bir VideoChunk dokümanı. Kare başına doküman yerleşimine göre
+    (25 fps'te) doküman ve index girdisi sayısı ~25 kat azalır.
+
+    Aynı saniyeye düşen kareler tek bir upsert ile ($push/$each) chunk'a eklenir.
+    Kare id'si "<chunk_id>-<index>" biçimindedir.
+
+    Saklama işlemlerinde kareler chunk'ın paralel listelerinden çıkarılarak chunk yeniden yazılır;
+    boşalan chunk silinir. Bu yalnızca artık yazılmayan (eski) saniyelere uygulanır.
+    """
+
+    name = 'chunked'
+
+    def write_many(self, records):
+        grouped = defaultdict(list)
+        for record in records:
+            timestamp = to_naive_utc(record['timestamp'])
+            chunk_start = timestamp.replace(microsecond=0)
+            grouped[(record['source_id'], chunk_start)].append((timestamp, record))
+
+        operations = []
+        for (source_id, chunk_start), items in grouped.items():
+            items.sort(key=lambda item: item[0])
+            operations.append(UpdateOne(
+                {'source_id': source_id, 'chunk_start': chunk_start},
+                {
+                    '$push': {
+                        'frames': {'$each': [record['frame'] for _, record in items]},
+                        'offsets_ms': {'$each': [timestamp.microsecond // 1000 for timestamp, _ in items]},
+                        'anomalies': {'$each': [_flag(record['anomaly_detected']) for _, record in items]},
+                        'confidences': {'$each': [_score(record['confidence']) for _, record in items]},
+                    },
+                    '$inc': {
+                        'frame_count': len(items),
+                        'anomaly_count': sum(1 for _, record in items if record['anomaly_detected']),
+                    },
+                },
+                upsert=True
+            ))
+        if operations:
+            VideoChunk._get_collection().bulk_write(operations, ordered=False)
+
+    def _find_chunks(self, source_id, start, end, projection, end_inclusive=True, batch_size=200):
+        start = to_naive_utc(start)
+        end = to_naive_utc(end)
+        # Başlangıç saniyesine düşen chunk da dahil edilmeli
+        query = {'source_id': source_id, 'chunk_start': {'$gte': start.replace(microsecond=0)}}
+        if end is not None:
+            query['chunk_start']['$lte' if end_inclusive else '$lt'] = end
+        cursor = (VideoChunk._get_collection()
+                  .find(query, projection=projection, batch_size=batch_size)
+                  .sort('chunk_start', ASCENDING))
+        return cursor, start, end
+
+    @staticmethod
+    def _in_range(timestamp, start, end, end_inclusive):
+        if timestamp < start:
+            return False
+        if end is None:
+            return True
+        return timestamp <= end if end_inclusive else timestamp < end
+
+    def iter_frames(self, source_id, start, end=None, include_frames=True, batch_size=200):
+        projection = {'chunk_start': 1, 'offsets_ms': 1, 'anomalies': 1, 'confidences': 1}
+        if include_frames:
+            projection['frames'] = 1
+        # Her chunk ~25 kare taşıdığı için cursor batch'i kare sayısına göre küçültülür
+        cursor, start, end = self._find_chunks(source_id, start, end, projection,
+                                               batch_size=max(1, batch_size // 25))
+        for chunk in cursor:
+            chunk_start = chunk['chunk_start']
+            frames = chunk.get('frames') or []
+            offsets = chunk.get('offsets_ms', [])
+            order = sorted(range(len(offsets)), key=offsets.__getitem__)
+            for index in order:
+                timestamp = chunk_start + timedelta(milliseconds=offsets[index])
+                if not self._in_range(timestamp, start, end, end_inclusive=True):
+                    continue
+                yield {
+                    'id': f"{chunk['_id']}-{index}",
+                    'timestamp': timestamp,
+                    'anomaly_detected': chunk['anomalies'][index],
+                    'confidence': chunk['confidences'][index],
+                    'frame': bytes(frames[index]) if include_frames else None,
+                }
+
+    def iter_flags(self, source_id, start, end):
+        projection = {'chunk_start': 1, 'offsets_ms': 1, 'anomalies': 1}
+        cursor, start, end = self._find_chunks(source_id, start, end, projection, end_inclusive=False)
+        for chunk in cursor:
+            chunk_start = chunk['chunk_start']
+            for offset, anomaly in zip(chunk.get('offsets_ms', []), chunk.get('anomalies', [])):
+                timestamp = chunk_start + timedelta(milliseconds=offset)
+                if self._in_range(timestamp, start, end, end_inclusive=False):
+                    yield timestamp, anomaly
+
+    def get_frame(self, source_id, frame_id):
+        try:
+            chunk_id, index = frame_id.rsplit('-', 1)
+            chunk_id, index = ObjectId(chunk_id), int(index)
+        except (ValueError, InvalidId):
+            return None
+        chunk = VideoChunk._get_collection().find_one(
+            {'_id': chunk_id, 'source_id': source_id},
+            projection={'frames': {'$slice': [index, 1]}}
+        )
+        if not chunk or not chunk.get('frames'):
+            return None
+        return bytes(chunk['frames'][0])
+
+    @staticmethod
+    def _range_query(source_id, start, end):
+        chunk_start = {'$lt': to_naive_utc(end)}
+        if start is not None:
+            chunk_start['$gte'] = to_naive_utc(start).replace(microsecond=0)
+        return {'source_id': source_id, 'chunk_start': chunk_start}
+
+    def second_histogram(self, source_id, start, end):
+        # Chunk zaten saniye başına tek doküman; sayaçlar doğrudan okunur, kareler çekilmez
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        groups = VideoChunk._get_collection().aggregate([
+            {'$match': {'source_id': source_id, 'chunk_start': {'$gte': start, '$lt': end}}},
+            {'$project': {
+                '_id': {'$floor': {'$divide': [{'$subtract': ['$chunk_start', start]}, 1000]}},
+                'frames': '$frame_count',
+                'anomalies': '$anomaly_count',
+            }},
+        ])
+        return histogram_from_groups(groups, int((end - start).total_seconds()))
+
+    def iter_index(self, source_id, start, end):
+        cursor = (VideoChunk._get_collection()
+                  .find(self._range_query(source_id, start, end),
+                        projection={'chunk_start': 1, 'offsets_ms': 1, 'anomalies': 1}, batch_size=100)
+                  .sort('chunk_start', ASCENDING))
+        for chunk in cursor:
+            chunk_start = chunk['chunk_start']
+            offsets = chunk.get('offsets_ms', [])
+            for index in sorted(range(len(offsets)), key=offsets.__getitem__):
+                yield (chunk['_id'], index), chunk_start + timedelta(milliseconds=offsets[index]), chunk['anomalies'][index]
+
+    def delete_frames(self, source_id, frame_ids):
+        doomed = defaultdict(set)
+        for chunk_id, index in frame_ids:
+            doomed[chunk_id].add(index)
+
+        collection = VideoChunk._get_collection()
+        chunk_ids = list(doomed)
+        deleted = 0
+        for i in range(0, len(chunk_ids), 100):
+            operations = []
+            for chunk in collection.find({'_id': {'$in': chunk_ids[i:i + 100]}, 'source_id': source_id}):
+                indexes = doomed[chunk['_id']]
+                keep = [index for index in range(len(chunk.get('offsets_ms', []))) if index not in indexes]
+                deleted += len(chunk['offsets_ms']) - len(keep)
+                if not keep:
+                    operations.append(DeleteOne({'_id': chunk['_id']}))
+                    continue
+                anomalies = [chunk['anomalies'][index] for index in keep]
+                operations.append(UpdateOne({'_id': chunk['_id']}, {'$set': {
+                    'frames': [chunk['frames'][index] for index in keep],
+                    'offsets_ms': [chunk['offsets_ms'][index] for index in keep],
+                    'anomalies': anomalies,
+                    'confidences': [chunk['confidences'][index] for index in keep],
+                    'frame_count': len(keep),
+                    'anomaly_count': sum(1 for anomaly in anomalies if anomaly),
+                }}))
+            if operations:
+                collection.bulk_write(operations, ordered=False)
+        return deleted
+
+    @staticmethod
+    def _delete_chunks(query):
+        collection = VideoChunk._get_collection()
+        total = next(collection.aggregate([
+            {'$match': query},
+            {'$group': {'_id': None, 'frames': {'$sum': '$frame_count'}}},
+        ]), None)
+        collection.delete_many(query)
+        return total['frames'] if total else 0
+
+    def delete_range(self, source_id, start, end, keep_anomalies=False):
+        query = self._range_query(source_id, start, end)
+        if not keep_anomalies:
+            return self._delete_chunks(query)
+        # Anomalisiz chunk'lar tamamen silinir; anomali içerenlerde yalnızca anomali kareleri bırakılır
+        deleted = self._delete_chunks(dict(query, anomaly_count=0))
+        doomed = [frame_id for frame_id, _, anomaly in self.iter_index(source_id, start, end) if not anomaly]
+        return deleted + (self.delete_frames(source_id, doomed) if doomed else 0)
@@ -0,0 +1,97 @@
+"""api/app/storage/document_store.py"""
+
+from mongoengine import ValidationError
+
+from app.storage.base import SegmentStore, to_naive_utc, histogram_from_groups, second_group_pipeline
+from models.video_segment import VideoSegment, FRAME_FORMAT_JPEG
+
+_DELETE_BATCH = 1000
+
+
+class DocumentSegmentStore(SegmentStore):
+    """Kare başına bir VideoSegment dokümanı (varsayılan yerleşim)."""
+
+    name = 'document'
+
+    @staticmethod
+    def _range_query(source_id, start, end):
+        timestamp = {'$lt': to_naive_utc(end)}
+        if start is not None:
+            timestamp['$gte'] = to_naive_utc(start)
+        return {'source_id': source_id, 'timestamp': timestamp}
+
+    def write_many(self, records):
+        documents = [
+            VideoSegment(
+                source_id=record['source_id'],
+                frame_data=record['frame'],
+                frame_format=FRAME_FORMAT_JPEG,
+                timestamp=record['timestamp'],
+                anomaly_detected=record['anomaly_detected'],
+                confidence=record['confidence'],
+            ).to_mongo()
+            for record in records
+        ]
+        VideoSegment._get_collection().insert_many(documents, ordered=False)
+
+    def iter_frames(self, source_id, start, end=None, include_frames=True, batch_size=200):
+        query = {'source_id': source_id, 'timestamp__gte': start}
+        if end is not None:
+            query['timestamp__lte'] = end
+        fields = ['timestamp', 'anomaly_detected', 'confidence']
+        if include_frames:
+            fields += ['frame_data', 'frame_format']
+
+        segments = VideoSegment.objects(**query).order_by('timestamp').only(*fields).batch_size(batch_size)
+        for segment in segments:
+            yield {
+                'id': str(segment.id),
+                'timestamp': segment.timestamp,
+                'anomaly_detected': segment.anomaly_detected,
+                'confidence': segment.confidence,
+                'frame': segment.frame_bytes() if include_frames else None,
+            }
+
+    def iter_flags(self, source_id, start, end):
+        segments = VideoSegment.objects(
+            source_id=source_id,
+            timestamp__gte=start,
+            timestamp__lt=end
+        ).only('timestamp', 'anomaly_detected')
+        for segment in segments:
+            yield segment.timestamp, segment.anomaly_detected
+
+    def get_frame(self, source_id, frame_id):
+        try:
+            segment = VideoSegment.objects(id=frame_id, source_id=source_id).only('frame_data', 'frame_format').first()
+        except ValidationError:
+            return None
+        return segment.frame_bytes() if segment else None
+
+    def second_histogram(self, source_id, start, end):
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        groups = VideoSegment._get_collection().aggregate(
+            second_group_pipeline({'source_id': source_id}, 'timestamp', start, end))
+        return histogram_from_groups(groups, int((end - start).total_seconds()))
+
+    def iter_index(self, source_id, start, end):
+        cursor = (VideoSegment._get_collection()
+                  .find(self._range_query(source_id, start, end),
+                        projection={'timestamp': 1, 'anomaly_detected': 1}, batch_size=1000)
+                  .sort('timestamp', 1))
+        for document in cursor:
+            yield document['_id'], document['timestamp'], bool(document.get('anomaly_detected'))
+
+    def delete_frames(self, source_id, frame_ids):
+        collection = VideoSegment._get_collection()
+        deleted = 0
+        for i in range(0, len(frame_ids), _DELETE_BATCH):
+            result = collection.delete_many({'_id': {'$in': frame_ids[i:i + _DELETE_BATCH]}, 'source_id': source_id})
+            deleted += result.deleted_count
+        return deleted
+
+    def delete_range(self, source_id, start, end, keep_anomalies=False):
+        query = self._range_query(source_id, start, end)
+        if keep_anomalies:
+            query['anomaly_detected'] = {'$ne': True}
+        return VideoSegment._get_collection().delete_many(query).deleted_count
@@ -0,0 +1,255 @@
+"""api/app/storage/file_store.py"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from mongoengine import ValidationError
+from pymongo import UpdateOne
+
+from app.storage.base import SegmentStore, to_naive_utc, histogram_from_groups, second_group_pipeline
+from models.segment_index import SegmentIndexEntry
+
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+_HOUR_FORMAT = '%Y%m%d%H'
+_DELETE_BATCH = 1000
+
+
+class FileSegmentStore(SegmentStore):
+    """
+    Kareleri yerel diskte kaynak ve saat başına birer segment dosyasına ekleyen depo.
+
+        <root>/<source_id>/<YYYYmmddHH>.seg     -> art arda eklenmiş ham JPEG'ler
+        <root>/<source_id>/<YYYYmmddHH>.<n>.seg -> saklama sıkıştırmasının yazdığı n. nesil kopya
+
+    Mongo'da (SegmentIndexEntry) yalnızca timestamp -> (dosya, offset, uzunluk, anomali, güven)
+    tutulur; kare okumaları dosyanın mmap'inden dilimlenir. Böylece replay okumaları Mongo
+    sürücüsünden megabaytlarca veri çekmez.
+
+    Yazma tek bir SegmentWriter döngüsünden yapılır; aynı dosyaya birden fazla süreç yazmamalıdır.
+    """
+
+    name = 'file'
+
+    def __init__(self, root, max_open_maps=64):
+        self.root = os.path.abspath(root)
+        self.max_open_maps = max_open_maps
+        self._maps = OrderedDict()  # göreceli yol -> (file, mmap), LRU
+        self._maps_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------------------------------------------------------------- paths
+    @staticmethod
+    def relative_path(source_id, timestamp):
+        return os.path.join(_SAFE_NAME.sub('_', source_id), f"{timestamp.strftime(_HOUR_FORMAT)}.seg")
+
+    def _absolute(self, relative):
+        return os.path.join(self.root, relative)
+
+    # ---------------------------------------------------------------- write
+    def write_many(self, records):
+        by_file = defaultdict(list)
+        for record in records:
+            timestamp = to_naive_utc(record['timestamp'])
+            by_file[self.relative_path(record['source_id'], timestamp)].append((timestamp, record))
+
+        entries = []
+        for relative, items in by_file.items():
+            path = self._absolute(relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as segment_file:
+                for timestamp, record in items:
+                    offset = segment_file.tell()
+                    segment_file.write(record['frame'])
+                    entries.append(SegmentIndexEntry(
+                        source_id=record['source_id'],
+                        timestamp=timestamp,
+                        file=relative,
+                        offset=offset,
+                        length=len(record['frame']),
+                        anomaly_detected=record['anomaly_detected'],
+                        confidence=record['confidence'],
+                    ).to_mongo())
+        if entries:
+            SegmentIndexEntry._get_collection().insert_many(entries, ordered=False)
+
+    # ----------------------------------------------------------------- read
+    def _read(self, relative, offset, length):
+        """Karenin baytlarını dosyanın mmap'inden dilimler; dosya büyüdüyse yeniden map'ler."""
+        end = offset + length
+        with self._maps_lock:
+            cached = self._maps.get(relative)
+            if cached is not None and len(cached[1]) < end:
+                # Yazılmakta olan (güncel saat) dosya map'lendikten sonra büyümüş
+                self._close_map(self._maps.pop(relative))
+                cached = None
+            if cached is None:
+                segment_file = open(self._absolute(relative), 'rb')
+                try:
+                    cached = (segment_file, mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ))
+                except Exception:
+                    segment_file.close()
+                    raise
+                self._maps[relative] = cached
+                while len(self._maps) > self.max_open_maps:
+                    self._close_map(self._maps.popitem(last=False)[1])
+            else:
+                self._maps.move_to_end(relative)
+            return cached[1][offset:end]
+
+    @staticmethod
+    def _close_map(cached):
+        segment_file, mapped = cached
+        mapped.close()
+        segment_file.close()
+
+    def _entry_frame(self, entry):
+        try:
+            return self._read(entry.file, entry.offset, entry.length)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[FILE_STORE] Could not read frame {entry.id} from {entry.file}: {e}")
+            return None
+
+    def iter_frames(self, source_id, start, end=None, include_frames=True, batch_size=200):
+        query = {'source_id': source_id, 'timestamp__gte': start}
+        if end is not None:
+            query['timestamp__lte'] = end
+        entries = (SegmentIndexEntry.objects(**query)
+                   .order_by('timestamp')
+                   .only('timestamp', 'anomaly_detected', 'confidence', 'file', 'offset', 'length')
+                   .batch_size(batch_size))
+        for entry in entries:
+            yield {
+                'id': str(entry.id),
+                'timestamp': entry.timestamp,
+                'anomaly_detected': entry.anomaly_detected,
+                'confidence': entry.confidence,
+                'frame': self._entry_frame(entry) if include_frames else None,
+            }
+
+    def iter_flags(self, source_id, start, end):
+        entries = SegmentIndexEntry.objects(
+            source_id=source_id,
+            timestamp__gte=start,
+            timestamp__lt=end
+        ).only('timestamp', 'anomaly_detected')
+        for entry in entries:
+            yield entry.timestamp, entry.anomaly_detected
+
+    def get_frame(self, source_id, frame_id):
+        try:
+            entry = SegmentIndexEntry.objects(id=frame_id, source_id=source_id).only('file', 'offset', 'length').first()
+        except ValidationError:
+            return None
+        return self._entry_frame(entry) if entry else None
+
+    # ------------------------------------------------------------ retention
+    @staticmethod
+    def _range_query(source_id, start, end):
+        timestamp = {'$lt': to_naive_utc(end)}
+        if start is not None:
+            timestamp['$gte'] = to_naive_utc(start)
+        return {'source_id': source_id, 'timestamp': timestamp}
+
+    def second_histogram(self, source_id, start, end):
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        groups = SegmentIndexEntry._get_collection().aggregate(
+            second_group_pipeline({'source_id': source_id}, 'timestamp', start, end))
+        return histogram_from_groups(groups, int((end - start).total_seconds()))
+
+    def iter_index(self, source_id, start, end):
+        cursor = (SegmentIndexEntry._get_collection()
+                  .find(self._range_query(source_id, start, end),
+                        projection={'timestamp': 1, 'anomaly_detected': 1}, batch_size=1000)
+                  .sort('timestamp', 1))
+        for entry in cursor:
+            yield entry['_id'], entry['timestamp'], bool(entry.get('anomaly_detected'))
+
+    def delete_frames(self, source_id, frame_ids):
+        collection = SegmentIndexEntry._get_collection()
+        files = set()
+        deleted = 0
+        for i in range(0, len(frame_ids), _DELETE_BATCH):
+            query = {'_id': {'$in': frame_ids[i:i + _DELETE_BATCH]}, 'source_id': source_id}
+            files.update(collection.distinct('file', query))
+            deleted += collection.delete_many(query).deleted_count
+        for relative in files:
+            self._rewrite_file(relative)
+        return deleted
+
+    def delete_range(self, source_id, start, end, keep_anomalies=False):
+        query = self._range_query(source_id, start, end)
+        if keep_anomalies:
+            query['anomaly_detected'] = {'$ne': True}
+        collection = SegmentIndexEntry._get_collection()
+        files = collection.distinct('file', query)
+        deleted = collection.delete_many(query).deleted_count
+        for relative in files:
+            self._rewrite_file(relative)
+        return deleted
+
+    def _drop_map(self, relative):
+        with self._maps_lock:
+            cached = self._maps.pop(relative, None)
+            if cached is not None:
+                self._close_map(cached)
+
+    def _next_generation(self, relative):
+        """
+        Sıkıştırılmış kopya için kullanılmayan bir dosya adı: <YYYYmmddHH>.<nesil>.seg.
+        Yarıda kalmış önceki bir sıkıştırmanın dosyası varsa üzerine yazılmaz.
+        """
+        directory, name = os.path.split(relative)
+        parts = name.split('.')
+        hour = parts[0]
+        generation = int(parts[1]) + 1 if len(parts) == 3 and parts[1].isdigit() else 1
+        while True:
+            candidate = os.path.join(directory, f"{hour}.{generation}.seg")
+            if not os.path.exists(self._absolute(candidate)):
+                return candidate
+            generation += 1
+
+    def _rewrite_file(self, relative):
+        """
+        Segment dosyasını yalnızca index'te kalan karelerle yeni nesil bir dosyaya yazar, index'i
+        (dosya, offset) çifti olarak yeni dosyaya çevirir ve ancak ondan sonra eski dosyayı siler;
+        hiç kare kalmadıysa dosyayı siler. Okuyucular her an ya eski ya yeni tutarlı çifti görür;
+        index güncellemesi yarıda kalırsa iki dosya da geçerli kalır ve eski dosya bir sonraki
+        sıkıştırmada yeniden işlenir. Yalnızca artık eklenmeyen (eski saatlere ait) dosyalar için çağrılır.
+        """
+        collection = SegmentIndexEntry._get_collection()
+        path = self._absolute(relative)
+        entries = list(collection.find({'file': relative}, projection={'offset': 1, 'length': 1}).sort('offset', 1))
+        if not entries:
+            self._drop_map(relative)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        compacted = self._next_generation(relative)
+        compacted_path = self._absolute(compacted)
+        temporary = compacted_path + '.tmp'
+        operations = []
+        with open(path, 'rb') as source, open(temporary, 'wb') as target:
+            for entry in entries:
+                source.seek(entry['offset'])
+                offset = target.tell()
+                target.write(source.read(entry['length']))
+                operations.append(UpdateOne({'_id': entry['_id'], 'file': relative},
+                                            {'$set': {'file': compacted, 'offset': offset}}))
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temporary, compacted_path)
+        collection.bulk_write(operations, ordered=False)
+
+        if collection.count_documents({'file': relative}, limit=1):
+            # Yazma sırasında eski dosyaya yeni kare eklendi; bir sonraki sıkıştırmaya bırakılır
+            logger.warning(f"[FILE_STORE] {relative} still has index entries after compaction, keeping it")
+            return
+        self._drop_map(relative)
+        os.remove(path)
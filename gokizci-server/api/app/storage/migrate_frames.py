@@ -0,0 +1,81 @@
+"""api/app/storage/migrate_frames.py
+
+Eski (base64) VideoSegment kayıtlarını ham JPEG formatına çevirir.
+
+Kullanım (api/ dizininden):
+    python -m app.storage.migrate_frames [--source-id ID] [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+import base64
+import binascii
+import logging
+
+from mongoengine import connect
+from pymongo import UpdateOne
+
+from app.settings import Config
+from models.video_segment import VideoSegment, FRAME_FORMAT_BASE64, FRAME_FORMAT_JPEG
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def migrate_frames(source_id=None, batch_size=500, dry_run=False):
+    """frame_format'ı olmayan veya base64 olan dokümanları toplu güncelleme ile ham JPEG'e çevirir."""
+    collection = VideoSegment._get_collection()
+    query = {'frame_format': {'$in': [None, FRAME_FORMAT_BASE64]}}
+    if source_id:
+        query['source_id'] = source_id
+
+    total = collection.count_documents(query)
+    logger.info(f"[MIGRATE] {total} legacy base64 segments to convert (dry_run={dry_run})")
+
+    converted = failed = 0
+    operations = []
+    cursor = collection.find(query, projection={'frame_data': 1}, batch_size=batch_size)
+    for doc in cursor:
+        try:
+            raw = base64.b64decode(bytes(doc['frame_data']), validate=True)
+        except (KeyError, TypeError, binascii.Error) as e:
+            failed += 1
+            logger.warning(f"[MIGRATE] Skipping segment {doc['_id']}: {e}")
+            continue
+
+        operations.append(UpdateOne(
+            {'_id': doc['_id'], 'frame_format': {'$in': [None, FRAME_FORMAT_BASE64]}},
+            {'$set': {'frame_data': raw, 'frame_format': FRAME_FORMAT_JPEG}}
+        ))
+        if len(operations) >= batch_size:
+            converted += _flush(collection, operations, dry_run)
+            logger.info(f"[MIGRATE] Converted {converted}/{total}")
+
+    converted += _flush(collection, operations, dry_run)
+    logger.info(f"[MIGRATE] Done. converted={converted}, failed={failed}")
+    return converted, failed
+
+
+def _flush(collection, operations, dry_run):
+    count = len(operations)
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+    operations.clear()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert base64 VideoSegment frames to raw JPEG bytes')
+    parser.add_argument('--source-id', help='Only migrate segments of this source')
+    parser.add_argument('--batch-size', type=int, default=500, help='Documents per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Count and validate without writing')
+    args = parser.parse_args()
+
+    connect(db=Config.MONGODB_DB, host=Config.MONGODB_HOST)
+    migrate_frames(source_id=args.source_id, batch_size=args.batch_size, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""api/app/storage/retention.py"""
+
+import logging
+from datetime import datetime, timedelta
+
+from app.replay.meta_utils import compute_replay_meta
+from app.settings import Config
+from app.system.cluster import get_cluster
+from app.storage.base import get_segment_store
+from models.device import Device
+from models.replay_meta import ReplayMeta
+from models.retention_state import RetentionState
+from models.segment_index import SegmentIndexEntry
+from models.thumbnail import Thumbnail
+from models.video_chunk import VideoChunk
+from models.video_segment import VideoSegment
+
+logger = logging.getLogger(__name__)
+
+_SLICE = timedelta(hours=1)  # Sıkıştırma saatlik dilimlerle ilerler; her dilimden sonra ilerleme kaydedilir
+
+
+def resolve_retention(policy):
+    """Device.retention'ı (None olabilir) Config varsayılanlarıyla tamamlanmış bir dict'e çevirir."""
+    values = policy.to_dict() if policy else {}
+
+    def pick(field, default):
+        return values[field] if values.get(field) is not None else default
+
+    return {
+        'full_rate_hours': pick('full_rate_hours', Config.RETENTION_FULL_RATE_HOURS),
+        'keyframe_days': pick('keyframe_days', Config.RETENTION_KEYFRAME_DAYS),
+        'keyframe_fps': pick('keyframe_fps', Config.RETENTION_KEYFRAME_FPS),
+        'anomaly_days': pick('anomaly_days', Config.RETENTION_ANOMALY_DAYS),
+    }
+
+
+def _floor_hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _slices(start, end):
+    while start < end:
+        stop = min(start + _SLICE, end)
+        yield start, stop
+        start = stop
+
+
+def _refresh_meta(source_id, window_start, deleted):
+    """
+    Karesi silinen saatin replay meta'sını (sayaçlar, second_filled_bits) kalan karelerden yeniden
+    hesaplar. Hiçbir şey silinmese de pencerenin meta'sı varsa hesaplanır: silme ile hesaplama
+    arasında kesilen bir önceki çalışmanın bıraktığı eski meta böylece düzelir.
+    """
+    if deleted or ReplayMeta.objects(source_id=source_id, window_start=window_start).only('id').first():
+        compute_replay_meta(source_id, window_start)
+
+
+def compact_source(store, source_id, policy, now=None):
+    """
+    Bir kaynağa saklama kademelerini uygular:
+
+        [anomaly_cutoff, keyframe_cutoff) : yalnızca anomali kareleri kalır
+        [keyframe_cutoff, full_cutoff)    : keyframe_fps'e seyreltilir (anomali kareleri korunur)
+        full_cutoff sonrası               : dokunulmaz
+        anomaly_cutoff öncesi             : tümü silinir
+
+    Sınırlar saat başına yuvarlanır; kademeler iç içe geçmeyecek şekilde sıralanır. Her saatlik
+    dilimden sonra o saatin replay meta'sı kalan karelerden yeniden hesaplanır.
+    """
+    now = now or datetime.utcnow()
+    full_cutoff = _floor_hour(now - timedelta(hours=policy['full_rate_hours']))
+    keyframe_cutoff = min(_floor_hour(now - timedelta(days=policy['keyframe_days'])), full_cutoff)
+    anomaly_cutoff = min(_floor_hour(now - timedelta(days=policy['anomaly_days'])), keyframe_cutoff)
+
+    state = RetentionState.objects(source_id=source_id).first() or RetentionState(source_id=source_id)
+    result = {'purged': 0, 'pruned': 0, 'decimated': 0}
+
+    result['purged'] = store.delete_range(source_id, None, anomaly_cutoff)
+
+    start = max(state.pruned_until or anomaly_cutoff, anomaly_cutoff)
+    for slice_start, slice_end in _slices(start, keyframe_cutoff):
+        deleted = store.delete_range(source_id, slice_start, slice_end, keep_anomalies=True)
+        _refresh_meta(source_id, slice_start, deleted)
+        result['pruned'] += deleted
+        state.pruned_until = slice_end
+        state.save()
+
+    interval = 1.0 / policy['keyframe_fps']
+    start = max(state.decimated_until or keyframe_cutoff, keyframe_cutoff)
+    for slice_start, slice_end in _slices(start, full_cutoff):
+        deleted = store.decimate(source_id, slice_start, slice_end, interval)
+        _refresh_meta(source_id, slice_start, deleted)
+        result['decimated'] += deleted
+        state.decimated_until = slice_end
+        state.save()
+
+    # Verisi tamamen silinmiş saatlerin replay meta'sı ve küçük resimleri artık boşluğu gösterir
+    ReplayMeta.objects(source_id=source_id, window_start__lte=anomaly_cutoff - timedelta(hours=1)).delete()
+    Thumbnail.objects(source_id=source_id, timestamp__lt=anomaly_cutoff).delete()
+
+    state.last_run = now
+    state.save()
+    return result
+
+
+def run_retention_compaction():
+    """Zamanlanmış iş: bu düğümün sahip olduğu cihazlara kendi saklama politikalarını uygular."""
+    store = get_segment_store()
+    cluster = get_cluster()
+    for device in Device.objects.only('source_id', 'retention'):
+        if not cluster.owns(device.source_id):
+            continue  # Aynı kaynağı iki düğüm aynı anda sıkıştırmasın
+        try:
+            result = compact_source(store, device.source_id, resolve_retention(device.retention))
+            if any(result.values()):
+                logger.info(f"[RETENTION] {device.source_id}: purged {result['purged']}, "
+                            f"pruned {result['pruned']}, decimated {result['decimated']} frames")
+        except Exception as e:
+            logger.error(f"[RETENTION] Compaction failed for {device.source_id}: {e}", exc_info=True)
+
+
+def drop_legacy_ttl_indexes():
+    """
+    Eski sürümlerin oluşturduğu 1 saatlik TTL index'lerini kaldırır. Bunlar kalırsa Mongo veriyi
+    saklama politikasından bağımsız olarak silmeye devam eder; ayrıca aynı alanlara tanımlanan
+    TTL'siz index'lerle çakışır.
+    """
+    for document in (VideoSegment, VideoChunk, SegmentIndexEntry):
+        collection = document._get_collection()
+        for name, info in collection.index_information().items():
+            if 'expireAfterSeconds' in info:
+                collection.drop_index(name)
+                logger.warning(f"[RETENTION] Dropped legacy TTL index {collection.name}.{name}")
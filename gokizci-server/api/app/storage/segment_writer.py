@@ -0,0 +1,149 @@
+"""api/app/storage/segment_writer.py"""
+
+import logging
+import time
+
+import eventlet
+from eventlet import tpool
+from eventlet.queue import Queue, Empty, Full
+
+from app.settings import Config
+from app.storage.base import get_segment_store
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = 'drop_oldest'  # Kuyruk doluysa en eski bekleyen doküman atılır
+POLICY_DROP_NEWEST = 'drop_newest'  # Kuyruk doluysa yeni doküman atılır
+POLICY_BLOCK = 'block'              # Kuyrukta yer açılana kadar çağıran green thread bekler (backpressure)
+
+
+class SegmentWriter:
+    """
+    Kare kayıtlarını arka planda toplu yazan yazıcı.
+
+    Kayıtlar sınırlı bir kuyruğa alınır; kuyrukta `batch_size` kayıt birikince veya ilk
+    kayıttan sonra `flush_interval` saniye geçince tek bir `store.write_many` çağrısıyla
+    (unordered insert_many / bulk upsert) yazılır. Kuyruk doluyken davranış `policy` ile belirlenir.
+    Başarıyla yazılan her batch `on_written` ile bildirilir (ör. replay meta sayaçları).
+    """
+
+    def __init__(self, store, max_queue=5000, batch_size=200, flush_interval=0.5, policy=POLICY_DROP_OLDEST,
+                 on_written=None):
+        if policy not in (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_BLOCK):
+            raise ValueError(f"Unknown segment writer policy: {policy}")
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.on_written = on_written
+        self._queue = Queue(maxsize=max_queue)
+        self._loop = None
+        self.stats = {
+            'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'flushes': 0,
+            'last_flush_ms': 0.0, 'max_flush_ms': 0.0, 'last_batch_size': 0,
+        }
+
+    def start(self):
+        if self._loop is None:
+            self._loop = eventlet.spawn(self._run)
+            logger.info(f"[SEGMENT_WRITER] Started (batch_size={self.batch_size}, "
+                        f"flush_interval={self.flush_interval}s, policy={self.policy})")
+
+    def write(self, record):
+        """Kaydı (bkz. storage/base.py) yazma kuyruğuna ekler. Kuyruğa alındıysa True döner."""
+        self.start()
+        if self.policy == POLICY_BLOCK:
+            self._queue.put(record)
+        else:
+            try:
+                self._queue.put_nowait(record)
+            except Full:
+                self.stats['dropped'] += 1
+                if self.policy == POLICY_DROP_NEWEST:
+                    return False
+                try:
+                    self._queue.get_nowait()
+                except Empty:
+                    pass
+                self._queue.put_nowait(record)
+        self.stats['queued'] += 1
+        return True
+
+    def get_stats(self):
+        return dict(self.stats, queue_depth=self._queue.qsize(), queue_capacity=self._queue.maxsize)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _insert(self, batch):
+        self.store.write_many(batch)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                tpool.execute(self._insert, batch)
+                self.stats['written'] += len(batch)
+            except Exception as e:
+                self.stats['failed'] += len(batch)
+                logger.error(f"[SEGMENT_WRITER] write_many failed for {len(batch)} frames: {e}", exc_info=True)
+            else:
+                if self.on_written is not None:
+                    try:
+                        self.on_written(batch)
+                    except Exception as e:
+                        logger.error(f"[SEGMENT_WRITER] on_written callback failed: {e}", exc_info=True)
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = elapsed_ms
+            self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
+            self.stats['last_batch_size'] = len(batch)
+            logger.debug(f"[SEGMENT_WRITER] Flushed {len(batch)} frames in {elapsed_ms:.1f}ms, "
+                         f"queue depth {self._queue.qsize()}")
+
+    def flush_all(self):
+        """Kuyruktaki her şeyi senkron olarak yazar (kapanışta kullanılır)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+
+
+_writer = None
+
+
+def get_segment_writer():
+    """Süreç başına tek SegmentWriter örneği."""
+    global _writer
+    if _writer is None:
+        import atexit
+        from app.replay.meta_tracker import get_meta_tracker
+
+        _writer = SegmentWriter(
+            get_segment_store(),
+            max_queue=Config.SEGMENT_WRITER_QUEUE_SIZE,
+            batch_size=Config.SEGMENT_WRITER_BATCH_SIZE,
+            flush_interval=Config.SEGMENT_WRITER_FLUSH_MS / 1000.0,
+            policy=Config.SEGMENT_WRITER_POLICY,
+            on_written=get_meta_tracker().record_many,
+        )
+        atexit.register(_writer.flush_all)
+    return _writer
@@ -0,0 +1,93 @@
+"""api/app/storage/thumbnails.py"""
+
+import logging
+from datetime import datetime, timedelta
+
+import eventlet
+from eventlet import tpool
+
+from app.settings import Config
+from app.storage.base import to_naive_utc
+from app.utils.image_ops import encode_scaled
+from models.thumbnail import Thumbnail
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def make_thumbnail(frame_bytes, width, quality):
+    """JPEG -> genişliği `width` olan küçültülmüş JPEG (küçük resim ve canlı önizleme)."""
+    import cv2
+    import numpy as np
+
+    buffer = np.frombuffer(frame_bytes, dtype=np.uint8)
+    # Küçük hedef için tam çözünürlükte decode gereksiz; JPEG 1/4 ölçekte açılır
+    image = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_COLOR_4)
+    if image is None or image.shape[1] < width:
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Frame could not be decoded as JPEG")
+    return encode_scaled(image, width, quality)
+
+
+class ThumbnailIndexer:
+    """
+    Ingest sırasında küçük resim index'ini artımlı olarak üretir.
+
+    Kaynak başına her `interval` saniyelik dilimin ilk karesi küçültülüp Thumbnail olarak
+    upsert edilir ($setOnInsert: dilime ilk yazılan kalır). Dilim kontrolü bellekte yapılır;
+    kare başına maliyet bir karşılaştırmadır, küçültme tpool'da arka planda çalışır.
+    """
+
+    def __init__(self, interval=10, width=160, quality=70):
+        self.interval = interval
+        self.width = width
+        self.quality = quality
+        self._last_slot = {}  # source_id -> son küçük resmi alınan dilim
+
+    def slot_start(self, timestamp):
+        seconds = int((to_naive_utc(timestamp) - _EPOCH).total_seconds())
+        return _EPOCH + timedelta(seconds=seconds - seconds % self.interval)
+
+    def offer(self, source_id, timestamp, frame_bytes, anomaly_detected=False):
+        """Kare yeni bir dilimi açıyorsa küçük resmini arka planda üretir. Üretilecekse True döner."""
+        slot = self.slot_start(timestamp)
+        if self._last_slot.get(source_id) == slot:
+            return False
+        self._last_slot[source_id] = slot
+        eventlet.spawn_n(self._store, source_id, slot, to_naive_utc(timestamp), frame_bytes, anomaly_detected)
+        return True
+
+    def _store(self, source_id, slot, captured_at, frame_bytes, anomaly_detected):
+        try:
+            image = tpool.execute(make_thumbnail, frame_bytes, self.width, self.quality)
+            Thumbnail._get_collection().update_one(
+                {'source_id': source_id, 'timestamp': slot},
+                {'$setOnInsert': {
+                    'captured_at': captured_at,
+                    'image': image,
+                    'anomaly_detected': bool(anomaly_detected),
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"[THUMBNAILS] Could not store thumbnail for {source_id} at {slot.isoformat()}: {e}")
+
+    def reset_source(self, source_id):
+        self._last_slot.pop(source_id, None)
+
+
+_indexer = None
+
+
+def get_thumbnail_indexer():
+    """Süreç başına tek ThumbnailIndexer örneği."""
+    global _indexer
+    if _indexer is None:
+        _indexer = ThumbnailIndexer(
+            interval=Config.THUMBNAIL_INTERVAL_SECONDS,
+            width=Config.THUMBNAIL_WIDTH,
+            quality=Config.THUMBNAIL_JPEG_QUALITY,
+        )
+    return _indexer
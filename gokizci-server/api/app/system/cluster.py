@@ -0,0 +1,91 @@
+"""api/app/system/cluster.py
+
+Çok düğümlü (multi-node) çalışmada kaynak sahipliği.
+
+Her kaynağın (source_id) ingest'i, tutarlı hash (consistent hashing) halkasında kaynağa düşen
+tek bir düğümde işlenir. Kaynak başına tutulan bellek durumu (inference penceresi, jitter buffer,
+kabul kontrolü, meta sayaçları, küçük resim dilimleri) böylece tek düğümdedir; düğüm eklenip
+çıkarıldığında yalnızca ~1/N kaynak el değiştirir. Kaynak başına arka plan işleri (replay meta,
+saklama sıkıştırması) da yalnızca sahip düğümde çalışır.
+
+CLUSTER_NODES boşsa tek düğüm vardır ve her kaynağın sahibi odur.
+"""
+
+import bisect
+import hashlib
+import logging
+
+from app.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class ConsistentHashRing:
+    """Her düğüm halkaya `replicas` sanal noktayla yerleşir; anahtar saat yönündeki ilk noktanın düğümüne düşer."""
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = list(nodes)
+        self.replicas = replicas
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+class Cluster:
+    """Bu düğümün kimliği, düğüm adresleri ve kaynak sahipliği."""
+
+    def __init__(self, node_id, nodes=None, replicas=100):
+        self.node_id = node_id
+        self.nodes = dict(nodes or {})  # node_id -> istemcilerin bağlanacağı URL
+        if self.nodes and node_id not in self.nodes:
+            logger.warning(f"[CLUSTER] NODE_ID={node_id} is not listed in CLUSTER_NODES; this node owns no sources")
+        self.ring = ConsistentHashRing(self.nodes, replicas=replicas)
+
+    @property
+    def enabled(self):
+        return len(self.nodes) > 1
+
+    def owner(self, source_id):
+        return self.ring.owner(source_id) if self.nodes else self.node_id
+
+    def owns(self, source_id):
+        return self.owner(source_id) == self.node_id
+
+    def owner_url(self, source_id):
+        return self.nodes.get(self.owner(source_id))
+
+    def owned(self, source_ids):
+        return [source_id for source_id in source_ids if self.owns(source_id)]
+
+    def get_stats(self):
+        return {'node_id': self.node_id, 'nodes': sorted(self.nodes), 'enabled': self.enabled}
+
+
+def parse_nodes(value):
+    """'api-1=http://10.0.0.1:5000,api-2=http://10.0.0.2:5000' -> {node_id: url}."""
+    nodes = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        node_id, _, url = item.partition('=')
+        nodes[node_id.strip()] = url.strip()
+    return nodes
+
+
+_cluster = None
+
+
+def get_cluster():
+    """Süreç başına tek Cluster örneği."""
+    global _cluster
+    if _cluster is None:
+        _cluster = Cluster(Config.NODE_ID, parse_nodes(Config.CLUSTER_NODES))
+    return _cluster
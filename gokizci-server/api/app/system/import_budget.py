@@ -0,0 +1,71 @@
+"""api/app/system/import_budget.py
+
+`import app` süresini ve ağır ML modüllerinin (TensorFlow, OpenCV, numpy) import sırasında
+yüklenip yüklenmediğini ölçer. Gerileme kontrolü tests/test_import_budget.py'dedir; bütçe
+IMPORT_BUDGET_MS ortam değişkeniyle ayarlanır (varsayılan 1500 ms).
+
+Elle ölçüm (api/ dizininden; bütçe aşılırsa veya ağır modül yüklenirse 1 ile çıkar):
+    python -m app.system.import_budget [--budget-ms 1500] [--runs 3] [--allow numpy]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('tensorflow', 'keras', 'cv2', 'numpy')
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 1500))  # `import app` için izin verilen süre (en hızlı ölçüm)
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed_ms = (time.perf_counter() - started) * 1000
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{'elapsed_ms': elapsed_ms, 'heavy': heavy}}))
+"""
+
+
+def measure_import(heavy_modules=HEAVY_MODULES):
+    """Temiz bir yorumlayıcıda `import app` süresini (ms) ve yüklenen ağır modülleri döner."""
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE.format(heavy=tuple(heavy_modules))],
+        cwd=API_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if `import app` exceeds its import-time budget')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS, help='Maximum import time (best of runs)')
+    parser.add_argument('--runs', type=int, default=3, help='Measurements; the fastest one is compared')
+    parser.add_argument('--allow', action='append', default=[], help='Heavy module allowed at import (repeatable)')
+    args = parser.parse_args()
+
+    heavy_modules = [name for name in HEAVY_MODULES if name not in args.allow]
+    try:
+        samples = [measure_import(heavy_modules) for _ in range(max(1, args.runs))]
+    except subprocess.CalledProcessError as e:
+        print(f"[IMPORT_BUDGET] `import app` failed:\n{e.stderr}", file=sys.stderr)
+        raise SystemExit(2)
+
+    best_ms = min(sample['elapsed_ms'] for sample in samples)
+    heavy = sorted({name for sample in samples for name in sample['heavy']})
+    print(f"[IMPORT_BUDGET] import app: {best_ms:.0f}ms (budget {args.budget_ms:.0f}ms), "
+          f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if best_ms > args.budget_ms:
+        print(f"[IMPORT_BUDGET] Import time exceeds budget by {best_ms - args.budget_ms:.0f}ms", file=sys.stderr)
+        failed = True
+    if heavy:
+        print(f"[IMPORT_BUDGET] Heavy modules must be imported lazily: {', '.join(heavy)}", file=sys.stderr)
+        failed = True
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""api/app/system/readiness.py
+
+Başlangıçta HTTP/Socket.IO'yu bekletmemesi gereken işler (meta catch-up, model yükleme ve
+warm-up) burada arka plan green thread'lerinde başlatılır ve durumları /api/system/ready
+üzerinden raporlanır.
+"""
+
+import logging
+import time
+
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}  # ad -> {'state': 'running'|'done'|'failed', 'started_at', 'duration_s', 'error'}
+
+
+def _run_task(name, func, *args):
+    task = _tasks[name] = {'state': 'running', 'started_at': time.time(), 'duration_s': None, 'error': None}
+    started = time.monotonic()
+    try:
+        result = func(*args)
+        task['state'] = 'failed' if result is False else 'done'
+    except Exception as e:
+        task['state'] = 'failed'
+        task['error'] = repr(e)
+        logger.error(f"[STARTUP] {name} failed: {e}", exc_info=True)
+    finally:
+        task['duration_s'] = round(time.monotonic() - started, 3)
+        logger.info(f"[STARTUP] {name} {task['state']} in {task['duration_s']}s")
+
+
+def _catch_up_replay_meta(flask_app):
+    from app.replay.scheduler import initial_replay_meta_update
+
+    with flask_app.app_context():
+        initial_replay_meta_update()
+
+
+def _warm_up_model():
+    from app.inference.engine import get_engine
+
+    return get_engine().start_warm_up().wait()
+
+
+def start_background_startup(flask_app):
+    """Meta catch-up ve model warm-up'ı arka planda başlatır; create_app bunları beklemez."""
+    eventlet.spawn_n(_run_task, 'replay_meta_catchup', _catch_up_replay_meta, flask_app)
+    eventlet.spawn_n(_run_task, 'model_warm_up', _warm_up_model)
+
+
+def get_readiness():
+    """Inference kullanılabilir mi? (model yüklendi ve warm-up yapıldı) + başlangıç işlerinin durumu."""
+    from app.inference.engine import get_engine
+
+    engine = get_engine()
+    return {
+        'ready': engine.warmed_up,
+        'model_ready': engine.model_ready,
+        'model_warmed_up': engine.warmed_up,
+        'replay_meta_catchup_done': _tasks.get('replay_meta_catchup', {}).get('state') == 'done',
+        'tasks': {name: dict(task) for name, task in _tasks.items()},
+    }
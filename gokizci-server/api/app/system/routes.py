@@ -0,0 +1,38 @@
+"""api/app/system/routes.py"""
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from app.storage.segment_writer import get_segment_writer
+from app.replay.scheduler import get_meta_scheduler
+from app.system.readiness import get_readiness
+from app.inference.admission import get_admission_controller
+from app.inference.observer import get_window_observer
+from app.socket.fanout import get_live_fanout
+from app.system.cluster import get_cluster
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_system_stats():
+    """Arka plan işlerinin (segment yazıcı vb.) kuyruk derinliği ve gecikme metrikleri."""
+    return jsonify({
+        'segment_writer': get_segment_writer().get_stats(),
+        'replay_meta_scheduler': get_meta_scheduler().get_stats(),
+        'ingest_admission': get_admission_controller().get_stats(),
+        'ingest_observer': get_window_observer().get_stats(),
+        'live_fanout': get_live_fanout().get_stats(),
+        'cluster': get_cluster().get_stats()
+    })
+
+@system_bp.route('/ready', methods=['GET'])
+def get_system_ready():
+    """Readiness probe: inference kullanılabilir olana kadar 503 döner (kimlik doğrulama gerektirmez)."""
+    readiness = get_readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
+@system_bp.route('/owner/<source_id>', methods=['GET'])
+def get_source_owner(source_id):
+    """Kaynağın ingest'ini işleyen düğüm (yük dengeleyici/istemci yönlendirmesi için)."""
+    cluster = get_cluster()
+    return jsonify({'source_id': source_id, 'node_id': cluster.owner(source_id), 'url': cluster.owner_url(source_id)})
@@ -1,3 +1,6 @@
+# api/app/utils/big_model.py
+# TensorFlow/Keras import'u ağırdır: bu modül yalnızca LocalPredictor._build_model içinden
+# (ilk model yüklemesinde) import edilmelidir; bkz. app/system/import_budget.py
 import tensorflow as tf
 from tensorflow import keras
 from keras import layers, Model
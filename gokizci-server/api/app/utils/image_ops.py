@@ -0,0 +1,12 @@
+# api/app/utils/image_ops.py
+
+def encode_scaled(image, width, quality):
+    """Decode edilmiş BGR kareyi genişliği `width` olacak şekilde (oran korunarak) küçültüp JPEG'e çevirir."""
+    import cv2
+
+    height = max(1, round(image.shape[0] * width / image.shape[1]))
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Scaled frame could not be encoded")
+    return encoded.tobytes()
@@ -0,0 +1,88 @@
+# api/app/utils/jitter_buffer.py
+
+import heapq
+import itertools
+import time
+
+
+class JitterBuffer:
+    """
+    Kaynak başına canlı yayın yeniden sıralama (reorder) tamponu.
+
+    Kareler istemci `sequence` numarasına göre bir min-heap'te tutulur ve kesinlikle sırayla
+    çıkarılır. Eksik bir kare (boşluk) şu durumlarda atlanır:
+      - heap'te `reorder_window`'dan fazla kare birikmişse, veya
+      - sıradaki kare `max_latency` saniyeden uzun süredir bekliyorsa (deadline).
+    Zaten gönderilmiş bir sıradan daha eski gelen kareler (geç/duplicate) düşürülür.
+    Başlangıçta (ve reset sonrası) ilk kare hemen taban alınmaz: `max_latency` dolana veya
+    `reorder_window` kare gelene kadar beklenir, taban o ana kadar gelen en küçük sıra olur.
+    Böylece yeniden bağlanırken yolda olan daha küçük sıralı kareler geç sayılıp düşürülmez.
+
+    push/flush O(log n)'dir ve yield etmez; çağıran taraf emit sırasını korumak için
+    kaynağa özel bir lock tutmalıdır.
+    """
+
+    def __init__(self, reorder_window=10, max_latency=0.5, clock=time.monotonic):
+        self.reorder_window = reorder_window
+        self.max_latency = max_latency
+        self._clock = clock
+        self._heap = []  # (sequence, tie_breaker, arrived_at, payload)
+        self._tie = itertools.count()
+        self._next_sequence = None
+        self._first_arrival = None  # Taban sıra belirlenmeden önce gelen ilk karenin zamanı
+        self.emitted = 0
+        self.skipped = 0   # Deadline/pencere nedeniyle atlanan eksik kare sayısı
+        self.dropped = 0   # Geç veya tekrar gelen kareler
+
+    def __len__(self):
+        return len(self._heap)
+
+    def reset(self):
+        self._heap.clear()
+        self._next_sequence = None
+        self._first_arrival = None
+
+    def push(self, sequence, payload):
+        """Kareyi ekler ve sırası gelmiş (gönderilebilir) kareleri liste olarak döner."""
+        if self._next_sequence is not None and sequence + self.reorder_window < self._next_sequence:
+            # Sıra numarası çok geriye gitti: istemci akışı yeniden başlattı
+            self.reset()
+        now = self._clock()
+        if self._next_sequence is None and self._first_arrival is None:
+            self._first_arrival = now
+        heapq.heappush(self._heap, (sequence, next(self._tie), now, payload))
+        return self.flush()
+
+    def flush(self):
+        """Sırası gelen kareleri ve deadline'ı geçmiş boşlukları işler."""
+        ready = []
+        now = self._clock()
+        if (self._next_sequence is None and self._heap and len(self._heap) < self.reorder_window
+                and now - self._first_arrival < self.max_latency):
+            return ready  # Taban sıra henüz belirlenmedi; daha küçük sıralı kareler yolda olabilir
+        while self._heap:
+            sequence, _, arrived_at, payload = self._heap[0]
+            if self._next_sequence is not None and sequence < self._next_sequence:
+                heapq.heappop(self._heap)
+                self.dropped += 1
+                continue
+            if self._next_sequence is None or sequence == self._next_sequence:
+                pass
+            elif len(self._heap) > self.reorder_window or now - arrived_at >= self.max_latency:
+                self.skipped += sequence - self._next_sequence
+            else:
+                break
+            heapq.heappop(self._heap)
+            self._next_sequence = sequence + 1
+            self.emitted += 1
+            ready.append(payload)
+        return ready
+
+    def stats(self):
+        return {
+            'depth': len(self._heap),
+            'next_sequence': self._next_sequence,
+            'emitted': self.emitted,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+        }
@@ -1,27 +1,32 @@
 # api/app/utils/video_processing.py
 
-import cv2
-import numpy as np
-import base64
 from datetime import datetime
+import logging
 
-VIDEO_QUALITY = 85  # JPEG kalite ayarı
+from app.inference.engine import get_engine
 
-def process_video_frame(source_id, frame_data):
+logger = logging.getLogger(__name__)
+
+def process_video_frame(source_id, frame_data, preview=None, ticket=None):
     """
-    # TODO: GPU ile çalışan AI modelini buraya entegre et
-    # frame decode → inference → base64 encode
+    Kareyi kaynağın kayan penceresi üzerinden FutureFramePredictor ile skorlar.
+    frame decode → pencere (son 5 kare) → tahmin edilen kare ile MSE → anomali kararı
+    preview=(genişlik, kalite) verilirse aynı decode'dan önizleme JPEG'i de döner ('preview').
+    ticket: handler'da geliş sırasında alınan pencere bileti (bkz. InferenceEngine.take_ticket).
     """
     try:
+        result = get_engine().process(source_id, frame_data, preview=preview, ticket=ticket)
         return {
             'frame': frame_data,
             'timestamp': datetime.utcnow().isoformat(),
-            'anomaly_detected': True,
+            'anomaly_detected': result['anomaly_detected'],
             'source_id': source_id,
-            'confidence': 0.0
-
+            'confidence': result['confidence'],
+            'prediction_error': result['prediction_error'],
+            'validity': result['validity'],
+            'preview': result.get('preview')
         }
 
     except Exception as e:
-        print(f"[{source_id}] Frame processing error: {e}")
+        logger.error(f"[{source_id}] Frame processing error: {e}", exc_info=True)
         return None
@@ -1,11 +1,14 @@
 # api/index.py
-import eventlet
-eventlet.monkey_patch()
+# Inference worker'ları multiprocessing 'spawn' ile başlatılır ve bu modülü __mp_main__
+# olarak yeniden import eder; eventlet patch'i ve uygulama kurulumu yalnızca ana süreçte yapılmalı.
+if __name__ != "__mp_main__":
+    import eventlet
+    eventlet.monkey_patch()
 
-# notice: we *only* import the factory & socketio, never `import app` itself
-from app import create_app, socketio
+    # notice: we *only* import the factory & socketio, never `import app` itself
+    from app import create_app, socketio
 
-app = create_app()
+    app = create_app()
 
 if __name__ == "__main__":
     app.logger.setLevel("DEBUG")
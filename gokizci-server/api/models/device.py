@@ -1,8 +1,32 @@
 """api/models/device.py"""
 
-from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField
+from mongoengine import (Document, EmbeddedDocument, EmbeddedDocumentField, StringField, DateTimeField,
+                         BooleanField, IntField, FloatField)
 from datetime import datetime
 
+
+class RetentionPolicy(EmbeddedDocument):
+    """
+    Cihaz başına saklama politikası. Boş bırakılan alanlar Config.RETENTION_* varsayılanlarını kullanır.
+
+        full_rate_hours : bu süreden yeni kareler olduğu gibi tutulur
+        keyframe_days   : daha eskiler keyframe_fps'e seyreltilerek bu süre tutulur
+        anomaly_days    : anomali işaretli kareler bu süre tutulur
+    """
+    full_rate_hours = FloatField(min_value=1)
+    keyframe_days = FloatField(min_value=0)
+    keyframe_fps = FloatField(min_value=0.01)
+    anomaly_days = FloatField(min_value=0)
+
+    def to_dict(self):
+        return {
+            'full_rate_hours': self.full_rate_hours,
+            'keyframe_days': self.keyframe_days,
+            'keyframe_fps': self.keyframe_fps,
+            'anomaly_days': self.anomaly_days,
+        }
+
+
 class Device(Document):
     name = StringField(required=True)
     source_id = StringField(required=True, unique=True)
@@ -10,6 +34,7 @@ class Device(Document):
     status = StringField(default='offline', choices=['online', 'offline', 'error'])
     last_seen = DateTimeField(default=datetime.utcnow)
     stream_url = StringField()
+    retention = EmbeddedDocumentField(RetentionPolicy)  # Boşsa Config varsayılanları
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
 
@@ -22,6 +47,7 @@ class Device(Document):
             'status': self.status,
             'last_seen': self.last_seen.isoformat(),
             'stream_url': self.stream_url,
+            'retention': self.retention.to_dict() if self.retention else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -29,4 +55,4 @@ class Device(Document):
     meta = {
         'collection': 'devices',
         'indexes': ['source_id', 'type', 'status']
-    } 
\ No newline at end of file
+    } 
@@ -1,5 +1,5 @@
 # api/models/replay_meta.py
-from mongoengine import Document, StringField, DateTimeField, BinaryField
+from mongoengine import Document, StringField, DateTimeField, BinaryField, DictField, IntField, BooleanField
 
 class ReplayMeta(Document):
     source_id = StringField(required=True)
@@ -7,9 +7,18 @@ class ReplayMeta(Document):
     minute_anomaly_bits = BinaryField(required=True)  # 60 bit
     second_filled_bits = BinaryField(required=True)   # 3600 bit
 
+    # Bitlerin türetildiği sayaçlar; ingest ile artımlı olarak $inc edilir (bkz. app/replay/meta_tracker.py).
+    # Anahtarlar saniye/dakika indisidir ('0'..'3599' / '0'..'59'); boş saniye/dakika tutulmaz.
+    second_counts = DictField()      # saniye -> kare sayısı
+    minute_frames = DictField()      # dakika -> kare sayısı
+    minute_anomalies = DictField()   # dakika -> anomali karesi sayısı
+    version = IntField(default=0)    # Her güncellemede artar
+    finalized = BooleanField(default=False)  # Pencere kapandı ve son hali yazıldı
+    updated_at = DateTimeField()
+
     meta = {
         'indexes': [
             ('source_id', 'window_start')
         ],
         'collection': 'replay_meta' # Koleksiyon adını da belirtmek iyi bir pratiktir.
-    }
\ No newline at end of file
+    }
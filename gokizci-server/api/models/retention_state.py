@@ -0,0 +1,16 @@
+# api/models/retention_state.py
+from mongoengine import Document, StringField, DateTimeField
+
+class RetentionState(Document):
+    """
+    Kaynak başına sıkıştırma ilerlemesi (bkz. app/storage/retention.py). Her kademe için
+    işlenmiş son zaman tutulur; böylece her çalıştırma yalnızca yeni biten saatleri tarar.
+    """
+    source_id = StringField(required=True, unique=True)
+    decimated_until = DateTimeField()  # Bu zamandan önceki kareler keyframe hızına seyreltildi
+    pruned_until = DateTimeField()     # Bu zamandan önceki anomali dışı kareler silindi
+    last_run = DateTimeField()
+
+    meta = {
+        'collection': 'retention_state'
+    }
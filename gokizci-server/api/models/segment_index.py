@@ -0,0 +1,23 @@
+# api/models/segment_index.py
+from mongoengine import Document, StringField, DateTimeField, IntField, BooleanField, FloatField
+
+class SegmentIndexEntry(Document):
+    """
+    Dosya tabanlı kare deposunun (bkz. app/storage/file_store.py) index'i.
+    Kare verisi Mongo'da değil diskteki segment dosyasındadır; burada yalnızca konumu tutulur.
+    """
+    source_id = StringField(required=True)
+    timestamp = DateTimeField(required=True)
+    file = StringField(required=True)    # Depo köküne göre göreceli yol, ör: <source_id>/2025051910.seg
+    offset = IntField(required=True)     # Dosya içindeki bayt konumu
+    length = IntField(required=True)     # JPEG uzunluğu
+    anomaly_detected = BooleanField(default=False, null=True)  # None: skorlanmamış kare (inference atlandı)
+    confidence = FloatField()
+
+    meta = {
+        'collection': 'segment_index',
+        'indexes': [
+            ('source_id', 'timestamp'),
+            'file',  # Saklama sıkıştırmasında dosya yeniden yazılırken kalan kareler
+        ]
+    }
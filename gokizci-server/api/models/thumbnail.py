@@ -0,0 +1,20 @@
+# api/models/thumbnail.py
+from mongoengine import Document, StringField, DateTimeField, BinaryField, BooleanField
+
+class Thumbnail(Document):
+    """
+    Zaman çizelgesi önizlemesi: kaynak başına her THUMBNAIL_INTERVAL_SECONDS diliminin ilk
+    karesinden küçültülmüş JPEG (bkz. app/storage/thumbnails.py).
+    """
+    source_id = StringField(required=True)
+    timestamp = DateTimeField(required=True)   # Dilimin başlangıcı (naive UTC)
+    captured_at = DateTimeField(required=True)  # Küçültülen karenin kayıt zamanı
+    image = BinaryField(required=True)          # Küçültülmüş JPEG
+    anomaly_detected = BooleanField(default=False)
+
+    meta = {
+        'collection': 'thumbnails',
+        'indexes': [
+            {'fields': ['source_id', 'timestamp'], 'unique': True},
+        ]
+    }
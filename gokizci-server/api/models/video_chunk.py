@@ -0,0 +1,23 @@
+# api/models/video_chunk.py
+from mongoengine import Document, StringField, DateTimeField, ListField, BinaryField, IntField, BooleanField, FloatField
+
+class VideoChunk(Document):
+    """
+    Kaynak başına saniyede bir doküman: o saniyeye ait tüm kareler tek dokümanda tutulur.
+    Listeler paraleldir; i. karenin zamanı = chunk_start + offsets_ms[i] milisaniye.
+    """
+    source_id = StringField(required=True)
+    chunk_start = DateTimeField(required=True)  # Saniyeye yuvarlanmış başlangıç (UTC)
+    frames = ListField(BinaryField())           # Ham JPEG bytes
+    offsets_ms = ListField(IntField())          # chunk_start'a göre milisaniye
+    anomalies = ListField(BooleanField(null=True))  # None: skorlanmamış kare
+    confidences = ListField(FloatField())
+    frame_count = IntField(default=0)
+    anomaly_count = IntField(default=0)
+
+    meta = {
+        'collection': 'video_chunks',
+        'indexes': [
+            {'fields': ['source_id', 'chunk_start'], 'unique': True},
+        ]
+    }
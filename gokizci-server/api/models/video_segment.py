@@ -1,14 +1,36 @@
 # api/models/video_segment.py
 from mongoengine import Document, StringField, DateTimeField, BooleanField, BinaryField, FloatField
 from datetime import datetime, timezone
+import base64
+
+FRAME_FORMAT_BASE64 = 'base64'  # Eski kayıtlar: base64 metninin utf-8 bytes'ı
+FRAME_FORMAT_JPEG = 'jpeg'      # Ham JPEG bytes
 
 class VideoSegment(Document):
     source_id = StringField(required=True)
-    frame_data = BinaryField(required=True)  # Base64 encoded frame
+    frame_data = BinaryField(required=True)  # frame_format'a göre ham JPEG veya base64
+    # Alan olmayan (eski) dokümanlar base64 kabul edilir; bkz. app/storage/migrate_frames.py
+    frame_format = StringField(choices=(FRAME_FORMAT_BASE64, FRAME_FORMAT_JPEG))
     timestamp = DateTimeField(default=lambda: datetime.now(timezone.utc))
-    anomaly_detected = BooleanField(default=False)
+    anomaly_detected = BooleanField(default=False, null=True)  # None: skorlanmamış kare (inference atlandı)
     confidence = FloatField()
 
+    def frame_bytes(self):
+        """Ham JPEG bytes; yeni formatta kopya/dönüşüm yapılmadan döner."""
+        if not self.frame_data:
+            return None
+        if self.frame_format == FRAME_FORMAT_JPEG:
+            return self.frame_data
+        return base64.b64decode(self.frame_data)
+
+    def frame_base64(self):
+        """JSON yanıtları için base64 metin."""
+        if not self.frame_data:
+            return None
+        if self.frame_format == FRAME_FORMAT_JPEG:
+            return base64.b64encode(self.frame_data).decode('ascii')
+        return self.frame_data.decode('utf-8')
+
     def to_dict(self):
         return {
             'id': str(self.id),
@@ -22,11 +44,8 @@ class VideoSegment(Document):
         'collection': 'video_segments',
         'indexes': [
             'source_id',
-            # 'timestamp', # Bu satırı değiştiriyoruz
-            {'fields': ['timestamp'], 'expireAfterSeconds': 3600},
+            # Saklama süresi TTL index'iyle değil kademeli sıkıştırma işiyle yönetilir (bkz. app/storage/retention.py)
             'anomaly_detected',
             ('source_id', 'timestamp')  # Compound index for efficient querying
         ],
-        # index_background: True # Genel background ayarı, bireysel indexlerde belirtildiği için kaldırılabilir veya kalabilir.
-                                  # Yukarıdaki TTL index tanımına background:True ekledim.
     }
@@ -0,0 +1,6 @@
+# api/tests/conftest.py
+import os
+import sys
+
+# Testler api/ dizininden bağımsız çalıştırılabilsin: `app` ve `models` paketleri import yolunda olmalı
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
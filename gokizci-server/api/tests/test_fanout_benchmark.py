@@ -0,0 +1,18 @@
+# api/tests/test_fanout_benchmark.py
+from app.socket.fanout_benchmark import run
+
+FRAMES = 50
+FRAME_KB = 40
+VIEWERS = (1, 10, 50)
+
+
+def test_shared_fanout_encodes_once_per_frame_for_any_viewer_count():
+    for viewers in VIEWERS:
+        _, fanout = run(viewers, FRAMES, FRAME_KB, per_viewer_encode=False)
+        assert fanout.encodes == FRAMES
+        assert fanout.stats['deliveries'] == FRAMES * viewers
+
+
+def test_per_viewer_baseline_encodes_for_every_viewer():
+    _, fanout = run(VIEWERS[-1], FRAMES, FRAME_KB, per_viewer_encode=True)
+    assert fanout.encodes == FRAMES * VIEWERS[-1]
@@ -0,0 +1,15 @@
+# api/tests/test_import_budget.py
+from app.system.import_budget import BUDGET_MS, HEAVY_MODULES, measure_import
+
+RUNS = 3
+
+
+def test_import_app_does_not_load_heavy_modules():
+    sample = measure_import(HEAVY_MODULES)
+    assert sample['heavy'] == [], f"Heavy modules must be imported lazily: {', '.join(sample['heavy'])}"
+
+
+def test_import_app_stays_within_budget():
+    # Soğuk disk önbelleği ilk ölçümü şişirebilir; en hızlı ölçüm karşılaştırılır
+    best_ms = min(measure_import(HEAVY_MODULES)['elapsed_ms'] for _ in range(RUNS))
+    assert best_ms <= BUDGET_MS, f"`import app` took {best_ms:.0f}ms, budget is {BUDGET_MS:.0f}ms"